@@ -1,12 +1,10 @@
+import queue
 import sys
-import tkinter as tk
-import random
-import pygame
+import threading
 import numpy as np
-import tkinter.messagebox as messagebox
-import matplotlib.pyplot as plt
-import csv
-import os
+from rumor_engine import GridEngine, GRID_SIZE, EMPTY, arrange_grid, child_seeds, neighbors_of, populate_grid, seed_sequence
+from rumor_export import export_run, frame_rgb
+from rumor_store import ResultsStore
 
 # Define the colors to use in the simulation
 WHITE = (255, 255, 255)
@@ -16,10 +14,11 @@ PINK=(250,218,221)
 RED=(255, 0, 0)
 BLUE=(108, 79, 250)
 YELLOW=(245,206,50)
-# Define the size of the grid and the window
-GRID_SIZE = 100
+# Define the size of the window
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 800
+# the largest number of rows and columns of the preview frames of the GUI
+PREVIEW_SIZE = 300
 # Set default parameter values
 default_p = 0.6
 default_s4 = 25
@@ -30,273 +29,130 @@ default_l = 7
 default_num_generations = 50
 default_numofruns=10
 
-#for the plot
-count_has_r=0
-global count_by_gen
-
-
-# Define the levels of skepticism
-SKEPTICISM_LEVELS = {
-    's1': 0,
-    's2': 1,
-    's3': 2,
-    's4': 3
-}
-# Define the probs for the levels of skepticism
-SKEPTICISM_LEVELS_P = {
-    's1': 1,
-    's2': 1/3,
-    's3': 2/3,
-    's4': 0
-}
-
-#convert the SKEPTICISM_LEVELS dictionary
-SKEPTICISM_LEVELS_REVERSED = {v: k for k, v in SKEPTICISM_LEVELS.items()}
 
 class Simulation:
-    def __init__(self, p_people, p_skepticism,gen,L):
+    def __init__(self, p_people, p_skepticism,gen,L,seed=None,grid_size=GRID_SIZE,layout='random',profiler=None):
         """
     The __init__ function is called when the class is instantiated.
     It sets up the instance of the class, and defines what will be stored in that instance.
-    In this case, we are storing a grid (a 2D array) of people objects.
+    In this case, we are storing a grid (a 2D int8 array) with the skepticism level code of every person,
+    EMPTY where there is nobody. The people are placed with a single random choice of cells.
 
     :param self: Represent the instance of the class
     :param p_people: Determine the number of people in the grid
     :param p_skepticism: Determine the percentage of people who are skeptical
     :param gen: Determine the generation of the simulation
     :param L: Set the number of people that are infected at the start
-    :return: The grid, which is a 2d array of people
+    :param seed: Seed all the random draws of the simulation, a fresh seed if None
+    :param grid_size: Set the number of rows and columns of the grid
+    :param layout: Place the levels of skepticism at random, or with arrange_board_slow ('slow') or arrange_board_fast ('fast')
+    :param profiler: A rumor_profile.Profiler that records the time of every phase, None to run without instrumentation
+    :return: The grid, which is a 2d array of skepticism level codes
     """
         self.count_by_gen_per = None
+        # the grid is built from the first stream spawned from the seed, and every run draws from the next ones;
+        # the streams are derived without spawning, so the SeedSequence of the caller is left as it is
+        self.seed_sequence = seed_sequence(seed)
+        self.seed = self.seed_sequence.entropy
+        self.rng = np.random.default_rng(child_seeds(self.seed_sequence, 0, 1)[0])
         self.p_people = p_people
         self.p_skepticism = p_skepticism
         self.generation=gen
         self.generation_progress=0
         self.l=L
-        value_list = list(SKEPTICISM_LEVELS.values())
-        value_list += [None]
-        self.grid = np.full((GRID_SIZE, GRID_SIZE), None)
-        self.num_people = int(p_people * (GRID_SIZE * GRID_SIZE))
-        skepticism_levels = []
-        for i, percent in enumerate(p_skepticism):
-            num_people_s = int(percent * self.num_people)
-            skepticism_level = [SKEPTICISM_LEVELS[f"s{len(p_skepticism) - i}"]] * num_people_s
-            skepticism_levels += skepticism_level
-        np.random.shuffle(skepticism_levels)
-        for i in range(self.num_people):
-            x, y = np.random.randint(GRID_SIZE), np.random.randint(GRID_SIZE)
-            while self.grid[x][y] is not None:
-                x, y = np.random.randint(GRID_SIZE), np.random.randint(GRID_SIZE)
-            skepticism_level = skepticism_levels[i]
-            person = Person(SKEPTICISM_LEVELS_REVERSED.get(skepticism_level))
-            self.grid[x][y] = person
+        self.grid_size=grid_size
+        self.layout=layout
+        self.grid = populate_grid(p_people, p_skepticism, grid_size, self.rng, layout)
+        self.num_people = int(np.count_nonzero(self.grid != EMPTY))
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.instrument_simulation(self)
 
     def get_neighbors(self,x,y):
         """
     The get_neighbors function takes in a cell's x and y coordinates,
     and returns the neighbors of that cell.  The neighbors are returned as a list of tuples,
-    where each tuple is an (x,y) coordinate pair.
+    where each tuple is an (x,y) coordinate pair. They are read from the neighbor table of the grid,
+    which is built once and shared by all the simulations with the same grid size.
 
     :param self: Allow an object to refer to itself inside of a method
     :param x: Get the row of the cell
     :param y: Determine the row of the cell, and x is used to determine the column
     :return: A list of tuples
     """
-        neighbors=[]
-        neighbors_row = range((x - 1), (x + 2))
-        neighbors_col = range((y - 1), (y + 2))
-        for nr in neighbors_row:
-            for nc in neighbors_col:
-                nr = nr % GRID_SIZE  # WRAP AROUND
-                nc = nc % GRID_SIZE  # WRAP AROUND
-                if (nr, nc) != (x, y):
-                    neighbors.append((nr, nc))
-        return neighbors
+        neighbors = neighbors_of(x * self.grid_size + y, self.grid.shape)
+        return [divmod(int(cell), self.grid_size) for cell in neighbors]
 
     def get_numOfNone(self,x,y):
         """
     The get_numOfNone function takes in the x and y coordinates of a cell,
-    and returns the number of neighbors that are None. It does this by first creating two lists,
-    neighbors_row and neighbors_col. These lists contain all possible row and column values for a given cell's neighbor.
-    For example, if we were looking at (0,0), then its neighbors would be (-2,-2),(-2,-3)...(0,-3)....(2,-3).
-    The function then loops through each value in these two lists to find out how many cells are None.
+    and returns the number of neighbors that are empty (EMPTY).
+    The neighbors are read from the neighbor table of the grid, with the wrap around of the edges.
 
     :param self: Access the attributes of the class
     :param x: Get the x coordinate of a cell in the grid
     :param y: Determine the row of the cell
     :return: The number of none values neighbors in the grid
     """
-        mone_none=0
-        neighbors_row = range((x - 1), (x + 2))
-        neighbors_col = range((y - 1), (y + 2))
-        for nr in neighbors_row:
-            for nc in neighbors_col:
-                nr = nr % GRID_SIZE  # WRAP AROUND
-                nc = nc % GRID_SIZE  # WRAP AROUND
-                if (nr, nc) != (x, y):
-                    if self.grid[nr][nc]==None:
-                        mone_none+=1
-        return mone_none
+        neighbors = neighbors_of(x * self.grid_size + y, self.grid.shape)
+        return int(np.count_nonzero(self.grid.ravel()[neighbors] == EMPTY))
 
     def arrange_board_slow(self):
         """
-    The arrange_board_slow function is used to arrange the board in a way that will allow for the most efficient spread of information.
-        The function first creates two lists, one containing all of the coordinates on the grid and another containing how many neighbors each coordinate has.
-        It then sorts both lists by number of neighbors, so that they are in order from least to greatest number of neighbors.
-        Finally, it iterates through these sorted lists and assigns people with different levels of skepticism to each coordinate.
+    The arrange_board_slow function is used to arrange the board in a way that will slow down the spread of information.
+    The number of empty neighbors of every cell is computed at once for the whole grid, the people are sorted by it
+    with a stable argsort, and the most connected people (the fewest empty neighbors) get s4, then s3, s2 and s1.
 
     :param self: Access the attributes of the class
-    :return: A list of coordinates, sorted by the number of neighbors that are none
+    :return: The grid
     """
-        listOfFree=[]
-        moneOfNone=[]
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                if self.grid[x][y]!=None:
-                    listOfFree.append((x,y))
-                    moneOfNone.append(self.get_numOfNone(x,y))
-
-        sorted_coordinates = [listOfFree[i] for i in sorted(range(len(listOfFree)), key=lambda x: moneOfNone[x])]
-        i=0;
-        for j in range(int(self.p_skepticism[0]*self.num_people)):
-            self.grid[sorted_coordinates[i]]=Person('s4')
-            i+=1;
-        for j in range(int(self.p_skepticism[1]*self.num_people)):
-            self.grid[sorted_coordinates[i]]=Person('s3')
-            i+=1;
-        for j in range(int(self.p_skepticism[2] * self.num_people)):
-            self.grid[sorted_coordinates[i]] = Person('s2')
-            i += 1;
-        for j in range(int(self.p_skepticism[3] * self.num_people)):
-            self.grid[sorted_coordinates[i]] = Person('s1')
-            i += 1;
+        return arrange_grid(self.grid, self.p_skepticism, 'slow')
+
     def arrange_board_fast(self):
         """
-    The arrange_board_fast function is a function that arranges the board in a way that will minimize the number of interactions between people.
-    It does this by first creating two lists, one with all coordinates and one with how many neighbors each coordinate has. Then it sorts both lists based on
-    the second list so that they are in order from least to most neighbors. Finally, it goes through and places people at each coordinate starting from the
-    coordinate with fewest neighbors.
+    The arrange_board_fast function is used to arrange the board in a way that will speed up the spread of information.
+    It works like arrange_board_slow, but the most connected people get s1, then s2, s3 and s4.
 
     :param self: Refer to the object itself
-    :return: A list of tuples
+    :return: The grid
     """
-        listOfFree=[]
-        moneOfNone=[]
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                if self.grid[x][y]!=None:
-                    listOfFree.append((x,y))
-                    moneOfNone.append(self.get_numOfNone(x,y))
-
-        sorted_coordinates = [listOfFree[i] for i in sorted(range(len(listOfFree)), key=lambda x: moneOfNone[x])]
-        i=0;
-        for j in range(int(self.p_skepticism[3]*self.num_people)):
-            self.grid[sorted_coordinates[i]]=Person('s1')
-            i+=1;
-        for j in range(int(self.p_skepticism[2]*self.num_people)):
-            self.grid[sorted_coordinates[i]]=Person('s2')
-            i+=1;
-        for j in range(int(self.p_skepticism[1] * self.num_people)):
-            self.grid[sorted_coordinates[i]] = Person('s3')
-            i += 1;
-        for j in range(int(self.p_skepticism[0] * self.num_people)):
-            self.grid[sorted_coordinates[i]] = Person('s4')
-            i += 1;
-
-    def drawGrid(self):
+        return arrange_grid(self.grid, self.p_skepticism, 'fast')
+
+    def drawGrid(self, screen):
         """
     The drawGrid function draws the grid of cells on the screen.
-    It takes no arguments and returns nothing. It uses a nested for loop to iterate through each cell in the grid,
-    and then determines what color to draw that cell based on its state.
+    The state of every cell is turned into a color of rumor_export.PALETTE in one array operation, and the colors are blitted
+    as one surface scaled to the window. Grids larger than the window are sampled every few cells first,
+    so a frame costs about one operation per pixel of the window whatever the size of the grid is.
 
     :param self: Refer to the object itself
+    :param screen: The pygame surface to draw on
     :return: Nothing
     """
-        blockSize = int(WINDOW_WIDTH / GRID_SIZE)
-        for x in range(0, WINDOW_WIDTH, blockSize):
-            for y in range(40, WINDOW_HEIGHT+40, blockSize):
-                # Determine the color to use for this cell
-                rect = pygame.Rect(x, y, blockSize, blockSize)
-                if self.grid[int(x / blockSize)][int(y / blockSize)-5] is None:
-                    pygame.draw.rect(SCREEN, BLACK, rect, 0)
-                #elif self.grid[int(x / blockSize)][int(y / blockSize)-5].skepticism=='s4':
-                    #pygame.draw.rect(SCREEN, RED, rect, 0)
-                #elif self.grid[int(x / blockSize)][int(y / blockSize) - 5].skepticism == 's3':
-                    #pygame.draw.rect(SCREEN, BLUE, rect, 0)
-                #elif self.grid[int(x / blockSize)][int(y / blockSize)-5].skepticism=='s2':
-                    #pygame.draw.rect(SCREEN, YELLOW, rect, 0)
-                elif self.grid[int(x / blockSize)][int(y / blockSize)-5].received_rumor:
-                    pygame.draw.rect(SCREEN, GREEN, rect, 0)
-                else:
-                    pygame.draw.rect(SCREEN, WHITE, rect, 0)
+        import pygame
+        surface = pygame.surfarray.make_surface(self.frame())
+        screen.blit(pygame.transform.scale(surface, (WINDOW_WIDTH, WINDOW_HEIGHT)), (0, 40))
 
-    def select_random_cell(self):
+    def frame(self):
         """
-    The select_random_cell function is used to select a random cell from the grid.
-    It does this by creating two variables, x and y, which are assigned random integers between 0 and GRID_SIZE - 1.
-    The function then checks if the cell at that location is empty (None). If it isn't, it will continue to loop until an empty cell is found.
+    The frame function computes the colors of the cells drawn in the window: black for an empty cell,
+    green for a person that has the rumor and white for the other people.
+    The rows of the grid go from left to right, like the columns of the window.
 
-    :param self: Represent the instance of the class
-    :return: A random cell in the grid
+    :param self: Refer to the object itself
+    :return: A (rows, columns, 3) uint8 array of RGB colors, at most about the size of the window
     """
-        cell = None
-        while cell is None:
-            x = random.randint(0, GRID_SIZE - 1)
-            y = random.randint(0, GRID_SIZE - 1)
-            cell=self.grid[x][y]
-        return x,y
-
-    def transmit_rumor(self, x, y,flagisfirst=0):
-        """
-    The transmit_rumor function is responsible for transmitting the rumor to a cell's neighbors.
-    It takes in two parameters: x and y, which are the coordinates of the cell that will transmit
-    the rumor. It then checks if this cell has received a rumor (if it hasn't, there's no point in
-    transmitting one). If it has received a rumor, we check each of its neighbors to see if they have
-    received rumors as well. If they haven't, we generate a random number between 0 and 1; if this number is less than or equal to SKEPTICISM_LEVELS_P[cell.
+        return frame_rgb(self.engine.occupied, self.engine.received_rumor, WINDOW_WIDTH)
 
-    :param self: Access the attributes of the class
-    :param x: Indicate the x coordinate of the cell
-    :param y: Indicate the y coordinate of the cell in which we want to transmit rumor
-    :param flagisfirst: Transmit the rumor to all neighbors of the first cell that receives it
-    :return: A boolean value, if the rumor is transmitted or not
-    """
-        global count_has_r
-        cell = self.grid[x][y]
-        neighbors=self.get_neighbors(x,y)
-        if cell.approve_to_transmit:
-           for idx in neighbors:
-            nr, nc= idx
-            if  self.grid[nr][nc] is not None :
-                        neighbor = self.grid[nr][nc]
-                        transmission_prob = SKEPTICISM_LEVELS_P[cell.skepticism]
-                        if flagisfirst==1:
-                            #if this s the first cell, we want him to transmit the rumor even if it s4. so we change the transmission_prob to 2 that is alwayas bigger than np.random.uniform(0, 1).
-                            transmission_prob=2
-                        if np.random.uniform(0, 1) <= transmission_prob:
-                            if neighbor.received_rumor and self.generation_progress==neighbor.generation_received:
-                                neighbor.decrease_skepticism_level()
-                            cell.transmit_rumor(self.l)
-                            if  neighbor.received_rumor ==False:
-                                #check if the neighbor receveid the roumer in first time and if yes rasid the counter
-                                count_has_r +=1
-                            neighbor.receive_rumor(self.generation_progress)
-
-
-    def update_Cell(self):
+    def select_random_cell(self):
         """
-    The update_Cell function is used to update the cell's life and skepticism level.
-    The function first loops through all of the cells in the grid, then checks if a cell exists at that location.
-    If it does exist, it will decrease its life by 1 if he transmits a rumor and increase its skepticism level by 1 if it decreased in former gen.
+    The select_random_cell function is used to select a random cell from the grid.
+    It picks one of the occupied cells with the random stream of the current run.
 
-    :param self: Refer to the object itself
-    :return: Nothing
+    :param self: Represent the instance of the class
+    :return: A random cell in the grid
     """
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                cell=self.grid[x][y]
-                if cell is not None:
-                    cell.decease_L()
-                    cell.up_skepticism_level()
+        return self.engine.select_random_cell()
 
     def show_params(self, screen):
         """
@@ -311,12 +167,13 @@ class Simulation:
     :param screen: Display the text on the screen
     :return: The simulation parameters and the generation countdown
     """
+        import pygame
         font = pygame.font.SysFont('Arial', 15)
         parameters_txt = font.render(
         f'Simulation params: P={self.p_people}, S4%={self.p_skepticism[0]*100}, S3%={self.p_skepticism[1]*100}, S2%={self.p_skepticism[2]*100}, S1%={self.p_skepticism[3]*100}, L={self.l}',
         True, BLACK)
         generation_txt = font.render(f'Generation : {self.generation_progress}', True, BLACK)
-        count_r = font.render(f'has rumor : {count_has_r}', True, BLACK)
+        count_r = font.render(f'has rumor : {self.engine.count_has_r}', True, BLACK)
 
         screen.blit(parameters_txt, (10, 0))
         screen.blit(generation_txt, (10, 20))
@@ -325,69 +182,117 @@ class Simulation:
     def reset_grid(self):
         """
     The reset_grid function is used to reset the grid.
-    It does this by iterating through each cell in the grid and calling its reset function.
+    It resets the rumor state of the engine, like calling the reset function of each person in the grid.
 
     :param self: Represent the instance of the class
     :return: Nothing
     """
-        for x in range(GRID_SIZE):
-            for y in range(GRID_SIZE):
-                cell=self.grid[x][y]
-                if cell is not None:
-                    cell.reset()
+        self.engine.reset()
 
-    def run_simulation(self,numruns=1):
+    def build_engine(self):
+        """
+    The build_engine function creates the array-backed engine that runs the generations on the grid.
+    It has to be called again after the board is rearranged.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        self.engine = GridEngine(self.grid, self.l)
+        if self.profiler is not None:
+            self.profiler.instrument_engine(self.engine)
+
+    def stream_metrics(self,numruns=1):
+        """
+    The stream_metrics function runs the simulation numruns times without a window, and yields the metrics record
+    of every generation as soon as it is computed (see GridEngine.metrics), so the records can be written to disk
+    or the runs stopped early without keeping the whole history in memory.
+    The runs are the same as the runs of run_simulation.
+
+    :param self: Represent the instance of the class
+    :param numruns: The number of runs
+    :return: A generator of the metrics records, each one with the index of its run
+    """
+        # every stream has its own engine, so streams of the same simulation may run at the same time
+        engine = GridEngine(self.grid, self.l)
+        if self.profiler is not None:
+            self.profiler.instrument_engine(engine)
+        for n, run_seed in enumerate(child_seeds(self.seed_sequence, 1, 1 + numruns)):
+            engine.rng = np.random.default_rng(run_seed)
+            for record in engine.stream(self.generation):
+                record['run'] = n
+                yield record
+
+    def export_frames(self,path,generations=None,fmt='npz',scale=1,max_size=None):
+        """
+    The export_frames function runs the first run of run_simulation without a window, and writes the frames of the
+    selected generations to the directory path (see rumor_export.export_run). The frames are written by a background
+    thread, so no display is needed and the encoding does not stall the simulation.
+
+    :param self: Represent the instance of the class
+    :param path: The directory the frames are written to
+    :param generations: The generations to write, all of them if None
+    :param fmt: 'npz' for compressed archives of batches of frames, 'ppm' or 'png' for one image per frame
+    :param scale: The number of pixels of the side of a cell
+    :param max_size: The largest number of rows and columns of a frame, None to keep every cell
+    :return: The list of the written files
+    """
+        engine = GridEngine(self.grid, self.l, np.random.default_rng(child_seeds(self.seed_sequence, 1, 2)[0]))
+        if self.profiler is not None:
+            self.profiler.instrument_engine(engine)
+        return export_run(engine, self.generation, path, generations, fmt, max_size=max_size, scale=scale)
+
+    def run_simulation(self,numruns=1,on_generation=None,steps_per_second=10,fps=30):
         """
            The run_simulation function runs the simulation for a given number of generations.
-               It also plots the percentage of people who received the rumor per generation, and saves this data to a CSV file.
+               It also plots the percentage of people who received the rumor per generation, and saves this data to the results store.
+               The window is redrawn fps times per second, and the simulation advances steps_per_second generations per second.
 
            :param self: Refer to the object itself
            :param numruns: Run the simulation multiple times and then average the results
+           :param on_generation: A function called with the metrics record of every generation (see stream_metrics)
+           :param steps_per_second: The number of generations run per second
+           :param fps: The number of frames drawn per second
            :return: A plot of the percentage of people who received the news
            """
-        #self.arrange_board_fast()
-        #self.arrange_board_slow()
+        # pygame is only loaded by the runs with a window
+        import pygame
         self.count_by_gen_per = [[0] * (self.generation + 1) for _ in range(numruns)]
+        self.build_engine()
+        run_seeds = child_seeds(self.seed_sequence, 1, 1 + numruns)
         for n in range (numruns):
-            global SCREEN, CLOCK, count_has_r
             self.reset_grid()
+            self.engine.rng = np.random.default_rng(run_seeds[n])
             self.generation_progress=0
-            count_has_r=0
             pygame.init()
-            CLOCK = pygame.time.Clock()
-            SCREEN = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT + 40))
+            clock = pygame.time.Clock()
+            screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT + 40))
             pygame.display.set_caption("Rumor Spreading Simulation")
             x, y = self.select_random_cell()
-            self.grid[x][y].receive_rumor(self.generation_progress)
-            count_has_r += 1
-            self.count_by_gen_per[n][self.generation_progress]=count_has_r/self.num_people*100
-            self.generation_progress += 1
-            self.transmit_rumor(x, y,1)
+            self.engine.start(x, y)
+            self.count_by_gen_per[n][self.generation_progress]=self.engine.percent()
+            if on_generation is not None:
+                on_generation(dict(self.engine.metrics(), run=n))
             # main simulation loop
             running = True
+            started = pygame.time.get_ticks()
+            # at most the generations due between two frames, so a slow generation does not freeze the window
+            max_steps = max(1, -(-steps_per_second // fps))
             while running:
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         pygame.quit()
                         sys.exit()
-                SCREEN.fill(PINK)
-                self.drawGrid()
-                self.show_params(SCREEN)
+                screen.fill(PINK)
+                self.drawGrid(screen)
+                self.show_params(screen)
                 pygame.display.update()
-                self.update_Cell()
-                self.count_by_gen_per[n][self.generation_progress]=count_has_r/self.num_people*100
-                self.generation_progress += 1
-                for i in range(GRID_SIZE):
-                    for j in range(GRID_SIZE):
-                        cell = self.grid[i][j]
-                        if cell is not None:
-                            if cell.received_rumor == True:
-                                self.transmit_rumor(i, j)
-
-                if self.generation+1 == self.generation_progress:
-                    running = False
-                # limit the simulation speed to 10 frames per second
-                CLOCK.tick(10)
+                due = (pygame.time.get_ticks() - started) * steps_per_second // 1000 + 1
+                for _ in range(min(due - self.generation_progress, max_steps)):
+                    running = self.next_generation(n, on_generation)
+                    if not running:
+                        break
+                # limit the frame rate
+                clock.tick(fps)
             # close pygame window and exit
             pygame.quit()
 
@@ -396,353 +301,239 @@ class Simulation:
         for gen in range(self.generation + 1):
             gen_count_sum = sum([self.count_by_gen_per[n][gen] for n in range(numruns)])
             average_count_by_gen[gen] = gen_count_sum / numruns
-        params_str = f'Simulation params: P={self.p_people}, S4%={self.p_skepticism[0] * 100}, S3%={self.p_skepticism[1] * 100}, S2%={self.p_skepticism[2] * 100}, S1%={self.p_skepticism[3] * 100}, L={self.l}'
-        # save the data to a CSV file
-        filename = 'average_count_by_gen.csv'
-        mode = 'a' if os.path.exists(filename) else 'w'
-        with open(filename, mode, newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            if mode == 'w':
-                header_row = ['Generation'] + [f'Generation {i}' for i in range(self.generation + 1)]
-                writer.writerow(header_row)
-            writer.writerow([params_str] + average_count_by_gen)
-
-        # plot the percentage of people who received the news
-        fig, ax = plt.subplots(figsize=(8, 6))
-        plt.plot(range(self.generation + 1), average_count_by_gen)
-        plt.xlabel('Generations')
-        plt.ylabel('Percent of people has the rumor')
-        plt.title(f'Percent of people with a rumor per the generation (average over {numruns} runs)')
-        plt.subplots_adjust(top=0.8)
-        plt.suptitle(params_str, fontsize=10, y=0.98)
-        plt.show()
+        self.save_results()
+        self.plot_results(average_count_by_gen, numruns)
         sys.exit()
 
-
-class GUI:
-    def __init__(self):
+    def next_generation(self, n, on_generation=None):
         """
-    The __init__ function is called when the class is instantiated.
-    It sets up the window and all of its widgets, including labels, entry boxes, and buttons.
-    The default values for each parameter are set in this function as well.
+    The next_generation function runs one generation of run n and records the percentage of people that have the rumor.
 
     :param self: Refer to the object itself
-    :param numofruns: Determine how many times the simulation will run
-    :return: The window object
+    :param n: The index of the run
+    :param on_generation: A function called with the metrics record of the generation
+    :return: False if the run is over, True otherwise
     """
-        self.window = tk.Tk()
-        self.window.title("Rumor Spreading Simulation")
-        self.window.geometry("750x550")
-        self.rumor_spreader = tk.StringVar()
-        self.rumor_spreader.set("random")
-        label_font = ("Arial", 18)  # Set the font for the labels
-        entry_font = ("Arial", 16)  # Set the font for the entry boxes
-
-        # Create labels and entry boxes for each parameter
-        tk.Label(self.window, text="Population Density (P):",font=label_font,pady=10,anchor='w').grid(row=0, column=0)
-        self.p_entry = tk.Entry(self.window,font=entry_font)
-        self.p_entry.insert(0, str(default_p))  # Set default value
-        self.p_entry.grid(row=0, column=1)
-
-        tk.Label(self.window, text="Skepticism Level S4 (%):" ,font=label_font,pady=10,anchor='w').grid(row=1, column=0)
-        self.s4_entry = tk.Entry(self.window,font=entry_font)
-        self.s4_entry.insert(0, str(default_s4))  # Set default value
-        self.s4_entry.grid(row=1, column=1)
-
-        tk.Label(self.window, text="Skepticism Level S3 (%):",font=label_font,pady=10,anchor='w').grid(row=2, column=0)
-        self.s3_entry = tk.Entry(self.window,font=entry_font)
-        self.s3_entry.insert(0, str(default_s3))  # Set default value
-        self.s3_entry.grid(row=2, column=1)
-
-        tk.Label(self.window, text="Skepticism Level S2 (%):",font=label_font,pady=10,anchor='w').grid(row=3, column=0)
-        self.s2_entry = tk.Entry(self.window,font=entry_font)
-        self.s2_entry.insert(0, str(default_s2))  # Set default value
-        self.s2_entry.grid(row=3, column=1)
-
-        tk.Label(self.window, text="Skepticism Level S1 (%):",font=label_font,pady=10,anchor='w').grid(row=4, column=0)
-        self.s1_entry = tk.Entry(self.window,font=entry_font)
-        self.s1_entry.insert(0, str(default_s1))  # Set default value
-        self.s1_entry.grid(row=4, column=1)
-
-        tk.Label(self.window, text="Generations before re-transmission (L):",font=label_font,pady=10,anchor='w').grid(row=5, column=0)
-        self.l_entry = tk.Entry(self.window,font=entry_font)
-        self.l_entry.insert(0, str(default_l))  # Set default value
-        self.l_entry.grid(row=5, column=1)
-
-        tk.Label(self.window, text="Number of generations to simulate:",font=label_font,pady=10,anchor='w').grid(row=6, column=0)
-        self.num_generations_entry = tk.Entry(self.window,font=entry_font)
-        self.num_generations_entry.insert(0, str(default_num_generations))  # Set default value
-        self.num_generations_entry.grid(row=6, column=1)
-
-        # Add a label and a spinbox for the number of runs
-        tk.Label(self.window, text="Number of Runs:", font=("Arial", 18), pady=10, anchor='w').grid(row=7, column=0)
-        self.num_runs = tk.Entry(self.window, font=entry_font)
-        self.num_runs.insert(0,str(default_numofruns))  # Set default value
-        self.num_runs.grid(row=7, column=1)
-
-        # Create a button to start the simulation
-        self.start_button = tk.Button(self.window, text="Start Simulation",font=("Arial", 16),pady=10,anchor='w', width=13, height=2, command=self.start_simulation)
-        self.start_button.grid(row=8, column=0, columnspan=2, pady=10)
-        self.start_button.bind("<Enter>", self.on_enter)
-        self.start_button.bind("<Leave>", self.on_leave)
-
-
-    def on_enter(self, event):
+        # the engine updates the cooldowns and transmits the rumor for the whole grid at once
+        self.engine.step()
+        self.generation_progress = self.engine.generation_progress
+        self.count_by_gen_per[n][self.generation_progress]=self.engine.percent()
+        if on_generation is not None:
+            on_generation(dict(self.engine.metrics(), run=n))
+
+        if self.generation == self.generation_progress:
+            return False
+        if self.engine.settled(self.count_by_gen_per[n][:self.generation_progress + 1]):
+            # the rumor reached a fixed point, the rest of the generations keep the last percentage
+            for gen in range(self.generation_progress + 1, self.generation + 1):
+                self.count_by_gen_per[n][gen] = self.count_by_gen_per[n][self.generation_progress]
+            return False
+        return True
+
+    def save_results(self):
         """
-    The on_enter function is called when the mouse pointer enters the start_button widget.
-    The function changes the background color of start_button to green and its foreground color to white.
+    The save_results function saves every run and the average to the results store.
 
-    :param self: Represent the instance of the class
-    :param event: Get the event that triggered this function
-    :return: The button's background color and text color to their original values
+    :param self: Refer to the object itself
+    :return: The path of the new file of the store
     """
-        self.start_button.config(bg="#4caf50", fg="#ffffff")
+        return ResultsStore().append(self.count_by_gen_per, self.seed_sequence, p_people=self.p_people,
+                                     p_skepticism=self.p_skepticism, L=self.l, grid_size=self.grid_size,
+                                     layout=self.layout)
 
-    def on_leave(self, event):
+    def plot_results(self, average_count_by_gen, numruns):
         """
-    The on_leave function is a callback function that changes the color of the start button when
-    the mouse leaves it. It takes in an event parameter, which is used to change the background and
-    foreground colors of the start button.
+    The plot_results function plots the percentage of people who received the rumor per generation.
 
-    :param self: Represent the instance of the class
-    :param event: Get the event that caused the function to be called
-    :return: The start button with a white background and black text
+    :param self: Refer to the object itself
+    :param average_count_by_gen: The average percentage of people who have the rumor in every generation
+    :param numruns: The number of runs of the average
+    :return: Nothing
     """
-        self.start_button.config(bg="#ffffff", fg="#000000")
+        import matplotlib.pyplot as plt
+        self.draw_results(plt.figure(figsize=(8, 6)), average_count_by_gen, numruns)
+        plt.show()
 
-    def validate_input(self, parameter, value):
-            """
-    The validate_input function takes in a parameter and value, and checks to see if the value is valid for that parameter.
-    If it is not valid, then False will be returned. If it is valid, True will be returned.
+    def draw_results(self, fig, average_count_by_gen, numruns):
+        """
+    The draw_results function draws the percentage of people who received the rumor per generation on a figure.
 
-    :param self: Access the instance variables of the class
-    :param parameter: Check which parameter is being validated
-    :param value: Store the value of the parameter that is passed in
-    :return: True if the input is valid, and false otherwise
+    :param self: Refer to the object itself
+    :param fig: The matplotlib figure to draw on
+    :param average_count_by_gen: The average percentage of people who have the rumor in every generation
+    :param numruns: The number of runs of the average
+    :return: Nothing
     """
-            if parameter == "p":
-                try:
-                    value = float(value)
-                    if value < 0:
-                        return False
-                except ValueError:
-                    return False
+        params_str = f'Simulation params: P={self.p_people}, S4%={self.p_skepticism[0] * 100}, S3%={self.p_skepticism[1] * 100}, S2%={self.p_skepticism[2] * 100}, S1%={self.p_skepticism[3] * 100}, L={self.l}, seed={self.seed}'
+        # plot the percentage of people who received the news
+        ax = fig.add_subplot()
+        ax.plot(range(self.generation + 1), average_count_by_gen)
+        ax.set_xlabel('Generations')
+        ax.set_ylabel('Percent of people has the rumor')
+        ax.set_title(f'Percent of people with a rumor per the generation (average over {numruns} runs)')
+        fig.subplots_adjust(top=0.8)
+        fig.suptitle(params_str, fontsize=10, y=0.98)
+
+    def run_headless(self, numruns=1, progress=None, cancel=None):
+        """
+    The run_headless function runs the runs of run_simulation without a window, a plot or an exit, so it can run
+    in a background thread, and saves them to the results store.
 
-            elif parameter == "l":
-                try:
-                    value = int(value)
-                    if not (0 <= value):
-                        return False
-                except ValueError:
-                    return False
-            elif parameter == "g":
-                try:
-                    value = int(value)
-                    if not (0 <= value):
-                        return False
-                except ValueError:
-                    return False
-            elif parameter == "s":
-                sum=0
-                for s in value:
-                    try:
-                        sint = int(s)
-                    except ValueError:
-                        return False
-                    sum+=sint
-                if not (sum==100):
-                    return False
-            elif parameter == "n":
-                try:
-                    value = int(value)
-                    if not (0 < value):
-                        return False
-                except ValueError:
-                        return False
-            return True
-    def start_simulation(self):
+    :param self: Refer to the object itself
+    :param numruns: The number of runs
+    :param progress: A function called with the index of the run and the generation after every generation but the
+                     last one of a run, and once with the index of the run and the number of generations when it is over
+    :param cancel: A threading.Event that stops the runs when it is set
+    :return: The percentage of people who have the rumor in every generation of every run, None if it was cancelled
+    """
+        self.count_by_gen_per = [[0] * (self.generation + 1) for _ in range(numruns)]
+        self.build_engine()
+        for n, run_seed in enumerate(child_seeds(self.seed_sequence, 1, 1 + numruns)):
+            self.reset_grid()
+            self.engine.rng = np.random.default_rng(run_seed)
+            self.generation_progress = 0
+            self.engine.start(*self.select_random_cell())
+            self.count_by_gen_per[n][0] = self.engine.percent()
+            running = self.generation > 0
+            while running:
+                if cancel is not None and cancel.is_set():
+                    return None
+                running = self.next_generation(n)
+                if running and progress is not None:
+                    progress(n, self.generation_progress)
+            if progress is not None:
+                progress(n, self.generation)
+        self.save_results()
+        return self.count_by_gen_per
+
+
+class SimulationJob:
+    def __init__(self, simulation, numruns):
         """
-    The start_simulation function is called when the user clicks on the &quot;Start Simulation&quot; button.
-    It takes in all of the values from each entry box and validates them to make sure they are within
-    the acceptable range. If any value is not, it will use a default value instead and display a warning messagebox.
-    If all values are valid, it will create an instance of the Simulation class with those parameters and call its run_simulation function.
+    The __init__ function creates a job of the GUI: the runs of a simulation, waiting in the queue of the worker.
 
-    :param self: Refer to the instance of the class
-    :return: The simulation
+    :param self: Represent the instance of the class
+    :param simulation: The Simulation to run
+    :param numruns: The number of runs
+    :return: The job
     """
-        p = self.p_entry.get()
-        s4 = self.s4_entry.get()
-        s3 = self.s3_entry.get()
-        s2 = self.s2_entry.get()
-        s1 = self.s1_entry.get()
-        l = self.l_entry.get()
-        num_generations = self.num_generations_entry.get()
-        num_runs=self.num_runs.get()
-        if not self.validate_input("p",p):
-            p = default_p
-            messagebox.showwarning("Invalid Input", "Invalid value for Population Density. Using default value.")
-        if not self.validate_input("l", l):
-            messagebox.showwarning("Invalid Input",
-                                   "Invalid value for Generations before re-transmission. Using default value.")
-        if not self.validate_input("g", num_generations):
-            num_generations = default_num_generations
-            messagebox.showwarning("Invalid Input",
-                                   "Invalid value for Number of generations to simulate. Using default value.")
-        if not self.validate_input("s", [s1,s2,s3,s4]):
-            s1 = default_s1
-            s2=default_s2
-            s3=default_s3
-            s4=default_s4
-            messagebox.showwarning("Invalid Input",
-                                   "Invalid value for S1/S2/S3/S4 to simulate. Using default value.")
-        if not self.validate_input("n", num_runs):
-            num_runs = default_numofruns
-            messagebox.showwarning("Invalid Input",
-                                   "Invalid value for Number of runs to simulate. Using default value.")
-
-        p = float(p)
-        s4 = float(s4)/100
-        s3 = float(s3)/100
-        s2 = float(s2)/100
-        s1 = float(s1)/100
-        l = int(l)
-        num_generations =int(num_generations)
-        num_runs=int(num_runs)
-
-
-
-
-        self.simulation = Simulation(p,[s4, s3, s2, s1],num_generations,l)  # Create instance of Simulation class
-
-        # Call the simulation function with the specified parameters
-        self.simulation.run_simulation(num_runs)
-
-    def run(self):
+        self.simulation = simulation
+        self.numruns = numruns
+        self.cancel = threading.Event()
+        self.status = 'queued'
+        self.run = 0
+        self.generation = 0
+        self.result = None
+        self.error = None
+        # the last preview frame of the grid, waiting for the GUI
+        self.frames = queue.Queue(maxsize=1)
+
+    def progress(self, run, generation):
         """
-    The run function is the main loop of the program. It starts by creating a window object, which is an instance of
-    the Tkinter class. The window object has many methods and attributes that can be used to customize it, such as its
-    title or size. After this, we create a canvas widget on top of our window using the Canvas method from Tkinter. This
-    canvas widget will be used to draw all shapes in our game onto it (such as circles for balls). We then create an
-    instance of PongGame called pong_game and pass in self (which refers to this class)
+    The progress function records the generation the job reached, it is called by the worker thread.
+    When the GUI took the former preview frame, it publishes a new one: the frame is a copy made on the worker thread,
+    so the GUI never reads the state arrays while the worker changes them.
 
     :param self: Represent the instance of the class
+    :param run: The index of the run
+    :param generation: The generation
     :return: Nothing
     """
-        self.window.mainloop()
-
-
-
-
-class Person:
-    def __init__(self,skepticism):
+        self.run = run
+        self.generation = generation
+        # the worker thread is the only one that puts frames, so the queue cannot be filled in between
+        if self.frames.empty():
+            engine = self.simulation.engine
+            self.frames.put(frame_rgb(engine.occupied, engine.received_rumor, PREVIEW_SIZE))
+
+    def percent(self):
         """
-    The __init__ function is called when the class is instantiated.
-    It sets up the object with all of its initial values.
+    The percent function returns how much of the job is done.
 
     :param self: Represent the instance of the class
-    :param skepticism: Determine the initial skepticism level of a node
-    :return: The object itself
+    :return: The percentage of the generations of all the runs that are done
     """
-        self.skepticism = skepticism
-        self.received_rumor = False
-        self.rumor_transmitted = False
-        self.skepticism_level_decreased = False
-        self.l=0
-        self.approve_to_transmit=True
-
+        total = self.numruns * max(1, self.simulation.generation)
+        return 100 * (self.run * max(1, self.simulation.generation) + self.generation) / total
 
-
-    def receive_rumor(self,gen):
+    def describe(self):
         """
-    The receive_rumor function is called when a node receives a rumor from another node.
-    It sets the received_rumor attribute to True and records the generation of that rumor in
-    the generation_received attribute.
+    The describe function describes the job in the list of jobs of the GUI.
 
-    :param self: Refer to the object itself
-    :param gen: Keep track of the generation number
-    :return: The boolean value true
+    :param self: Represent the instance of the class
+    :return: A line of text
     """
+        simulation = self.simulation
+        s4, s3, s2, s1 = (round(percent * 100) for percent in simulation.p_skepticism)
+        return (f'P={simulation.p_people} S4={s4}% S3={s3}% S2={s2}% S1={s1}% L={simulation.l} '
+                f'generations={simulation.generation} runs={self.numruns}: {self.status}')
 
-        self.received_rumor = True
-        self.generation_received=gen
 
-    def transmit_rumor(self,L):
+class SimulationWorker:
+    def __init__(self):
         """
-    The transmit_rumor function is called when a node has been selected to transmit the rumor.
-    The function sets the boolean value of rumor_transmitted to True, and sets approve_to_transmit
-    to False. The function also takes in an integer L as an argument, which represents how many
-    nodes will be infected by this transmission.
+    The __init__ function starts the background thread that runs the jobs of the GUI one after the other,
+    so the window stays responsive while they run.
 
-    :param self: Access the attributes and methods of the class in python
-    :param L: Determine the number of times a rumor is transmitted
-    :return: Nothing
+    :param self: Represent the instance of the class
+    :return: The worker
     """
-        self.rumor_transmitted = True
-        self.approve_to_transmit = False
-        self.l=L
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue()
+        self.current = None
+        self.thread = threading.Thread(target=self.work, name='simulation-worker', daemon=True)
+        self.thread.start()
 
-    def decease_L(self):
+    def submit(self, job):
         """
-    The decease_L function decreases the value of L by 1.
-    If L is 0, then it sets approve_to_transmit to True.
+    The submit function adds a job to the queue.
 
-    :param self: Bind the method to an object
-    :return: The value of the variable l
+    :param self: Represent the instance of the class
+    :param job: The SimulationJob
+    :return: Nothing
     """
-        if(self.l>0):
-            self.l=self.l-1
-        if self.l==0:
-            self.approve_to_transmit = True
+        self.jobs.put(job)
 
-    def decrease_skepticism_level(self):
+    def work(self):
         """
-    The decrease_skepticism_level function decreases the skepticism level of a user by one.
-        If the user is already at s0, then their skepticism level will not change.
+    The work function is the loop of the worker thread: it runs the queued jobs, and puts every job in the
+    finished queue when it is done, cancelled or failed.
 
-    :param self: Refer to the object that is calling the function
+    :param self: Represent the instance of the class
     :return: Nothing
     """
-        if self.skepticism == "s4":
-            self.skepticism = "s3"
-            self.skepticism_level_decreased = True
-        elif self.skepticism == "s3":
-            self.skepticism = "s2"
-            self.skepticism_level_decreased = True
-        elif self.skepticism == "s2":
-            self.skepticism = "s1"
-            self.skepticism_level_decreased = True
-
-    def up_skepticism_level(self):
-        """
-    The up_skepticism_level function increases the skepticism level of a user by one.
-        If the user's skepticism level has been decreased, then it will be increased to its original value.
-
-    :param self: Access the attributes and methods of the class
-    :return: The skepticism level of the user
+        while True:
+            job = self.jobs.get()
+            if not job.cancel.is_set():
+                self.current = job
+                job.status = 'running'
+                try:
+                    job.result = job.simulation.run_headless(job.numruns, job.progress, job.cancel)
+                except Exception as error:
+                    job.error = error
+                self.current = None
+            if job.error is not None:
+                job.status = 'failed'
+            elif job.result is None:
+                job.status = 'cancelled'
+            else:
+                job.status = 'done'
+            self.finished.put(job)
+
+
+def __getattr__(name):
     """
-        if self.skepticism_level_decreased == True:
-            if self.skepticism == "s3":
-                self.skepticism = "s4"
-            elif self.skepticism == "s2":
-                self.skepticism = "s3"
-            elif self.skepticism == "s1":
-                self.skepticism = "s2"
-        self.skepticism_level_decreased=False
-
-    def reset(self):
-        """
-    The reset function is called at the beginning of each simulation.
-    It resets all the variables that are used to keep track of what has happened in a single simulation.
+The __getattr__ function loads the GUI class from rumor_gui the first time it is asked for, so importing this module
+to run simulations does not load tkinter and matplotlib.
 
+:param name: The name of the missing attribute of the module
+:return: The GUI class
+"""
+    if name == 'GUI':
+        from rumor_gui import GUI
+        return GUI
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    :param self: Represent the instance of the class
-    :return: A list of the values of the variables that are reset
-    """
-        self.received_rumor = False
-        self.rumor_transmitted = False
-        self.skepticism_level_decreased = False
-        self.l = 0
-        self.approve_to_transmit = True
 
 def main():
     """
@@ -750,6 +541,7 @@ The main function is the entry point of the program. It creates a GUI object and
 
 :return: The gui object
 """
+    from rumor_gui import GUI
     gui = GUI()
     gui.run()
 
@@ -0,0 +1,363 @@
+"""
+Headless batch runner for the rumor spreading simulation.
+It only needs numpy, so it runs at full speed on machines without a display, and can be used from python:
+
+    from rumor_batch import run_batch
+    count_by_gen_per = run_batch(0.6, [0.25, 0.2, 0.3, 0.25], 7, 50, numruns=10)
+
+or from the command line:
+
+    python rumor_batch.py --p 0.6 --s4 0.25 --s3 0.2 --s2 0.3 --s1 0.25 --l 7 --generations 50 --runs 10
+
+Several values of --p and --l, and several --s sets of skepticism fractions, sweep over all their combinations,
+and the runs are spread over a pool of worker processes (--workers). --metrics streams the metrics record of every
+generation to a JSON lines file while the runs are made.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rumor_engine import ENGINES, GRID_SIZE, EnsembleEngine, LAYOUTS, child_seeds, populate_grid, seed_sequence
+from rumor_cache import ResultCache
+from rumor_store import ResultsStore
+
+
+def run_chunk(p_people, p_skepticism, L, generations, grid_size, layout_seed, run_seeds, engine='dense', layout='random',
+              tolerance=None):
+    """
+The run_chunk function builds the grid from its own random stream and runs the simulation once for every run seed.
+Every run draws from its own stream, so the result of a run does not depend on which process ran it or on the
+other runs it was batched with. It is the unit of work sent to the worker processes.
+
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations to simulate
+:param grid_size: The number of rows and columns of the grid
+:param layout_seed: The numpy SeedSequence the grid is built from
+:param run_seeds: A list with the numpy SeedSequence of every run
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:param tolerance: Stop a run once it grew by at most tolerance percentage points over L + 1 generations,
+                  None to stop only when the rumor reached a fixed point (see rumor_engine.GridEngine.settled)
+:return: A (len(run_seeds), generations + 1) array with the percentage of people that have the rumor in every generation
+"""
+    grid = populate_grid(p_people, p_skepticism, grid_size, np.random.default_rng(layout_seed), layout)
+    rngs = [np.random.default_rng(run_seed) for run_seed in run_seeds]
+    if ENGINES[engine] is EnsembleEngine:
+        # all the runs of the chunk are stepped together
+        return EnsembleEngine(grid, L, rngs).run(generations, tolerance)
+    engine = ENGINES[engine](grid, L)
+    count_by_gen_per = np.zeros((len(run_seeds), generations + 1))
+    for n, rng in enumerate(rngs):
+        engine.rng = rng
+        count_by_gen_per[n] = engine.run(generations, tolerance)
+    return count_by_gen_per
+
+
+def stream_runs(p_people, p_skepticism, L, generations, numruns=1, grid_size=GRID_SIZE, seed=None, engine='dense',
+                layout='random'):
+    """
+The stream_runs function makes the runs of run_batch in this process, and yields the metrics record of every
+generation (see rumor_engine.GridEngine.metrics) as soon as it is computed. The runs are the same as the runs of
+run_batch with the same seed, but nothing is kept in memory, and the caller may stop at any record.
+The runs follow each other, except on the ensemble engine, where all the runs step together and the records
+of a generation come run after run.
+
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations to simulate
+:param numruns: The number of runs
+:param grid_size: The number of rows and columns of the grid
+:param seed: An int or a numpy SeedSequence, a fresh one if None
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:return: A generator of the metrics records, each one with the index of its run
+"""
+    seed = seed_sequence(seed)
+    grid = populate_grid(p_people, p_skepticism, grid_size, np.random.default_rng(child_seeds(seed, 0, 1)[0]), layout)
+    rngs = [np.random.default_rng(run_seed) for run_seed in child_seeds(seed, 1, 1 + numruns)]
+    if ENGINES[engine] is EnsembleEngine:
+        for record in EnsembleEngine(grid, L, rngs).stream(generations):
+            for n in range(numruns):
+                yield dict({name: value if name == 'generation' else value[n] for name, value in record.items()}, run=n)
+        return
+    engine = ENGINES[engine](grid, L)
+    for n, rng in enumerate(rngs):
+        engine.rng = rng
+        for record in engine.stream(generations):
+            record['run'] = n
+            yield record
+
+
+def sweep_params(p_values, p_skepticism_values, l_values):
+    """
+The sweep_params function lists every combination of the given parameters, like the rows of average_count_by_gen.csv.
+
+:param p_values: The population densities
+:param p_skepticism_values: The skepticism fractions, each one a list of the s4, s3, s2 and s1 fractions
+:param l_values: The values of L
+:return: A list of (p_people, p_skepticism, L) tuples
+"""
+    return [(p, list(p_skepticism), l) for p in p_values for p_skepticism in p_skepticism_values for l in l_values]
+
+
+def run_configs(configs, config_seeds, generations, numruns=1, grid_size=GRID_SIZE, workers=None, engine='dense',
+                layout='random', cache=None, tolerance=None):
+    """
+The run_configs function runs numruns runs of every configuration, spread over a pool of worker processes.
+Every configuration builds its grid from the first stream spawned from its seed, and run n draws from stream n + 1,
+so the results are the same whatever the number of workers is, and the first runs of a configuration are the same
+whatever the number of runs is. With a cache, only the runs that are not in the cache yet are run.
+
+:param configs: A list of (p_people, p_skepticism, L) tuples
+:param config_seeds: A list with the numpy SeedSequence of every configuration
+:param generations: The number of generations to simulate
+:param numruns: The number of runs of every configuration
+:param grid_size: The number of rows and columns of the grid
+:param workers: The number of worker processes, os.cpu_count() if None, 1 runs everything in this process
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:param cache: A rumor_cache.ResultCache the runs are read from and saved to
+:param tolerance: The steady state tolerance of run_chunk, None to stop a run only at a fixed point
+:return: A list with the (numruns, generations + 1) array of every configuration
+"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = [np.zeros((0, generations + 1)) for _ in configs]
+    keys = [None] * len(configs)
+    if cache is not None:
+        for i, (config, config_seed) in enumerate(zip(configs, config_seeds)):
+            keys[i] = cache.key(config, config_seed, generations, grid_size, engine, layout, tolerance)
+            cached = cache.get(keys[i])
+            if cached is not None:
+                results[i] = cached[:numruns]
+    missing = sum(numruns - len(result) for result in results)
+    # split the missing runs into about 4 chunks per worker, to balance the load
+    chunk_size = max(1, -(-missing // (workers * 4)))
+    tasks, owners = [], []
+    for i, (config_seed, (p_people, p_skepticism, L)) in enumerate(zip(config_seeds, configs)):
+        layout_seed = child_seeds(config_seed, 0, 1)[0]
+        run_seeds = child_seeds(config_seed, 1 + len(results[i]), 1 + numruns)
+        for start in range(0, len(run_seeds), chunk_size):
+            tasks.append((p_people, p_skepticism, L, generations, grid_size, layout_seed, run_seeds[start:start + chunk_size],
+                          engine, layout, tolerance))
+            owners.append(i)
+    if workers == 1 or len(tasks) <= 1:
+        chunks = [run_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(run_chunk, *zip(*tasks)))
+    for i in sorted(set(owners)):
+        results[i] = np.concatenate([results[i]] + [chunk for owner, chunk in zip(owners, chunks) if owner == i])
+        if cache is not None:
+            cache.put(keys[i], results[i])
+    return results
+
+
+def sweep_seeds(seed, num_configs):
+    """
+The sweep_seeds function gives every configuration of a sweep its seed: the seed itself when there is only one
+configuration, so that a run of one configuration is the same as run_batch or Simulation with the same seed,
+and child i of the seed for configuration i otherwise.
+
+:param seed: A numpy SeedSequence
+:param num_configs: The number of configurations
+:return: A list of SeedSequence
+"""
+    return [seed] if num_configs == 1 else child_seeds(seed, 0, num_configs)
+
+
+def run_sweep(configs, generations, numruns=1, grid_size=GRID_SIZE, seed=None, workers=None, engine='dense',
+              layout='random', cache=None, tolerance=None):
+    """
+The run_sweep function runs numruns runs of every configuration, each configuration with its own seed (see sweep_seeds).
+
+:param configs: A list of (p_people, p_skepticism, L) tuples
+:param generations: The number of generations to simulate
+:param numruns: The number of runs of every configuration
+:param grid_size: The number of rows and columns of the grid
+:param seed: An int or a numpy SeedSequence, a fresh one if None
+:param workers: The number of worker processes, os.cpu_count() if None
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:param cache: A rumor_cache.ResultCache the runs are read from and saved to, unused without a seed
+:param tolerance: The steady state tolerance of run_chunk, None to stop a run only at a fixed point
+:return: A list with the (numruns, generations + 1) array of every configuration
+"""
+    if seed is None:
+        # the runs of a fresh seed are never asked for again
+        cache = None
+    seed = seed_sequence(seed)
+    return run_configs(configs, sweep_seeds(seed, len(configs)), generations, numruns, grid_size, workers, engine,
+                       layout, cache, tolerance)
+
+
+def run_batch(p_people, p_skepticism, L, generations, numruns=1, grid_size=GRID_SIZE, seed=None, workers=1,
+              engine='dense', layout='random', cache=None, tolerance=None):
+    """
+The run_batch function builds one grid and runs the simulation numruns times on it, like Simulation.run_simulation,
+but without a window, a plot, a CSV file or a frame rate limit. With the same seed it gives the same runs as
+Simulation(p_people, p_skepticism, generations, L, seed, grid_size, layout).run_simulation(numruns).
+
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations to simulate
+:param numruns: The number of runs
+:param grid_size: The number of rows and columns of the grid
+:param seed: An int or a numpy SeedSequence, a fresh one if None
+:param workers: The number of worker processes the runs are spread over
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:param cache: A rumor_cache.ResultCache the runs are read from and saved to, unused without a seed
+:param tolerance: The steady state tolerance of run_chunk, None to stop a run only at a fixed point
+:return: A (numruns, generations + 1) array with the percentage of people that have the rumor in every generation
+"""
+    return run_configs([(p_people, p_skepticism, L)], [seed_sequence(seed)], generations, numruns, grid_size, workers,
+                       engine, layout, None if seed is None else cache, tolerance)[0]
+
+
+def add_simulation_args(parser, sweep=(), grid=True, layout=True, tolerance=True):
+    """
+The add_simulation_args function adds the options of the simulation parameters every command line tool shares,
+so that their defaults and their help stay the same: --p, --s4, --s3, --s2, --s1, --l, --generations, --seed,
+and --grid-size, --layout and --tolerance. A tool changes a default with parser.set_defaults.
+
+:param parser: The argparse.ArgumentParser
+:param sweep: The destinations of the options that take several values to sweep over, among 'p', 'l' and 'grid_size'
+:param grid: Add --grid-size
+:param layout: Add --layout
+:param tolerance: Add --tolerance
+:return: Nothing
+"""
+    def values(dest, default):
+        # the options swept over take one or more values
+        return {'nargs': '+', 'default': [default]} if dest in sweep else {'default': default}
+
+    parser.add_argument("--p", type=float, **values('p', 0.6),
+                        help="population density, the fraction of the cells (or nodes) that have a person"
+                             + (" (several to sweep over)" if 'p' in sweep else ""))
+    parser.add_argument("--s4", type=float, default=0.25, help="fraction of people with skepticism s4")
+    parser.add_argument("--s3", type=float, default=0.2, help="fraction of people with skepticism s3")
+    parser.add_argument("--s2", type=float, default=0.3, help="fraction of people with skepticism s2")
+    parser.add_argument("--s1", type=float, default=0.25, help="fraction of people with skepticism s1")
+    parser.add_argument("--l", type=int, **values('l', 7), help="generations before re-transmission"
+                        + (" (several to sweep over)" if 'l' in sweep else ""))
+    parser.add_argument("--generations", type=int, default=50, help="number of generations to simulate")
+    if grid:
+        parser.add_argument("--grid-size", type=int, **values('grid_size', GRID_SIZE),
+                            help="number of rows and columns of the grid"
+                                 + (" (several to sweep over)" if 'grid_size' in sweep else ""))
+    if layout:
+        parser.add_argument("--layout", choices=LAYOUTS, default='random',
+                            help="initial layout of the levels of skepticism: random, or the most connected people "
+                                 "get s4 first (slow) or s1 first (fast)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the random streams")
+    if tolerance:
+        parser.add_argument("--tolerance", type=float, default=None,
+                            help="stop a run once it grew by at most this many percentage points over L + 1 "
+                                 "generations (the runs always stop once the rumor reached a fixed point)")
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the simulation parameters from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Run the rumor spreading simulation without a display.")
+    add_simulation_args(parser, sweep=('p', 'l'))
+    parser.add_argument("--s", type=float, nargs=4, action='append', default=None, metavar=('S4', 'S3', 'S2', 'S1'),
+                        help="skepticism fractions to sweep over, repeat it for every set (replaces --s4 to --s1)")
+    parser.add_argument("--runs", type=int, default=10, help="number of runs")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default='dense',
+                        help="whole-grid engine, frontier engine for large sparse grids, "
+                             "ensemble engine that steps all the runs of a chunk together, "
+                             "or bit-packed engine for huge grids")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes, all the cores by default")
+    parser.add_argument("--store", default=None, help="also append the results to the results store in this directory")
+    parser.add_argument("--cache", default=None, help="reuse and save the runs in the result cache in this directory")
+    parser.add_argument("--per-run", action="store_true", help="write every run instead of the average")
+    parser.add_argument("--metrics", default=None,
+                        help="make the runs in this process and stream the metrics of every generation to this "
+                             "JSON lines file (not with --cache or --tolerance)")
+    args = parser.parse_args(argv)
+    if args.tolerance is not None and args.store:
+        parser.error("the results store only keeps runs that were not stopped by --tolerance")
+    if args.cache and args.seed is None:
+        parser.error("--cache only reuses the runs of an explicit --seed")
+    if args.metrics and (args.cache or args.tolerance is not None):
+        parser.error("--metrics makes every generation of the runs in this process, without --cache or --tolerance")
+    return args
+
+
+def stream_configs(configs, config_seeds, args):
+    """
+The stream_configs function makes the runs of every configuration with stream_runs, and writes the metrics
+record of every generation to the file args.metrics as one JSON object per line, with the parameters of the run.
+
+:param configs: A list of (p_people, p_skepticism, L) tuples
+:param config_seeds: A list with the numpy SeedSequence of every configuration
+:param args: The parsed command line arguments
+:return: A list with the (runs, generations + 1) array of every configuration
+"""
+    results = []
+    with open(args.metrics, 'w') as file:
+        for (p_people, p_skepticism, L), config_seed in zip(configs, config_seeds):
+            count_by_gen_per = np.zeros((args.runs, args.generations + 1))
+            params = {'P': p_people, 'S4': p_skepticism[0], 'S3': p_skepticism[1], 'S2': p_skepticism[2],
+                      'S1': p_skepticism[3], 'L': L}
+            for record in stream_runs(p_people, p_skepticism, L, args.generations, args.runs, args.grid_size,
+                                      config_seed, args.engine, args.layout):
+                count_by_gen_per[record['run'], record['generation']] = record['percent']
+                file.write(json.dumps(dict(params, **record), default=lambda value: value.tolist()) + '\n')
+            results.append(count_by_gen_per)
+    return results
+
+
+def main(argv=None):
+    """
+The main function runs the sweep given on the command line and writes the percentage of people
+that have the rumor per generation of every configuration to stdout as CSV. The Seed and Spawn key columns give
+the seed of the row: run_batch(..., seed=np.random.SeedSequence(seed, spawn_key=spawn_key)) makes its runs again,
+and with one configuration the spawn key is empty and run_batch(..., seed=seed) makes them.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    configs = sweep_params(args.p, args.s or [[args.s4, args.s3, args.s2, args.s1]], args.l)
+    seed = seed_sequence(args.seed)
+    seeds = sweep_seeds(seed, len(configs))
+    cache = ResultCache(args.cache) if args.cache else None
+    if args.metrics:
+        results = stream_configs(configs, seeds, args)
+    else:
+        results = run_configs(configs, seeds, args.generations, args.runs, args.grid_size, args.workers,
+                              args.engine, args.layout, cache, args.tolerance)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['Seed', 'Spawn key', 'P', 'S4', 'S3', 'S2', 'S1', 'L', 'Run'] + [f'Generation {i}' for i in range(args.generations + 1)])
+    store = ResultsStore(args.store) if args.store else None
+    for (p_people, p_skepticism, L), config_seed, count_by_gen_per in zip(configs, seeds, results):
+        if store is not None:
+            store.append(count_by_gen_per, config_seed, p_people=p_people, p_skepticism=p_skepticism, L=L,
+                         grid_size=args.grid_size, layout=args.layout, engine=args.engine)
+        params = [config_seed.entropy, ' '.join(map(str, config_seed.spawn_key)), p_people] + p_skepticism + [L]
+        if args.per_run:
+            for n, count_by_gen in enumerate(count_by_gen_per):
+                writer.writerow(params + [n] + list(count_by_gen))
+        else:
+            writer.writerow(params + ['average'] + list(count_by_gen_per.mean(axis=0)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmarks of the hot paths of the rumor spreading simulation: building the grid (Simulation.__init__), arranging
+the levels of skepticism (arrange_board_slow and arrange_board_fast), a single generation (GridEngine.step) and
+whole batches of runs (run_batch). Every case is run on a sweep of grid sizes and densities, and on every engine
+given, so the engines can be compared with each other. The results are written as JSON:
+
+    python rumor_bench.py --grid-size 100 400 --p 0.3 0.6 --engine dense frontier ensemble --output bench.json
+
+Every case reports its best time over --repeat repetitions, its throughput (cell updates per second for the
+generations, runs per second for the batches, cells per second for the grid) and the peak memory it allocated.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from rumor_batch import add_simulation_args, run_batch
+from rumor_engine import ENGINE_VERSION, ENGINES, EnsembleEngine, arrange_grid, populate_grid
+
+
+def best_time(func, repeat):
+    """
+The best_time function times func, and keeps the fastest of repeat calls, the one least disturbed by the machine.
+
+:param func: The function to time, called without arguments
+:param repeat: The number of calls
+:return: The time of the fastest call, in seconds
+"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(func):
+    """
+The peak_memory function measures the largest amount of memory allocated at once while func runs.
+numpy reports its arrays to tracemalloc, so the state arrays of the engines are included.
+
+:param func: The function to measure, called without arguments
+:return: The peak of the allocated memory, in bytes
+"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(name, func, repeat, work, unit, **params):
+    """
+The bench_case function times one case and measures its memory, in separate calls so that tracemalloc does not
+slow down the timed calls.
+
+:param name: The name of the case
+:param func: The function to benchmark, called without arguments
+:param repeat: The number of timed calls
+:param work: The amount of work one call does, in units
+:param unit: The unit of the throughput
+:param params: The parameters of the case, saved with its result
+:return: A dict with the parameters, the best time, the throughput and the peak memory of the case
+"""
+    seconds = best_time(func, repeat)
+    return dict(params, case=name, seconds=seconds, throughput=work / seconds if seconds > 0 else float('inf'),
+                unit=unit, peak_bytes=peak_memory(func))
+
+
+def step_all(engine, generations):
+    """
+The step_all function runs generations generations of one simulation, without stopping at a fixed point,
+so every engine does the same number of steps.
+
+:param engine: The engine to step
+:param generations: The number of generations
+:return: Nothing
+"""
+    engine.reset()
+    engine.start(*engine.select_random_cell())
+    for _ in range(generations):
+        engine.step()
+
+
+def bench_grid(grid_size, p_people, p_skepticism, L, engines, generations, numruns, repeat, seed):
+    """
+The bench_grid function runs every case on one grid size and density.
+
+:param grid_size: The number of rows and columns of the grid
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param engines: The names of the engines in rumor_engine.ENGINES to compare
+:param generations: The number of generations of the step and run cases
+:param numruns: The number of runs of the run cases
+:param repeat: The number of timed calls of every case
+:param seed: The seed of the grid and of the runs
+:return: A list with the result of every case
+"""
+    cells = grid_size * grid_size
+    params = {'grid_size': grid_size, 'p_people': p_people, 'L': L}
+    results = [bench_case('init', lambda: populate_grid(p_people, p_skepticism, grid_size, np.random.default_rng(seed)),
+                          repeat, cells, 'cells/s', **params)]
+    grid = populate_grid(p_people, p_skepticism, grid_size, np.random.default_rng(seed))
+    for layout in ('slow', 'fast'):
+        results.append(bench_case(f'arrange_{layout}', lambda: arrange_grid(grid.copy(), p_skepticism, layout),
+                                  repeat, cells, 'cells/s', **params))
+    for name in engines:
+        if ENGINES[name] is EnsembleEngine:
+            rngs = [np.random.default_rng([seed, n]) for n in range(numruns)]
+            engine = EnsembleEngine(grid, L, rngs)
+            work = cells * generations * numruns
+        else:
+            engine = ENGINES[name](grid, L, np.random.default_rng(seed))
+            work = cells * generations
+        results.append(bench_case('step', lambda: step_all(engine, generations), repeat, work, 'cell-updates/s',
+                                  engine=name, generations=generations, **params))
+        results.append(bench_case('runs', lambda: run_batch(p_people, p_skepticism, L, generations, numruns, grid_size,
+                                                            seed, engine=name),
+                                  repeat, numruns, 'runs/s', engine=name, generations=generations, runs=numruns,
+                                  **params))
+    # compare the throughput of every engine with the one of the first engine
+    baseline = {result['case']: result['throughput'] for result in results if result.get('engine') == engines[0]}
+    for result in results:
+        if 'engine' in result:
+            result['speedup'] = result['throughput'] / baseline[result['case']]
+    return results
+
+
+def run_benchmarks(grid_sizes, p_values, p_skepticism, L, engines, generations, numruns, repeat, seed):
+    """
+The run_benchmarks function runs every case on every combination of grid size and density.
+
+:param grid_sizes: The grid sizes to sweep over
+:param p_values: The population densities to sweep over
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param engines: The names of the engines to compare, the first one is the baseline of the speedups
+:param generations: The number of generations of the step and run cases
+:param numruns: The number of runs of the run cases
+:param repeat: The number of timed calls of every case
+:param seed: The seed of the grids and of the runs
+:return: A dict with the machine, the settings and the results of the benchmarks
+"""
+    results = []
+    for grid_size in grid_sizes:
+        for p_people in p_values:
+            results += bench_grid(grid_size, p_people, p_skepticism, L, engines, generations, numruns, repeat, seed)
+    return {
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                    'processor': platform.processor()},
+        'engine_version': ENGINE_VERSION,
+        'settings': {'p_skepticism': list(p_skepticism), 'L': L, 'engines': list(engines), 'generations': generations,
+                     'runs': numruns, 'repeat': repeat, 'seed': seed},
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the benchmark settings from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Benchmark the rumor spreading simulation.")
+    add_simulation_args(parser, sweep=('p', 'grid_size'), layout=False, tolerance=False)
+    # the benchmarks compare sizes and densities, with a fixed seed so every run of them times the same runs
+    parser.set_defaults(grid_size=[100, 400], p=[0.3, 0.6], seed=0)
+    parser.add_argument("--engine", choices=sorted(ENGINES), nargs='+', default=['dense'],
+                        help="engines to compare, the first one is the baseline")
+    parser.add_argument("--runs", type=int, default=10, help="number of runs of the batch cases")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed calls of every case")
+    parser.add_argument("--output", default=None, help="write the JSON results to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+The main function runs the benchmarks given on the command line and writes their results as JSON.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    report = run_benchmarks(args.grid_size, args.p, [args.s4, args.s3, args.s2, args.s1], args.l, args.engine,
+                            args.generations, args.runs, args.repeat, args.seed)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
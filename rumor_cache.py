@@ -0,0 +1,136 @@
+"""
+On-disk cache of the per-run series of the rumor spreading simulation.
+An entry holds the runs of one configuration, and its name is a hash of the parameters, of the engine version and
+of the seed, so a run is never computed twice. The runs of a seed always come in the same order, so when more runs
+are asked for, an entry is topped up with the extra runs only (see rumor_batch.run_configs). Only the runs of an
+explicit seed are cached: a fresh seed is never asked for again.
+The cache is bounded in size: when it grows over max_bytes, the least recently used entries are removed.
+
+    cache = ResultCache('cache')
+    count_by_gen_per = run_batch(0.6, [0.25, 0.2, 0.3, 0.25], 7, 50, numruns=100, seed=1, cache=cache)
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import warnings
+
+import numpy as np
+
+from rumor_engine import ENGINE_VERSION
+from rumor_store import params_canonical, params_row
+
+# the default directory of the cache
+CACHE_DIR = 'cache'
+# the default size bound of the cache, in bytes
+CACHE_MAX_BYTES = 1 << 30
+
+
+class ResultCache:
+    def __init__(self, path=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        """
+    The __init__ function opens the cache in the directory path, and creates the directory if needed.
+
+    :param self: Represent the instance of the class
+    :param path: The directory of the cache
+    :param max_bytes: The size the cache is kept under
+    :return: The cache
+    """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    def key(self, config, seed, generations, grid_size, engine, layout, tolerance=None):
+        """
+    The key function hashes everything the runs of a configuration depend on.
+
+    :param self: Represent the instance of the class
+    :param config: A (p_people, p_skepticism, L) tuple
+    :param seed: The numpy SeedSequence of the configuration
+    :param generations: The number of generations simulated
+    :param grid_size: The number of rows and columns of the grid
+    :param engine: The name of the engine the runs ran on
+    :param layout: The initial layout of the levels of skepticism
+    :param tolerance: The steady state tolerance the runs stopped with, None if they only stopped at a fixed point
+    :return: A hex string
+    """
+        p_people, p_skepticism, L = config
+        row = params_row(p_people, p_skepticism, L, generations, grid_size, layout, engine)
+        canonical = params_canonical(row)
+        canonical += f',version={ENGINE_VERSION},seed={seed.entropy!r},spawn_key={tuple(seed.spawn_key)!r}'
+        if tolerance is not None:
+            canonical += f',tolerance={float(tolerance)!r}'
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def filename(self, key):
+        """
+    The filename function returns the path of an entry.
+
+    :param self: Represent the instance of the class
+    :param key: The key of the entry
+    :return: The path of the entry
+    """
+        return os.path.join(self.path, f'{key}.npy')
+
+    def get(self, key):
+        """
+    The get function reads an entry, and marks it as recently used.
+
+    :param self: Represent the instance of the class
+    :param key: The key of the entry
+    :return: The (runs, generations + 1) array of the entry, None if it is not in the cache
+    """
+        filename = self.filename(key)
+        try:
+            count_by_gen_per = np.load(filename)
+            os.utime(filename)
+        except (FileNotFoundError, ValueError):
+            return None
+        return count_by_gen_per
+
+    def put(self, key, count_by_gen_per):
+        """
+    The put function writes an entry, replacing the former one, and evicts the least recently used entries
+    if the cache grew over its size bound. The entry is written under a temporary name and renamed when it is complete.
+    The new entry itself is never evicted, an entry larger than the size bound is kept with a warning.
+
+    :param self: Represent the instance of the class
+    :param key: The key of the entry
+    :param count_by_gen_per: The (runs, generations + 1) array of the runs
+    :return: Nothing
+    """
+        filename = self.filename(key)
+        with tempfile.NamedTemporaryFile(dir=self.path, suffix='.tmp', delete=False) as tmp:
+            np.save(tmp, np.asarray(count_by_gen_per, dtype=float))
+        os.replace(tmp.name, filename)
+        size = os.path.getsize(filename)
+        if size > self.max_bytes:
+            warnings.warn(f"the cache entry {filename} takes {size} bytes, over the size bound of {self.max_bytes}")
+        self.evict(keep=filename)
+
+    def evict(self, keep=None):
+        """
+    The evict function removes the least recently used entries until the cache is under its size bound.
+
+    :param self: Represent the instance of the class
+    :param keep: The path of an entry that is never removed, None to remove any entry
+    :return: Nothing
+    """
+        entries = []
+        for filename in glob.glob(os.path.join(self.path, '*.npy')):
+            if filename == keep:
+                continue
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+        size = sum(entry[1] for entry in entries) + (os.path.getsize(keep) if keep is not None else 0)
+        for _, entry_size, filename in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
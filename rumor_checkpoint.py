@@ -0,0 +1,347 @@
+"""
+Checkpoints of the rumor spreading simulation. A checkpoint is a directory with the whole state of a batch of runs
+at one generation: the grid, one .npy file per state array of the engine (see rumor_engine.GridEngine.snapshot),
+the runs made so far, and a state.json file with the counters, the state of the random generators and the
+parameters. The arrays are memory-mapped copy-on-write when the checkpoint is loaded, so a restore reads only
+the pages a generation touches, and any number of engines may go on from the same files.
+
+A preempted batch goes on from its last checkpoint, and gives the same runs as an uninterrupted one:
+
+    python rumor_checkpoint.py --checkpoint state --every 100 --grid-size 5000 --generations 1000 --runs 10
+    python rumor_checkpoint.py --checkpoint state
+
+and many "what if" continuations branch from one warm state without replaying the generations before it:
+
+    count_by_gen_per = Checkpoint('state').branch(child_seeds(seed_sequence(1), 0, 100))
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from rumor_batch import add_simulation_args
+from rumor_engine import ENGINE_VERSION, ENGINES, EnsembleEngine, GRID_SIZE, child_seeds, populate_grid, seed_sequence
+
+# the version of the layout of the checkpoint directories
+CHECKPOINT_VERSION = 1
+
+
+def engine_name(engine):
+    """
+The engine_name function returns the name of an engine in rumor_engine.ENGINES.
+
+:param engine: The engine
+:return: The name of its class in ENGINES
+"""
+    for name, engine_class in ENGINES.items():
+        if type(engine) is engine_class:
+            return name
+    raise ValueError(f"{type(engine).__name__} is not an engine of rumor_engine.ENGINES")
+
+
+def checkpoint_dir(path):
+    """
+The checkpoint_dir function finds the directory of the last complete checkpoint of path. save_checkpoint moves the
+former checkpoint to path.old before it renames the new one to path, so a job killed between the two renames
+leaves its checkpoint in path.old.
+
+:param path: The directory of the checkpoint
+:return: path or path.old, None if neither holds a checkpoint
+"""
+    for directory in (path, f'{path}.old'):
+        if os.path.exists(os.path.join(directory, 'state.json')):
+            return directory
+    return None
+
+
+def save_checkpoint(path, engine, count_by_gen_per, run=0, params=None):
+    """
+The save_checkpoint function writes the state of a batch of runs to the directory path. The directory is written
+under a temporary name and renamed when it is complete, so a job killed while it saves keeps its former checkpoint
+(see checkpoint_dir).
+
+:param path: The directory of the checkpoint, replaced if it exists
+:param engine: The engine of the current run
+:param count_by_gen_per: The (runs, generations + 1) array of the runs, filled up to the current generation of the current run
+:param run: The index of the current run, the number of runs when they are all over
+:param params: A dict with the parameters of the runs, saved with the checkpoint (JSON values)
+:return: Nothing
+"""
+    state = engine.snapshot()
+    tmp = f'{path}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, 'grid.npy'), engine.grid)
+    np.save(os.path.join(tmp, 'count_by_gen_per.npy'), np.asarray(count_by_gen_per, dtype=float))
+    for name in engine.STATE_ARRAYS:
+        np.save(os.path.join(tmp, f'{name}.npy'), state.pop(name))
+    counters = {name: np.asarray(state.pop(name)).tolist() for name in engine.STATE_COUNTERS}
+    info = {'version': CHECKPOINT_VERSION, 'engine_version': ENGINE_VERSION, 'engine': engine_name(engine),
+            'L': engine.l, 'run': run, 'counters': counters, 'rng': state['rng'], 'params': params or {}}
+    with open(os.path.join(tmp, 'state.json'), 'w') as file:
+        json.dump(info, file, indent=1)
+    old = f'{path}.old'
+    if os.path.exists(path):
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(path, old)
+    os.replace(tmp, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class Checkpoint:
+    def __init__(self, path, mmap=True):
+        """
+    The __init__ function opens a checkpoint written by save_checkpoint, from path.old if a save was interrupted.
+
+    :param self: Represent the instance of the class
+    :param path: The directory of the checkpoint
+    :param mmap: Memory-map the arrays copy-on-write instead of reading them
+    :return: The checkpoint
+    """
+        self.path = checkpoint_dir(path)
+        if self.path is None:
+            raise FileNotFoundError(f"there is no checkpoint in {path}")
+        self.mmap_mode = 'c' if mmap else None
+        with open(os.path.join(self.path, 'state.json')) as file:
+            self.info = json.load(file)
+        if self.info['version'] != CHECKPOINT_VERSION or self.info['engine_version'] != ENGINE_VERSION:
+            raise ValueError(f"{path} was written by another version of the simulation")
+        self.run = self.info['run']
+        self.params = self.info['params']
+        self.grid = self.load('grid')
+        self.count_by_gen_per = np.array(self.load('count_by_gen_per'))
+        self.generation_progress = self.info['counters']['generation_progress']
+
+    def load(self, name):
+        """
+    The load function loads one array of the checkpoint.
+
+    :param self: Represent the instance of the class
+    :param name: The name of the array
+    :return: The array, memory-mapped copy-on-write unless the checkpoint was opened without mmap
+    """
+        return np.asarray(np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode=self.mmap_mode))
+
+    @property
+    def done(self):
+        """
+    The done property tells if all the runs of the checkpoint are over.
+
+    :param self: Represent the instance of the class
+    :return: True if there is no run left
+    """
+        return self.run >= (1 if self.info['engine'] == 'ensemble' else len(self.count_by_gen_per))
+
+    def engine(self, adjacency=None):
+        """
+    The engine function builds an engine in the state of the current run of the checkpoint. Every call maps the
+    state arrays again, so the engines do not share their changes.
+
+    :param self: Represent the instance of the class
+    :param adjacency: The network of the graph engine (see rumor_engine.GraphEngine), which is not saved in the checkpoint
+    :return: The engine, with the random generators of the current run
+    """
+        name = self.info['engine']
+        rngs = [np.random.default_rng() for _ in self.info['rng']]
+        if name == 'ensemble':
+            engine = EnsembleEngine(self.grid, self.info['L'], rngs)
+        elif name == 'graph':
+            if adjacency is None:
+                raise ValueError("the network of a graph engine checkpoint has to be given")
+            engine = ENGINES[name](self.grid, self.info['L'], rngs[0], adjacency)
+        else:
+            engine = ENGINES[name](self.grid, self.info['L'], rngs[0])
+        state = {name: self.load(name) for name in engine.STATE_ARRAYS}
+        state.update(self.info['counters'], rng=self.info['rng'])
+        engine.restore(state, copy=self.mmap_mode is None)
+        return engine
+
+    def count_by_gen(self):
+        """
+    The count_by_gen function returns the series of the current run up to the generation of the checkpoint.
+
+    :param self: Represent the instance of the class
+    :return: A list with the percentage of people that have the rumor in every generation so far
+             (an array with one value per replica for the ensemble engine)
+    """
+        if self.info['engine'] == 'ensemble':
+            return list(self.count_by_gen_per[:, :self.generation_progress + 1].T)
+        return list(self.count_by_gen_per[self.run, :self.generation_progress + 1])
+
+    def branch(self, seeds, generations=None, tolerance=None, adjacency=None):
+        """
+    The branch function runs the current run of the checkpoint on to its end once for every seed, every continuation
+    drawing from its own random stream from the generation of the checkpoint on.
+
+    :param self: Represent the instance of the class
+    :param seeds: A list of ints or numpy SeedSequence, one per continuation
+    :param generations: The number of generations to simulate, the one of the checkpoint if None
+    :param tolerance: The steady state tolerance of rumor_engine.GridEngine.settled, None to stop only at a fixed point
+    :param adjacency: The network of a graph engine checkpoint
+    :return: A (len(seeds), generations + 1) array with the percentage of people that have the rumor in every generation
+    """
+        if self.info['engine'] == 'ensemble' or self.done:
+            raise ValueError("only the current run of a single run engine can be branched")
+        generations = self.count_by_gen_per.shape[1] - 1 if generations is None else generations
+        count_by_gen_per = np.zeros((len(seeds), generations + 1))
+        for n, seed in enumerate(seeds):
+            engine = self.engine(adjacency)
+            engine.rng = np.random.default_rng(seed)
+            count_by_gen_per[n] = engine.resume(self.count_by_gen()[:generations + 1], generations, tolerance)[:generations + 1]
+        return count_by_gen_per
+
+
+def run_checkpointed(engine, count_by_gen_per, run_seeds, path, every, run=0, resumed=False, tolerance=None,
+                     params=None):
+    """
+The run_checkpointed function makes the runs of a batch on one engine, and saves a checkpoint every few
+generations of every run and when the batch is over. The ensemble engine makes all its runs at once.
+
+:param engine: The engine
+:param count_by_gen_per: The (runs, generations + 1) array the runs are written to
+:param run_seeds: A list with the numpy SeedSequence of every run
+:param path: The directory of the checkpoint
+:param every: The number of generations between two checkpoints
+:param run: The index of the first run to make
+:param resumed: The engine is in the state of run, which goes on from its current generation instead of starting
+:param tolerance: The steady state tolerance of rumor_engine.GridEngine.settled, None to stop only at a fixed point
+:param params: A dict with the parameters of the runs, saved with the checkpoints
+:return: The array count_by_gen_per
+"""
+    ensemble = isinstance(engine, EnsembleEngine)
+    generations = count_by_gen_per.shape[1] - 1
+    numruns = 1 if ensemble else len(run_seeds)
+    for n in range(run, numruns):
+        if resumed:
+            rows = count_by_gen_per[:, :engine.generation_progress + 1].T if ensemble else \
+                count_by_gen_per[n, :engine.generation_progress + 1]
+            count_by_gen = list(rows)
+            resumed = False
+        else:
+            if ensemble:
+                engine.rngs = [np.random.default_rng(run_seed) for run_seed in run_seeds]
+            else:
+                engine.rng = np.random.default_rng(run_seeds[n])
+            engine.reset()
+            engine.start(*engine.select_random_cell())
+            count_by_gen = [engine.percent()]
+        while True:
+            count_by_gen = engine.resume(count_by_gen, generations, tolerance, engine.generation_progress + every)
+            if ensemble:
+                count_by_gen_per[:, :len(count_by_gen)] = np.array(count_by_gen).T
+            else:
+                count_by_gen_per[n, :len(count_by_gen)] = count_by_gen
+            if len(count_by_gen) > generations:
+                break
+            save_checkpoint(path, engine, count_by_gen_per, n, params)
+    save_checkpoint(path, engine, count_by_gen_per, numruns, params)
+    return count_by_gen_per
+
+
+def run_batch_checkpointed(path, every, p_people, p_skepticism, L, generations, numruns=1, grid_size=GRID_SIZE,
+                           seed=None, engine='dense', layout='random', tolerance=None):
+    """
+The run_batch_checkpointed function makes the runs of rumor_batch.run_batch in this process, with the same seeds
+and results, and saves a checkpoint to path every few generations. If path holds a checkpoint, the batch goes on
+from it instead, with the parameters saved in it.
+
+:param path: The directory of the checkpoint
+:param every: The number of generations between two checkpoints
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations to simulate
+:param numruns: The number of runs
+:param grid_size: The number of rows and columns of the grid
+:param seed: An int or a numpy SeedSequence, a fresh one if None
+:param engine: The name of the engine in rumor_engine.ENGINES the generations run on (not the graph engine)
+:param layout: The initial layout of the levels of skepticism, one of rumor_engine.LAYOUTS
+:param tolerance: The steady state tolerance of rumor_engine.GridEngine.settled, None to stop only at a fixed point
+:return: A (numruns, generations + 1) array with the percentage of people that have the rumor in every generation
+"""
+    if checkpoint_dir(path) is not None:
+        return resume_batch(path, every)
+    seed = seed_sequence(seed)
+    params = {'p_people': p_people, 'p_skepticism': list(p_skepticism), 'L': L, 'generations': generations,
+              'numruns': numruns, 'grid_size': grid_size, 'seed': str(seed.entropy), 'spawn_key': list(seed.spawn_key),
+              'layout': layout, 'tolerance': tolerance}
+    grid = populate_grid(p_people, p_skepticism, grid_size, np.random.default_rng(child_seeds(seed, 0, 1)[0]), layout)
+    run_seeds = child_seeds(seed, 1, 1 + numruns)
+    if ENGINES[engine] is EnsembleEngine:
+        engine = EnsembleEngine(grid, L, [np.random.default_rng(run_seed) for run_seed in run_seeds])
+    else:
+        engine = ENGINES[engine](grid, L)
+    return run_checkpointed(engine, np.zeros((numruns, generations + 1)), run_seeds, path, every,
+                            tolerance=tolerance, params=params)
+
+
+def resume_batch(path, every):
+    """
+The resume_batch function makes the rest of the runs of a batch from its checkpoint.
+
+:param path: The directory of the checkpoint written by run_batch_checkpointed
+:param every: The number of generations between two checkpoints
+:return: A (numruns, generations + 1) array with the percentage of people that have the rumor in every generation
+"""
+    checkpoint = Checkpoint(path)
+    if checkpoint.done:
+        return checkpoint.count_by_gen_per
+    params = checkpoint.params
+    seed = np.random.SeedSequence(int(params['seed']), spawn_key=tuple(params['spawn_key']))
+    run_seeds = child_seeds(seed, 1, 1 + params['numruns'])
+    return run_checkpointed(checkpoint.engine(), checkpoint.count_by_gen_per, run_seeds, path, every, checkpoint.run,
+                            resumed=True, tolerance=params['tolerance'], params=params)
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the checkpoint and the simulation parameters from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Run the rumor spreading simulation with checkpoints, or resume it.")
+    parser.add_argument("--checkpoint", required=True, help="directory of the checkpoint, resumed if it exists")
+    parser.add_argument("--every", type=int, default=100, help="number of generations between two checkpoints")
+    add_simulation_args(parser)
+    parser.add_argument("--runs", type=int, default=10, help="number of runs")
+    parser.add_argument("--engine", choices=sorted(set(ENGINES) - {'graph'}), default='dense', help="engine")
+    parser.add_argument("--branch", type=int, default=0,
+                        help="instead of resuming, run the current run of the checkpoint on this many times with "
+                             "fresh random streams, spawned from --seed")
+    parser.add_argument("--per-run", action="store_true", help="write every run instead of the average")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+The main function runs, resumes or branches the batch given on the command line, and writes the percentage of
+people that have the rumor per generation to stdout as CSV.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    if args.branch:
+        count_by_gen_per = Checkpoint(args.checkpoint).branch(child_seeds(seed_sequence(args.seed), 0, args.branch),
+                                                              tolerance=args.tolerance)
+    else:
+        count_by_gen_per = run_batch_checkpointed(args.checkpoint, args.every, args.p,
+                                                  [args.s4, args.s3, args.s2, args.s1], args.l, args.generations,
+                                                  args.runs, args.grid_size, args.seed, args.engine, args.layout,
+                                                  args.tolerance)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['Run'] + [f'Generation {i}' for i in range(count_by_gen_per.shape[1])])
+    if args.per_run:
+        for n, count_by_gen in enumerate(count_by_gen_per):
+            writer.writerow([n] + list(count_by_gen))
+    else:
+        writer.writerow(['average'] + list(count_by_gen_per.mean(axis=0)))
+
+
+if __name__ == '__main__':
+    main()
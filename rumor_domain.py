@@ -0,0 +1,363 @@
+"""
+Domain decomposition of one huge grid of the rumor spreading simulation over several processes. The grid is split
+into strips of rows, and every worker process steps its own strip of the state arrays, which live in
+multiprocessing.shared_memory so every process sees them. A generation has three phases separated by barriers:
+the workers count down their cooldowns and find their transmitters, then draw their transmissions, and then pull
+the transmissions of their strip and of the row above and below it (the halo, with the toroidal wrap of the grid)
+onto their receivers.
+Every worker draws its random numbers at its own offset in the random stream of the run (PCG64 can jump ahead),
+so the runs are the same as the runs of rumor_engine.GridEngine with the same generator, whatever the number
+of strips is.
+
+    with DomainEngine(grid, 7, np.random.default_rng(1), workers=8) as engine:
+        count_by_gen = engine.run(100)
+
+or from the command line, for the first run of Simulation(p, ..., seed=...):
+
+    python rumor_domain.py --grid-size 20000 --workers 8 --generations 100 --seed 1
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import sys
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from rumor_batch import add_simulation_args
+from rumor_engine import (CAN_TRANSMIT, EMPTY, NEIGHBOR_OFFSETS, SKEPTICISM_LEVELS, TRANSMISSION_P, GridEngine,
+                          child_seeds, populate_grid, seed_sequence)
+
+# the commands of the control array, read by the workers at the start of every generation
+STOP = 0
+STEP = 1
+FORCED_STEP = 2
+# the control array holds the command, the generation, and the state and the increment of the PCG64 generator
+# as high and low 64-bit words
+CONTROL_SIZE = 6
+MASK_64 = (1 << 64) - 1
+
+
+def shared_array(shape, dtype, name=None):
+    """
+The shared_array function creates an array in a new block of shared memory, or attaches to an existing block.
+
+:param shape: The shape of the array
+:param dtype: The dtype of the array
+:param name: The name of the block to attach to, None to create a new block
+:return: The SharedMemory block and the array on it
+"""
+    size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+    block = shared_memory.SharedMemory(name=name, create=name is None, size=size if name is None else 0)
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def strip_bounds(rows, workers):
+    """
+The strip_bounds function splits the rows of the grid into strips of about the same height.
+
+:param rows: The number of rows of the grid
+:param workers: The number of strips
+:return: A list of (first row, row after the last) pairs
+"""
+    bounds = np.linspace(0, rows, workers + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def work_strip(strip, bounds, specs, L, start_barrier, end_barrier, phase_barrier):
+    """
+The work_strip function is the loop of a worker process: it steps its strip of the grid every generation,
+until it reads the STOP command.
+
+:param strip: The index of the strip of the worker
+:param bounds: The list of the (first row, row after the last) pairs of all the strips
+:param specs: A dict with the (block name, shape, dtype) of every shared array
+:param L: The number of generations a person waits before transmitting the rumor again
+:param start_barrier: The barrier of the workers and of the engine at the start of a generation
+:param end_barrier: The barrier of the workers and of the engine at the end of a generation
+:param phase_barrier: The barrier of the workers between the phases of a generation
+:return: Nothing
+"""
+    blocks, arrays = [], {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block, arrays[name] = shared_array(shape, dtype, block_name)
+        blocks.append(block)
+    grid, control, counts, stats = arrays['grid'], arrays['control'], arrays['counts'], arrays['stats']
+    first, last = bounds[strip]
+    rows = grid.shape[0]
+    height = last - first
+    # the rows of the strip with the row above it and the row below it, around the torus
+    halo = np.arange(first - 1, last + 1) % rows
+    own = slice(first, last)
+    occupied = grid[halo] != EMPTY
+    bit_generator = np.random.PCG64()
+    try:
+        while True:
+            start_barrier.wait()
+            command, generation = int(control[0]), int(control[1])
+            if command == STOP:
+                return
+            forced = command == FORCED_STEP
+            received_rumor, l_left = arrays['received_rumor'][own], arrays['l_left'][own]
+            decreased = arrays['skepticism_level_decreased'][own]
+            # phase 1: the cooldowns, the transmitters and the neighbors every transmitter may pass the rumor to
+            level = grid[own] - decreased.view(np.int8)
+            if forced:
+                transmitters = received_rumor.copy()
+            else:
+                np.subtract(l_left, 1, out=l_left, where=l_left > 0)
+                transmitters = received_rumor & (l_left == 0) & CAN_TRANSMIT[level]
+            successes = []
+            for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+                # success[x, y] means (x, y) may pass the rumor to (x + dx, y + dy)
+                success = transmitters & np.roll(occupied[1 + dx:1 + dx + height], -dy, axis=1)
+                counts[k, strip] = np.count_nonzero(success)
+                successes.append(success)
+            phase_barrier.wait()
+            # phase 2: the draws, at the offset of the strip in the stream of the generation
+            transmitted = np.zeros(transmitters.shape, dtype=bool)
+            success_bits = np.zeros(transmitters.shape, dtype=np.uint8)
+            if not forced:
+                words = [int(word) for word in control[2:CONTROL_SIZE]]
+                bit_generator.state = {'bit_generator': 'PCG64',
+                                       'state': {'state': words[0] << 64 | words[1], 'inc': words[2] << 64 | words[3]},
+                                       'has_uint32': 0, 'uinteger': 0}
+                rng = np.random.Generator(bit_generator)
+                position = 0
+            for k, success in enumerate(successes):
+                if not forced:
+                    offset = int(counts[:k].sum() + counts[k, :strip].sum())
+                    bit_generator.advance(offset - position)
+                    prob = TRANSMISSION_P[level[success]]
+                    success[success] = rng.random(int(counts[k, strip])) < prob
+                    position = offset + int(counts[k, strip])
+                transmitted |= success
+                success_bits |= success.view(np.uint8) << np.uint8(k)
+            l_left[transmitted] = L
+            arrays['success_bits'][own] = success_bits
+            stats[strip, 0] = np.count_nonzero(transmitters)
+            phase_barrier.wait()
+            # phase 3: the transmissions of the strip and of its halo rows onto their receivers
+            success_bits = arrays['success_bits'][halo]
+            hits = np.zeros(transmitters.shape, dtype=np.uint8)
+            for k, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+                hits += np.roll((success_bits[1 - dx:1 - dx + height] >> np.uint8(k)) & np.uint8(1), dy, axis=1)
+            received = hits > 0
+            stats[strip, 1] = np.count_nonzero(received & ~received_rumor)
+            received_rumor |= received
+            arrays['generation_received'][own][received] = generation
+            decreased[...] = (hits >= 2) & (grid[own] > SKEPTICISM_LEVELS['s1'])
+            end_barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    except BaseException:
+        # break the barriers, so the engine and the other workers do not wait for this worker forever
+        for barrier in (start_barrier, end_barrier, phase_barrier):
+            barrier.abort()
+        raise
+    finally:
+        del grid, control, counts, stats, arrays
+        for block in blocks:
+            block.close()
+
+
+class DomainEngine(GridEngine):
+    """
+    The DomainEngine class runs the generations of GridEngine on one grid split into strips of rows, each one
+    stepped by its own worker process on the shared state arrays. The state arrays are the ones of GridEngine,
+    so the methods that read them (metrics, absorbed, snapshot...) work as they are, in this process, between
+    two generations. The worker processes are stopped by close, or at the end of a with statement.
+    """
+
+    def __init__(self, grid, L, rng=None, workers=None):
+        """
+    The __init__ function puts the grid and the state arrays in shared memory and starts the worker processes.
+
+    :param self: Represent the instance of the class
+    :param grid: A 2d array with the skepticism level code of every cell, EMPTY where there is nobody
+    :param L: The number of generations a person waits before transmitting the rumor again
+    :param rng: The numpy random generator used for the transmissions, on a PCG64 bit generator
+    :param workers: The number of strips and of worker processes, os.cpu_count() if None
+    :return: The engine, with a reset state
+    """
+        grid = np.asarray(grid)
+        workers = max(1, min(workers or os.cpu_count() or 1, grid.shape[0]))
+        self.blocks = []
+        self.specs = {}
+        self.processes = []
+        shapes = {'grid': (grid.shape, grid.dtype), 'received_rumor': (grid.shape, bool),
+                  'generation_received': (grid.shape, np.int32),
+                  'l_left': (grid.shape, np.min_scalar_type(max(L, 0))),
+                  'skepticism_level_decreased': (grid.shape, bool), 'success_bits': (grid.shape, np.uint8),
+                  'control': ((CONTROL_SIZE,), np.uint64), 'counts': ((len(NEIGHBOR_OFFSETS), workers), np.int64),
+                  'stats': ((workers, 2), np.int64)}
+        self.shared = {}
+        for name, (shape, dtype) in shapes.items():
+            block, self.shared[name] = shared_array(shape, dtype)
+            self.blocks.append(block)
+            self.specs[name] = (block.name, shape, np.dtype(dtype).str)
+        self.shared['grid'][...] = grid
+        super().__init__(self.shared['grid'], L, rng)
+        if not isinstance(self.rng.bit_generator, np.random.PCG64):
+            self.close()
+            raise ValueError("the domain engine jumps ahead in the random stream, which needs a PCG64 generator")
+        context = multiprocessing.get_context()
+        self.start_barrier = context.Barrier(workers + 1)
+        self.end_barrier = context.Barrier(workers + 1)
+        phase_barrier = context.Barrier(workers)
+        bounds = strip_bounds(grid.shape[0], workers)
+        for strip in range(workers):
+            process = context.Process(target=work_strip, name=f'rumor-strip-{strip}', daemon=True,
+                                      args=(strip, bounds, self.specs, L, self.start_barrier, self.end_barrier,
+                                            phase_barrier))
+            process.start()
+            self.processes.append(process)
+
+    def reset(self):
+        """
+    The reset function clears the rumor state in the shared arrays, in place.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        self.received_rumor = self.shared['received_rumor']
+        self.generation_received = self.shared['generation_received']
+        self.l_left = self.shared['l_left']
+        self.skepticism_level_decreased = self.shared['skepticism_level_decreased']
+        self.received_rumor[...] = False
+        self.generation_received[...] = -1
+        self.l_left[...] = 0
+        self.skepticism_level_decreased[...] = False
+        self.generation_progress = 0
+        self.count_has_r = 0
+        self.new_receivers = 0
+        self.num_transmitters = 0
+        self.next_check = 0
+        self.check_interval = self.l + 1
+
+    def restore(self, state, copy=True):
+        """
+    The restore function brings back the state of a run saved by snapshot, copying it into the shared arrays.
+
+    :param self: Represent the instance of the class
+    :param state: A dict like the ones snapshot returns
+    :param copy: Unused, the state is always copied into the shared arrays
+    :return: Nothing
+    """
+        super().restore(state, copy=False)
+        for name in self.STATE_ARRAYS:
+            self.shared[name][...] = getattr(self, name)
+            setattr(self, name, self.shared[name])
+
+    def step(self):
+        """
+    The step function runs one generation on the worker processes, and adds up the counts of the strips.
+    In generation 1 the first cell transmits the rumor to all its neighbors, whatever its skepticism level is.
+
+    :param self: Represent the instance of the class
+    :return: The number of people that have the rumor
+    """
+        control = self.shared['control']
+        control[0] = FORCED_STEP if self.generation_progress == 0 else STEP
+        control[1] = self.generation_progress + 1
+        bit_generator = self.rng.bit_generator
+        state = bit_generator.state
+        control[2:CONTROL_SIZE] = [state['state']['state'] >> 64, state['state']['state'] & MASK_64,
+                                   state['state']['inc'] >> 64, state['state']['inc'] & MASK_64]
+        self.start_barrier.wait()
+        self.end_barrier.wait()
+        if control[0] == STEP:
+            # the workers drew from copies of the generator, jump over their draws, keeping the buffered 32 bits
+            # the draws of floats do not use
+            bit_generator.advance(int(self.shared['counts'].sum()))
+            bit_generator.state = dict(bit_generator.state, has_uint32=state['has_uint32'], uinteger=state['uinteger'])
+        self.generation_progress += 1
+        stats = self.shared['stats'].sum(axis=0)
+        self.num_transmitters = int(stats[0])
+        self.new_receivers = int(stats[1])
+        self.count_has_r += self.new_receivers
+        return self.count_has_r
+
+    def close(self):
+        """
+    The close function stops the worker processes and frees the shared memory.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        if self.processes:
+            self.shared['control'][0] = STOP
+            try:
+                self.start_barrier.wait()
+            except threading.BrokenBarrierError:
+                for process in self.processes:
+                    process.terminate()
+            for process in self.processes:
+                process.join()
+            self.processes = []
+        # the arrays on the shared memory have to go before the blocks are closed
+        self.shared = {}
+        self.grid = self.received_rumor = self.generation_received = self.l_left = None
+        self.skepticism_level_decreased = self.occupied = None
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        """
+    The __enter__ function lets the engine be used in a with statement, which closes it.
+
+    :param self: Represent the instance of the class
+    :return: The engine
+    """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+    The __exit__ function closes the engine at the end of the with statement.
+
+    :param self: Represent the instance of the class
+    :param exc_info: The exception raised in the with statement, if any
+    :return: Nothing
+    """
+        self.close()
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the simulation parameters and the number of strips from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Run one huge grid of the rumor spreading simulation on all the cores.")
+    add_simulation_args(parser)
+    parser.add_argument("--workers", type=int, default=None, help="number of strips and processes, all the cores by default")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+The main function runs the first run of the simulation given on the command line on strips of the grid, and writes
+the percentage of people that have the rumor per generation to stdout as CSV.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    seed = seed_sequence(args.seed)
+    layout_seed, run_seed = child_seeds(seed, 0, 2)
+    p_skepticism = [args.s4, args.s3, args.s2, args.s1]
+    grid = populate_grid(args.p, p_skepticism, args.grid_size, np.random.default_rng(layout_seed), args.layout)
+    with DomainEngine(grid, args.l, np.random.default_rng(run_seed), args.workers) as engine:
+        count_by_gen = engine.run(args.generations, args.tolerance)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['Seed', 'P', 'S4', 'S3', 'S2', 'S1', 'L'] + [f'Generation {i}' for i in range(args.generations + 1)])
+    writer.writerow([seed.entropy, args.p] + p_skepticism + [args.l] + list(count_by_gen))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1449 @@
+import functools
+
+import numpy as np
+
+# Define the levels of skepticism
+SKEPTICISM_LEVELS = {
+    's1': 0,
+    's2': 1,
+    's3': 2,
+    's4': 3
+}
+# Define the probs for the levels of skepticism
+SKEPTICISM_LEVELS_P = {
+    's1': 1,
+    's2': 1/3,
+    's3': 2/3,
+    's4': 0
+}
+
+#convert the SKEPTICISM_LEVELS dictionary
+SKEPTICISM_LEVELS_REVERSED = {v: k for k, v in SKEPTICISM_LEVELS.items()}
+
+# the version of the simulation rules, to change whenever a change of the engines changes their results
+ENGINE_VERSION = 1
+# Define the default size of the grid
+GRID_SIZE = 100
+# code of an empty cell in the skepticism grid
+EMPTY = -1
+# transmission probability indexed by skepticism level code
+TRANSMISSION_P = np.array([SKEPTICISM_LEVELS_P[SKEPTICISM_LEVELS_REVERSED[code]] for code in range(len(SKEPTICISM_LEVELS))])
+# whether a skepticism level code transmits the rumor at all
+CAN_TRANSMIT = TRANSMISSION_P > 0
+# the 8 toroidal neighbours, in the same order as Simulation.get_neighbors
+NEIGHBOR_OFFSETS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+# the initial layouts of the levels of skepticism
+LAYOUTS = ('random', 'slow', 'fast')
+# the neighbor table takes 32 bytes per cell, larger grids compute the neighbors of the active cells on the fly
+NEIGHBOR_TABLE_MAX_CELLS = 1 << 24
+# the bit of a bitboard word, and the number of bits set in every byte, for numpy without np.bitwise_count
+ONE = np.uint64(1)
+BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def seed_sequence(seed=None):
+    """
+The seed_sequence function turns a seed into the numpy SeedSequence all the random streams of a simulation are spawned from.
+
+:param seed: An int, a numpy SeedSequence, or None for a fresh seed
+:return: The SeedSequence, its entropy is the seed to record to reproduce the results
+"""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def child_seeds(seed, start, stop):
+    """
+The child_seeds function returns the children start to stop - 1 that seed.spawn gives, without spawning them,
+so they do not depend on how many children were spawned from seed before.
+
+:param seed: A numpy SeedSequence
+:param start: The index of the first child
+:param stop: The index after the last child
+:return: A list of SeedSequence
+"""
+    return [np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (i,), pool_size=seed.pool_size)
+            for i in range(start, stop)]
+
+
+def skepticism_counts(p_skepticism, num_people):
+    """
+The skepticism_counts function splits the people between the levels of skepticism: every level gets
+int(percent * num_people) of them, and the people left over by the rounding go to the levels with the largest remainders.
+
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param num_people: The number of people on the grid
+:return: An array with the number of people of every level, in the order of p_skepticism
+"""
+    exact = np.asarray(p_skepticism, dtype=float) * num_people
+    counts = exact.astype(np.int64)
+    leftover = num_people - int(counts.sum())
+    if leftover > 0:
+        counts[np.argsort(counts - exact, kind='stable')[:leftover]] += 1
+    return counts
+
+
+def skepticism_codes(p_skepticism):
+    """
+The skepticism_codes function returns the level codes p_skepticism refers to.
+
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:return: An int8 array with the level code of every fraction
+"""
+    return np.array([SKEPTICISM_LEVELS[f"s{len(p_skepticism) - i}"] for i in range(len(p_skepticism))], dtype=np.int8)
+
+
+def empty_neighbor_count(grid):
+    """
+The empty_neighbor_count function counts the empty neighbors of every cell at once, with a toroidal 3x3
+convolution of the empty cells mask (Simulation.get_numOfNone for the whole grid). The convolution is separable,
+so it sums 3 rolled rows and then 3 rolled columns, and removes the center.
+
+:param grid: A 2d array of skepticism level codes
+:return: A 2d uint8 array with the number of empty neighbors of every cell
+"""
+    empty = (grid == EMPTY).view(np.uint8)
+    rows = empty + np.roll(empty, 1, axis=0) + np.roll(empty, -1, axis=0)
+    return rows + np.roll(rows, 1, axis=1) + np.roll(rows, -1, axis=1) - empty
+
+
+def arrange_grid(grid, p_skepticism, layout):
+    """
+The arrange_grid function reassigns the levels of skepticism of the people on the grid, in place, by their number of
+empty neighbors: the people with the fewest empty neighbors, the most connected ones, are given the first levels.
+The 'slow' layout gives them s4 first, so the rumor spreads slowly (Simulation.arrange_board_slow), and the 'fast'
+layout gives them s1 first (Simulation.arrange_board_fast). People with the same number of empty neighbors keep the
+order of the grid.
+
+:param grid: A 2d array of skepticism level codes
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param layout: 'slow' or 'fast'
+:return: The grid
+"""
+    people = np.flatnonzero(grid != EMPTY)
+    order = people[np.argsort(empty_neighbor_count(grid).ravel()[people], kind='stable')]
+    codes = skepticism_codes(p_skepticism)
+    counts = skepticism_counts(p_skepticism, people.size)
+    if layout == 'fast':
+        codes, counts = codes[::-1], counts[::-1]
+    elif layout != 'slow':
+        raise ValueError(f"unknown layout {layout!r}")
+    grid.ravel()[order] = np.repeat(codes, counts)[:people.size]
+    return grid
+
+
+def populate_nodes(num_nodes, p_people, p_skepticism, rng=None):
+    """
+The populate_nodes function places the people on the nodes of a grid or of a network.
+int(p_people * num_nodes) people are spread over random nodes, and every level of skepticism gets
+int(percent * num_people) of them (see skepticism_counts).
+The people are written at the start of the array, which is then shuffled in place, so no index array is needed
+even for 10^8 nodes.
+
+:param num_nodes: The number of nodes
+:param p_people: The fraction of the nodes that have a person
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param rng: The numpy random generator used to place the people
+:return: A 1d int8 array with the skepticism level code of every node, EMPTY where there is nobody
+"""
+    rng = np.random.default_rng() if rng is None else rng
+    num_people = int(p_people * num_nodes)
+    if not 0 <= num_people <= num_nodes:
+        raise ValueError(f"population density must be between 0 and 1, got {p_people}")
+    nodes = np.full(num_nodes, EMPTY, dtype=np.int8)
+    nodes[:num_people] = np.repeat(skepticism_codes(p_skepticism), skepticism_counts(p_skepticism, num_people))[:num_people]
+    rng.shuffle(nodes)
+    return nodes
+
+
+def populate_grid(p_people, p_skepticism, grid_size=GRID_SIZE, rng=None, layout='random'):
+    """
+The populate_grid function places the people on an empty grid, the way Simulation.__init__ does,
+with populate_nodes over the flat grid.
+
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param grid_size: The number of rows and columns of the grid
+:param rng: The numpy random generator used to place the people
+:param layout: One of LAYOUTS: 'random' levels, or the levels arranged by arrange_grid
+:return: A 2d int8 array with the skepticism level code of every cell, EMPTY where there is nobody
+"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"unknown layout {layout!r}")
+    grid = populate_nodes(grid_size * grid_size, p_people, p_skepticism, rng).reshape(grid_size, grid_size)
+    if layout != 'random':
+        arrange_grid(grid, p_skepticism, layout)
+    return grid
+
+
+class GridEngine:
+    # the state of a run that snapshot saves and restore brings back: the state arrays and the counters
+    STATE_ARRAYS = ('received_rumor', 'generation_received', 'l_left', 'skepticism_level_decreased')
+    STATE_COUNTERS = ('generation_progress', 'count_has_r', 'new_receivers', 'num_transmitters', 'next_check',
+                      'check_interval')
+
+    def __init__(self, grid, L, rng=None):
+        """
+    The __init__ function sets up the array state of one simulation grid.
+    Every attribute of the people is kept as a whole-grid NumPy array, so one generation
+    is computed with a handful of array operations instead of a Python loop over the cells.
+    The arrays use the smallest dtypes that fit (one byte per cell for the flags and for a cooldown L < 256),
+    so that grids of 10^8 cells fit in memory.
+
+    :param self: Represent the instance of the class
+    :param grid: A 2d array with the skepticism level code of every cell, EMPTY where there is nobody
+    :param L: The number of generations a person waits before transmitting the rumor again
+    :param rng: The numpy random generator used for the transmissions
+    :return: The engine, with a reset state
+    """
+        self.grid = np.asarray(grid)
+        self.occupied = self.grid != EMPTY
+        self.num_people = int(np.count_nonzero(self.occupied))
+        # the number of people at every skepticism level code, before any decrease
+        self.level_counts = np.bincount(self.grid[self.occupied], minlength=len(SKEPTICISM_LEVELS))
+        self.l = L
+        self.l_dtype = np.min_scalar_type(max(L, 0))
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.reset()
+
+    def state_shape(self):
+        """
+    The state_shape function returns the shape of the rumor state arrays.
+
+    :param self: Represent the instance of the class
+    :return: The shape of the grid
+    """
+        return self.grid.shape
+
+    def reset(self):
+        """
+    The reset function clears the rumor state of the grid: nobody has the rumor, a cooldown or a decreased level.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        shape = self.state_shape()
+        self.received_rumor = np.zeros(shape, dtype=bool)
+        self.generation_received = np.full(shape, -1, dtype=np.int16)
+        self.l_left = np.zeros(shape, dtype=self.l_dtype)
+        self.skepticism_level_decreased = np.zeros(shape, dtype=bool)
+        self.generation_progress = 0
+        self.count_has_r = 0
+        self.new_receivers = 0
+        self.num_transmitters = 0
+        # the first generation settled checks absorbed in, and the wait after the next failed check
+        self.next_check = 0
+        self.check_interval = self.l + 1
+
+    def start(self, x, y):
+        """
+    The start function gives the rumor to the cell (x, y) in generation 0.
+
+    :param self: Represent the instance of the class
+    :param x: The row of the first cell
+    :param y: The column of the first cell
+    :return: Nothing
+    """
+        self.received_rumor[x, y] = True
+        self.generation_received[x, y] = self.generation_progress
+        self.count_has_r += 1
+        self.new_receivers = 1
+
+    def update_cells(self):
+        """
+    The update_cells function counts down the cooldown of the people that transmitted the rumor.
+    A person may transmit again when his cooldown reaches 0.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        np.subtract(self.l_left, 1, out=self.l_left, where=self.l_left > 0)
+
+    def level(self):
+        """
+    The level function returns the skepticism level every person transmits the rumor with,
+    taking into account the temporary decrease of the skepticism level.
+
+    :param self: Represent the instance of the class
+    :return: A 2d int8 array of skepticism level codes
+    """
+        return self.grid - self.skepticism_level_decreased.view(np.int8)
+
+    def transmit(self, transmitters, forced=False):
+        """
+    The transmit function makes all the transmitters pass the rumor to their occupied neighbors at once.
+    Every (transmitter, neighbor) pair gets its own random draw, the transmitter starts its cooldown if it passed
+    the rumor to at least one neighbor, and a person that received the rumor from at least
+    two neighbors in this generation has its skepticism decreased by one level.
+    The decrease of the former generation is restored, so a decrease holds for the
+    first generation the person may transmit in after receiving the rumor.
+
+    :param self: Represent the instance of the class
+    :param transmitters: A 2d boolean array of the cells that transmit in this generation
+    :param forced: Transmit to every occupied neighbor, whatever the skepticism level of the transmitter is
+    :return: Nothing
+    """
+        level = self.level()
+        hits = np.zeros(self.received_rumor.shape, dtype=np.uint8)
+        transmitted = np.zeros(self.received_rumor.shape, dtype=bool)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            # success[x, y] means (x, y) passed the rumor to (x + dx, y + dy)
+            success = transmitters & np.roll(self.occupied, (-dx, -dy), axis=(-2, -1))
+            if not forced:
+                # draw only for the transmitters that have a neighbor in this direction
+                prob = TRANSMISSION_P[level[success]]
+                success[success] = self.draw(success) < prob
+            transmitted |= success
+            hits += np.roll(success, (dx, dy), axis=(-2, -1))
+        self.l_left[transmitted] = self.l
+        received = hits > 0
+        self.num_transmitters = self.count(transmitters)
+        self.new_receivers = self.count(received & ~self.received_rumor)
+        self.count_has_r += self.new_receivers
+        self.received_rumor |= received
+        if self.generation_progress > np.iinfo(self.generation_received.dtype).max:
+            self.generation_received = self.generation_received.astype(np.int32)
+        self.generation_received[received] = self.generation_progress
+        self.skepticism_level_decreased = (hits >= 2) & (self.grid > SKEPTICISM_LEVELS['s1'])
+
+    def draw(self, cells):
+        """
+    The draw function draws one uniform random number in [0, 1) for every selected cell, in the order of the grid.
+
+    :param self: Represent the instance of the class
+    :param cells: A boolean array of the cells that need a draw
+    :return: A 1d array of random numbers
+    """
+        return self.rng.random(np.count_nonzero(cells))
+
+    def count(self, cells):
+        """
+    The count function counts the selected cells of the grid.
+
+    :param self: Represent the instance of the class
+    :param cells: A boolean array of the cells to count
+    :return: The number of selected cells
+    """
+        return int(np.count_nonzero(cells))
+
+    def step(self):
+        """
+    The step function runs one generation: it updates the cooldowns and then every person that has the rumor
+    and is allowed to transmit passes it on. In generation 1 the first cell transmits the rumor to all its
+    neighbors, whatever its skepticism level is.
+
+    :param self: Represent the instance of the class
+    :return: The number of people that have the rumor
+    """
+        if self.generation_progress == 0:
+            self.generation_progress += 1
+            self.transmit(self.received_rumor.copy(), forced=True)
+            return self.count_has_r
+        self.update_cells()
+        self.generation_progress += 1
+        # the empty cells never have the rumor, so the level they are looked up with does not matter
+        transmitters = self.received_rumor & (self.l_left == 0) & CAN_TRANSMIT[self.level()]
+        self.transmit(transmitters)
+        return self.count_has_r
+
+    def select_random_cell(self):
+        """
+    The select_random_cell function selects a random occupied cell of the grid to start the rumor from.
+    It draws random cells until it finds an occupied one, which takes 1/P draws on average.
+
+    :param self: Represent the instance of the class
+    :return: The row and the column of the cell
+    """
+        if self.num_people == 0:
+            raise ValueError("there is nobody on the grid to start the rumor from")
+        cell = self.draw_cell()
+        while not self.occupied.flat[cell]:
+            cell = self.draw_cell()
+        return np.unravel_index(cell, self.grid.shape)
+
+    def draw_cell(self):
+        """
+    The draw_cell function draws one random cell of the grid, occupied or not.
+
+    :param self: Represent the instance of the class
+    :return: The flat index of the cell
+    """
+        return self.rng.integers(self.grid.size)
+
+    def state_counts(self):
+        """
+    The state_counts function counts the people in every state of the rumor.
+
+    :param self: Represent the instance of the class
+    :return: The number of people in cooldown, the number of people whose skepticism level is decreased,
+             and an array with the number of people at every skepticism level, indexed by level code
+    """
+        level = self.level()
+        skepticism = np.stack([self.count(self.occupied & (level == code)) for code in range(len(SKEPTICISM_LEVELS))], axis=-1)
+        return self.count(self.l_left > 0), self.count(self.skepticism_level_decreased), skepticism
+
+    def metrics(self):
+        """
+    The metrics function returns a compact record of the current generation.
+
+    :param self: Represent the instance of the class
+    :return: A dict with the generation, the number and percentage of people that have the rumor, the number of
+             people that received it for the first time in this generation, the number of transmitters of this
+             generation, the number of people in cooldown, the number of people whose skepticism level is decreased,
+             and the number of people at every skepticism level (indexed by level code, the decreased levels included)
+    """
+        cooling, decreased, skepticism = self.state_counts()
+        return {'generation': self.generation_progress, 'has_rumor': self.count_has_r, 'percent': self.percent(),
+                'new_receivers': self.new_receivers, 'transmitters': self.num_transmitters, 'cooling': cooling,
+                'decreased': decreased, 'skepticism': skepticism}
+
+    def stream(self, generations):
+        """
+    The stream function runs one simulation from a random first cell, like run, and yields the metrics record of
+    every generation as soon as it is computed, so the caller can write it away or stop the simulation early.
+
+    :param self: Represent the instance of the class
+    :param generations: The number of generations to simulate
+    :return: A generator of the metrics records of generations 0 to generations
+    """
+        self.reset()
+        self.start(*self.select_random_cell())
+        yield self.metrics()
+        while self.generation_progress < generations:
+            self.step()
+            yield self.metrics()
+
+    def absorbed(self):
+        """
+    The absorbed function checks if the rumor reached a fixed point: nobody will ever receive it again.
+    Only a person that has the rumor and has a neighbor without it may pass it on, and only if his skepticism level
+    lets him transmit, or if he is s4 and at least two of his neighbors may transmit, which may decrease his level.
+    If there is no such person, the set of the people that have the rumor never changes again.
+
+    :param self: Represent the instance of the class
+    :return: True if the rumor reached a fixed point (an array with one value per replica for EnsembleEngine)
+    """
+        uninformed = self.occupied & ~self.received_rumor
+        exposed = np.zeros(self.received_rumor.shape, dtype=bool)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            exposed |= np.roll(uninformed, (dx, dy), axis=(-2, -1))
+        exposed &= self.received_rumor
+        # the empty cells never have the rumor, so the level they are looked up with does not matter
+        may_transmit = self.received_rumor & CAN_TRANSMIT[self.grid]
+        fixed = self.count(exposed & may_transmit) == 0
+        if not np.any(fixed):
+            return fixed
+        # add the s4 people that may be decreased by the people that may transmit, until nobody is added
+        while True:
+            transmitting_neighbors = np.zeros(self.received_rumor.shape, dtype=np.uint8)
+            for dx, dy in NEIGHBOR_OFFSETS:
+                transmitting_neighbors += np.roll(may_transmit, (dx, dy), axis=(-2, -1))
+            grown = may_transmit | (self.received_rumor & (transmitting_neighbors >= 2))
+            if np.all(self.count(grown) == self.count(may_transmit)):
+                break
+            may_transmit = grown
+        return self.count(exposed & may_transmit) == 0
+
+    def settled(self, count_by_gen, tolerance=None):
+        """
+    The settled function checks if a run can stop before its last generation. It stops when the rumor reached a fixed
+    point (see absorbed), which is only checked in the generations nobody received the rumor in. absorbed may miss a
+    fixed point (two s1 neighbors of an s4 person may never transmit in the same generation), so after a check that
+    failed the next one waits L + 1 generations, and the wait doubles after every failed check. With a tolerance,
+    it also stops in a steady state: when the percentage of people that have the rumor grew by at most tolerance
+    over the last L + 1 generations, in which everybody that has the rumor may transmit it again.
+
+    :param self: Represent the instance of the class
+    :param count_by_gen: The percentage of people that have the rumor in every generation so far
+    :param tolerance: The growth in percentage points under which the run is in a steady state, None to stop
+                      only at a fixed point
+    :return: True if the rest of the run is known to keep the last percentage
+    """
+        window = self.l + 1
+        if tolerance is not None and len(count_by_gen) > window:
+            if np.all(np.asarray(count_by_gen[-1]) - count_by_gen[-1 - window] <= tolerance):
+                return True
+        if np.any(self.new_receivers != 0) or self.generation_progress < self.next_check:
+            return False
+        if np.all(self.absorbed()):
+            return True
+        self.next_check = self.generation_progress + self.check_interval
+        self.check_interval *= 2
+        return False
+
+    def run(self, generations, tolerance=None):
+        """
+    The run function runs one simulation from a random first cell, without drawing anything.
+    The run stops as soon as it is settled, and the rest of the generations keep the last percentage.
+
+    :param self: Represent the instance of the class
+    :param generations: The number of generations to simulate
+    :param tolerance: The steady state tolerance of settled, None to stop only at a fixed point
+    :return: A list with the percentage of people that have the rumor in every generation
+    """
+        self.reset()
+        self.start(*self.select_random_cell())
+        return self.resume([self.percent()], generations, tolerance)
+
+    def resume(self, count_by_gen, generations, tolerance=None, until=None):
+        """
+    The resume function runs the current simulation on from its current generation, like run does after the first cell.
+    The run stops as soon as it is settled, and the rest of the generations keep the last percentage.
+
+    :param self: Represent the instance of the class
+    :param count_by_gen: The list with the percentage of people that have the rumor in every generation so far
+    :param generations: The number of generations to simulate
+    :param tolerance: The steady state tolerance of settled, None to stop only at a fixed point
+    :param until: Pause the run after this generation, for instance to snapshot it, None to run it to the end
+    :return: The list count_by_gen, extended with the generations that were run, generations + 1 long if the run is over
+    """
+        until = generations if until is None else min(until, generations)
+        while self.generation_progress < until:
+            self.step()
+            count_by_gen.append(self.percent())
+            if self.settled(count_by_gen, tolerance):
+                count_by_gen += [count_by_gen[-1]] * (generations - self.generation_progress)
+                break
+        return count_by_gen
+
+    def generators(self):
+        """
+    The generators function returns the random generators the engine draws from.
+
+    :param self: Represent the instance of the class
+    :return: A list of numpy random generators
+    """
+        return [self.rng]
+
+    def snapshot(self):
+        """
+    The snapshot function copies the whole state of the current run: the state arrays, the counters and the state of
+    the random generators, so the run can go on later from this generation with restore, or from several copies of it.
+
+    :param self: Represent the instance of the class
+    :return: A dict with a copy of every state array and counter, and the list of the generator states under 'rng'
+    """
+        state = {name: getattr(self, name).copy() for name in self.STATE_ARRAYS}
+        for name in self.STATE_COUNTERS:
+            value = getattr(self, name)
+            state[name] = value.copy() if isinstance(value, np.ndarray) else value
+        state['rng'] = [rng.bit_generator.state for rng in self.generators()]
+        return state
+
+    def restore(self, state, copy=True):
+        """
+    The restore function brings back the state of a run saved by snapshot, on an engine with the same grid and L.
+
+    :param self: Represent the instance of the class
+    :param state: A dict like the ones snapshot returns, 'rng' may be left out to keep the current generators
+    :param copy: Copy the state arrays, False to use them as they are (a copy-on-write memory map for instance)
+    :return: Nothing
+    """
+        for name in self.STATE_ARRAYS:
+            value = np.array(state[name]) if copy else np.asarray(state[name])
+            if name in GridEngine.STATE_ARRAYS and value.shape != self.state_shape():
+                raise ValueError(f"the {name} of the state has the shape {value.shape}, not {self.state_shape()}")
+            setattr(self, name, value)
+        for name in self.STATE_COUNTERS:
+            value = state[name]
+            setattr(self, name, np.array(value) if isinstance(value, (list, np.ndarray)) else int(value))
+        if 'rng' in state:
+            generators = self.generators()
+            if len(state['rng']) != len(generators):
+                raise ValueError(f"the state has {len(state['rng'])} random generators, not {len(generators)}")
+            for rng, rng_state in zip(generators, state['rng']):
+                rng.bit_generator.state = rng_state
+
+    def percent(self):
+        """
+    The percent function returns the percentage of the people that have the rumor.
+
+    :param self: Represent the instance of the class
+    :return: The percentage of people that have the rumor
+    """
+        return self.count_has_r / self.num_people * 100
+
+
+class EnsembleEngine(GridEngine):
+    """
+    The EnsembleEngine class runs many independent replicas of a simulation on the same grid at once: the state arrays
+    are stacked into (replicas, rows, columns) arrays, so every generation of all the replicas is one vectorized step
+    and the Python overhead is shared between them. Every replica draws from its own random generator, in the same
+    order as GridEngine does, so a replica gives exactly the run GridEngine gives with the same generator.
+    """
+
+    def __init__(self, grid, L, rngs):
+        """
+    The __init__ function sets up the stacked state of the replicas.
+
+    :param self: Represent the instance of the class
+    :param grid: A 2d array with the skepticism level code of every cell, EMPTY where there is nobody
+    :param L: The number of generations a person waits before transmitting the rumor again
+    :param rngs: A list with the numpy random generator of every replica
+    :return: The engine, with a reset state
+    """
+        self.rngs = list(rngs)
+        super().__init__(grid, L, self.rngs[0])
+
+    def state_shape(self):
+        """
+    The state_shape function returns the shape of the stacked rumor state arrays.
+
+    :param self: Represent the instance of the class
+    :return: The (replicas, rows, columns) shape
+    """
+        return (len(self.rngs),) + self.grid.shape
+
+    def reset(self):
+        """
+    The reset function clears the rumor state of all the replicas.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        super().reset()
+        self.count_has_r = np.zeros(len(self.rngs), dtype=np.int64)
+        self.new_receivers = np.zeros(len(self.rngs), dtype=np.int64)
+        self.num_transmitters = np.zeros(len(self.rngs), dtype=np.int64)
+
+    def start(self, x, y):
+        """
+    The start function gives the rumor to the first cell of every replica in generation 0.
+
+    :param self: Represent the instance of the class
+    :param x: An array with the row of the first cell of every replica
+    :param y: An array with the column of the first cell of every replica
+    :return: Nothing
+    """
+        replicas = np.arange(len(self.rngs))
+        self.received_rumor[replicas, x, y] = True
+        self.generation_received[replicas, x, y] = self.generation_progress
+        self.count_has_r += 1
+        self.new_receivers = np.ones(len(self.rngs), dtype=np.int64)
+
+    def select_random_cell(self):
+        """
+    The select_random_cell function selects the first cell of every replica with the generator of the replica.
+
+    :param self: Represent the instance of the class
+    :return: An array with the row and an array with the column of the first cell of every replica
+    """
+        cells = []
+        for rng in self.rngs:
+            self.rng = rng
+            cells.append(super().select_random_cell())
+        return tuple(np.array(cells).T)
+
+    def draw(self, cells):
+        """
+    The draw function draws the random numbers of every replica from its own generator, in the order of the stacked grid.
+
+    :param self: Represent the instance of the class
+    :param cells: A (replicas, rows, columns) boolean array of the cells that need a draw
+    :return: A 1d array of random numbers
+    """
+        counts = np.count_nonzero(cells, axis=(1, 2))
+        return np.concatenate([rng.random(count) for rng, count in zip(self.rngs, counts)])
+
+    def count(self, cells):
+        """
+    The count function counts the selected cells of every replica.
+
+    :param self: Represent the instance of the class
+    :param cells: A (replicas, rows, columns) boolean array of the cells to count
+    :return: An array with the number of selected cells of every replica
+    """
+        return np.count_nonzero(cells, axis=(1, 2))
+
+    def generators(self):
+        """
+    The generators function returns the random generators of the replicas.
+
+    :param self: Represent the instance of the class
+    :return: A list of numpy random generators
+    """
+        return self.rngs
+
+    def run(self, generations, tolerance=None):
+        """
+    The run function runs all the replicas from their random first cells, until all of them are settled.
+
+    :param self: Represent the instance of the class
+    :param generations: The number of generations to simulate
+    :param tolerance: The steady state tolerance of settled, None to stop only at a fixed point
+    :return: A (replicas, generations + 1) array with the percentage of people that have the rumor in every generation
+    """
+        return np.array(super().run(generations, tolerance)).T
+
+
+@functools.lru_cache(maxsize=2)
+def neighbor_table(shape):
+    """
+The neighbor_table function builds the flat indices of the 8 toroidal neighbors of every cell of a grid,
+in the order of NEIGHBOR_OFFSETS. It is built once per grid shape and shared by all the simulations
+of that shape, so it is read-only. Only the tables of the last two shapes are kept, a table may take 512 MB.
+
+:param shape: The (rows, columns) shape of the grid, at most NEIGHBOR_TABLE_MAX_CELLS cells
+:return: A read-only (rows * columns, 8) int32 array of flat cell indices
+"""
+    rows, cols = shape
+    if rows * cols > NEIGHBOR_TABLE_MAX_CELLS:
+        raise ValueError(f"a {rows}x{cols} grid is too large for a neighbor table")
+    x, y = np.divmod(np.arange(rows * cols, dtype=np.int32), cols)
+    table = np.empty((rows * cols, len(NEIGHBOR_OFFSETS)), dtype=np.int32)
+    for d, (dx, dy) in enumerate(NEIGHBOR_OFFSETS):
+        table[:, d] = (x + dx) % rows * cols + (y + dy) % cols
+    table.setflags(write=False)
+    return table
+
+
+def neighbors_of(cells, shape):
+    """
+The neighbors_of function returns the flat indices of the 8 toroidal neighbors of the given cells,
+in the order of NEIGHBOR_OFFSETS. They are gathered from the neighbor table of the grid shape,
+or computed on the fly for grids too large for a table.
+
+:param cells: An int or a 1d array of flat cell indices
+:param shape: The (rows, columns) shape of the grid
+:return: A (len(cells), 8) array of flat cell indices, or an array of 8 indices for a single cell
+"""
+    rows, cols = shape
+    if rows * cols <= NEIGHBOR_TABLE_MAX_CELLS:
+        return neighbor_table((rows, cols))[cells]
+    x, y = np.divmod(np.asarray(cells, dtype=np.int64), cols)
+    dx, dy = np.array(NEIGHBOR_OFFSETS).T
+    return (x[..., None] + dx) % rows * cols + (y[..., None] + dy) % cols
+
+
+class FrontierEngine(GridEngine):
+    """
+    The FrontierEngine class runs the same generations as GridEngine, but instead of scanning the whole grid it keeps
+    the flat indices of the people that can transmit (they have the rumor, their cooldown is over and their skepticism
+    level lets them transmit) and of the people whose cooldown is ticking. The cost of a generation therefore scales
+    with the number of active people rather than with the area of the grid.
+    People with skepticism s4 never transmit, unless their level was decreased in the former generation,
+    so they only enter the active set through the decreased people.
+    """
+    STATE_ARRAYS = GridEngine.STATE_ARRAYS + ('ready', 'cooling', 'decreased', 'first_cell')
+
+    def reset(self):
+        """
+    The reset function clears the rumor state of the grid and empties the active sets.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        super().reset()
+        empty = np.zeros(0, dtype=np.int64)
+        self.ready = empty
+        self.cooling = empty
+        self.decreased = empty
+        self.first_cell = empty
+
+    def start(self, x, y):
+        """
+    The start function gives the rumor to the cell (x, y) in generation 0, and makes it active if it can transmit.
+
+    :param self: Represent the instance of the class
+    :param x: The row of the first cell
+    :param y: The column of the first cell
+    :return: Nothing
+    """
+        super().start(x, y)
+        self.first_cell = np.array([np.ravel_multi_index((x, y), self.grid.shape)])
+        self.ready = self.first_cell[CAN_TRANSMIT[self.grid.ravel()[self.first_cell]]]
+
+    def update_cells(self):
+        """
+    The update_cells function counts down the cooldown of the people whose cooldown is ticking,
+    and moves the ones that may transmit again to the active set.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        l_left = self.l_left.ravel()
+        l_left[self.cooling] -= 1
+        done = l_left[self.cooling] == 0
+        unlocked = self.cooling[done]
+        self.cooling = self.cooling[~done]
+        self.ready = np.concatenate([self.ready, unlocked[CAN_TRANSMIT[self.grid.ravel()[unlocked]]]])
+
+    def neighbors(self, cells):
+        """
+    The neighbors function returns the flat indices of the 8 neighbors of the given cells.
+
+    :param self: Represent the instance of the class
+    :param cells: A 1d array of flat cell indices
+    :return: A (len(cells), 8) array of flat cell indices
+    """
+        return neighbors_of(cells, self.grid.shape)
+
+    def fire(self, transmitters, forced=False):
+        """
+    The fire function draws which occupied neighbors every transmitter passes the rumor to.
+    Every (transmitter, neighbor) pair gets its own random draw, in the order of the transmitters and then of
+    NEIGHBOR_OFFSETS.
+
+    :param self: Represent the instance of the class
+    :param transmitters: A 1d array with the flat indices of the cells that transmit in this generation
+    :param forced: Transmit to every occupied neighbor, whatever the skepticism level of the transmitter is
+    :return: A boolean array of the transmitters that passed the rumor to at least one neighbor,
+             and an array with the flat index of the receiver of every successful transmission
+    """
+        decreased = self.skepticism_level_decreased.ravel()
+        neighbors = self.neighbors(transmitters)
+        success = self.occupied.ravel()[neighbors]
+        if not forced:
+            prob = TRANSMISSION_P[self.grid.ravel()[transmitters] - decreased[transmitters]]
+            success[success] = self.draw(success) < np.broadcast_to(prob[:, None], success.shape)[success]
+        return success.any(axis=1), neighbors[success]
+
+    def transmit(self, transmitters, forced=False):
+        """
+    The transmit function makes the transmitters pass the rumor to their occupied neighbors, with the same rules
+    as GridEngine.transmit, touching only the transmitters, their neighbors and the decreased people.
+
+    :param self: Represent the instance of the class
+    :param transmitters: A 1d array with the flat indices of the cells that transmit in this generation
+    :param forced: Transmit to every occupied neighbor, whatever the skepticism level of the transmitter is
+    :return: Nothing
+    """
+        grid = self.grid.ravel()
+        decreased = self.skepticism_level_decreased.ravel()
+        transmitted, targets = self.fire(transmitters, forced)
+        fired = transmitters[transmitted]
+        self.l_left.ravel()[fired] = self.l
+        if self.l > 0:
+            self.ready = self.ready[~np.isin(self.ready, fired)]
+            self.cooling = np.concatenate([self.cooling, fired])
+        received, hits = np.unique(targets, return_counts=True)
+        received_rumor = self.received_rumor.ravel()
+        new = received[~received_rumor[received]]
+        self.num_transmitters = transmitters.size
+        self.new_receivers = new.size
+        self.count_has_r += new.size
+        received_rumor[received] = True
+        if self.generation_progress > np.iinfo(self.generation_received.dtype).max:
+            self.generation_received = self.generation_received.astype(np.int32)
+        self.generation_received.ravel()[received] = self.generation_progress
+        self.ready = np.concatenate([self.ready, new[CAN_TRANSMIT[grid[new]]]])
+        decreased[self.decreased] = False
+        self.decreased = received[(hits >= 2) & (grid[received] > SKEPTICISM_LEVELS['s1'])]
+        decreased[self.decreased] = True
+
+    def state_counts(self):
+        """
+    The state_counts function counts the people in every state of the rumor from the active sets,
+    without scanning the grid.
+
+    :param self: Represent the instance of the class
+    :return: The number of people in cooldown, the number of people whose skepticism level is decreased,
+             and an array with the number of people at every skepticism level, indexed by level code
+    """
+        levels = self.grid.ravel()[self.decreased]
+        moved = np.bincount(levels, minlength=len(SKEPTICISM_LEVELS))
+        skepticism = self.level_counts - moved + np.bincount(levels - 1, minlength=len(SKEPTICISM_LEVELS))
+        return self.cooling.size, self.decreased.size, skepticism
+
+    def step(self):
+        """
+    The step function runs one generation on the active people only. In generation 1 the first cell transmits
+    the rumor to all its neighbors, whatever its skepticism level is.
+
+    :param self: Represent the instance of the class
+    :return: The number of people that have the rumor
+    """
+        if self.generation_progress == 0:
+            self.generation_progress += 1
+            self.transmit(self.first_cell, forced=True)
+            return self.count_has_r
+        self.update_cells()
+        self.generation_progress += 1
+        # s4 people that were decreased in the former generation transmit too, if they have the rumor and may transmit
+        grid = self.grid.ravel()
+        woken = self.decreased[(grid[self.decreased] == SKEPTICISM_LEVELS['s4'])
+                               & self.received_rumor.ravel()[self.decreased] & (self.l_left.ravel()[self.decreased] == 0)]
+        self.transmit(np.concatenate([self.ready, woken]))
+        return self.count_has_r
+
+
+def lattice_adjacency(shape):
+    """
+The lattice_adjacency function returns the toroidal 8-neighbor grid as a compressed sparse row (CSR) adjacency,
+the neighbors of every cell in the order of NEIGHBOR_OFFSETS. The indices are a view of the neighbor table, or are
+computed NEIGHBOR_TABLE_MAX_CELLS cells at a time for grids too large for a table.
+
+:param shape: The (rows, columns) shape of the grid
+:return: The indptr and the indices arrays of the adjacency
+"""
+    num_cells = shape[0] * shape[1]
+    indptr = np.arange(0, len(NEIGHBOR_OFFSETS) * num_cells + 1, len(NEIGHBOR_OFFSETS))
+    if num_cells <= NEIGHBOR_TABLE_MAX_CELLS:
+        return indptr, neighbor_table(tuple(shape)).ravel()
+    indices = np.empty((num_cells, len(NEIGHBOR_OFFSETS)), dtype=np.int64)
+    for start in range(0, num_cells, NEIGHBOR_TABLE_MAX_CELLS):
+        cells = np.arange(start, min(start + NEIGHBOR_TABLE_MAX_CELLS, num_cells))
+        indices[start:start + len(cells)] = neighbors_of(cells, shape)
+    return indptr, indices.ravel()
+
+
+def neighbor_sum(values, indptr, indices, dtype=np.int32):
+    """
+The neighbor_sum function sums values over the neighbors of every node of a CSR adjacency,
+in one pass over the edges.
+
+:param values: A 1d array with a value for every node
+:param indptr: The indptr array of the adjacency
+:param indices: The indices array of the adjacency
+:param dtype: The dtype of the sums
+:return: A 1d array with the sum of the values of the neighbors of every node
+"""
+    sums = np.zeros(len(indptr) - 1, dtype=dtype)
+    # reduceat does not handle the nodes without neighbors, they are left at 0
+    has_neighbors = indptr[1:] > indptr[:-1]
+    if np.any(has_neighbors):
+        sums[has_neighbors] = np.add.reduceat(values[indices], indptr[:-1][has_neighbors], dtype=dtype)
+    return sums
+
+
+def in_neighbor_count(values, indptr, indices):
+    """
+The in_neighbor_count function counts, for every node of a CSR adjacency, the nodes with a true value that have it
+as a neighbor. On a directed network these are the nodes the rumor comes from, which are not its own neighbors.
+
+:param values: A 1d boolean array with a value for every node
+:param indptr: The indptr array of the adjacency
+:param indices: The indices array of the adjacency
+:return: A 1d int64 array with the count of every node
+"""
+    return np.bincount(indices[np.repeat(values, np.diff(indptr))], minlength=len(indptr) - 1)
+
+
+class GraphEngine(FrontierEngine):
+    """
+    The GraphEngine class runs the rules of FrontierEngine on any contact network, given as a compressed sparse row
+    (CSR) adjacency: the neighbors of node i are indices[indptr[i]:indptr[i + 1]]. A generation gathers the edges of
+    the active people only, so its cost scales with the number of active edges, and the adjacency may be a read-only
+    memory map (see rumor_graph.Graph). Without an adjacency, the engine runs on the toroidal grid, and gives the
+    same runs as FrontierEngine.
+    """
+
+    def __init__(self, grid, L, rng=None, adjacency=None):
+        """
+    The __init__ function sets up the state of the nodes of the network.
+
+    :param self: Represent the instance of the class
+    :param grid: An array with the skepticism level code of every node, EMPTY where there is nobody
+    :param L: The number of generations a person waits before transmitting the rumor again
+    :param rng: The numpy random generator used for the transmissions
+    :param adjacency: An object with the indptr and indices arrays of the network (rumor_graph.Graph),
+                      or an (indptr, indices) tuple, the toroidal grid of the shape of grid if None
+    :return: The engine, with a reset state
+    """
+        if adjacency is None:
+            self.indptr, self.indices = lattice_adjacency(np.shape(grid))
+        elif isinstance(adjacency, tuple):
+            self.indptr, self.indices = adjacency
+        else:
+            self.indptr, self.indices = adjacency.indptr, adjacency.indices
+        super().__init__(np.ravel(grid), L, rng)
+        if len(self.indptr) != self.grid.size + 1:
+            raise ValueError(f"the network has {len(self.indptr) - 1} nodes, but {self.grid.size} levels were given")
+
+    def start(self, node):
+        """
+    The start function gives the rumor to a node in generation 0, and makes it active if it can transmit.
+
+    :param self: Represent the instance of the class
+    :param node: The index of the first node
+    :return: Nothing
+    """
+        self.received_rumor[node] = True
+        self.generation_received[node] = self.generation_progress
+        self.count_has_r += 1
+        self.new_receivers = 1
+        self.first_cell = np.array([node])
+        self.ready = self.first_cell[CAN_TRANSMIT[self.grid[self.first_cell]]]
+
+    def neighbors(self, cells):
+        """
+    The neighbors function gathers the neighbors of the given nodes from the edge arrays.
+
+    :param self: Represent the instance of the class
+    :param cells: A 1d array of node indices
+    :return: A 1d array with the neighbors of the first node, then of the second node, and so on
+    """
+        starts = self.indptr[cells]
+        degrees = self.indptr[cells + 1] - starts
+        # the position of every gathered edge in the edge arrays
+        edges = np.repeat(starts - np.cumsum(degrees) + degrees, degrees) + np.arange(degrees.sum())
+        return self.indices[edges]
+
+    def fire(self, transmitters, forced=False):
+        """
+    The fire function draws which occupied neighbors every transmitter passes the rumor to, one draw per edge,
+    in the order of the transmitters and then of their edges.
+
+    :param self: Represent the instance of the class
+    :param transmitters: A 1d array with the indices of the nodes that transmit in this generation
+    :param forced: Transmit to every occupied neighbor, whatever the skepticism level of the transmitter is
+    :return: A boolean array of the transmitters that passed the rumor to at least one neighbor,
+             and an array with the index of the receiver of every successful transmission
+    """
+        owners = np.repeat(np.arange(transmitters.size), self.indptr[transmitters + 1] - self.indptr[transmitters])
+        neighbors = self.neighbors(transmitters)
+        success = self.occupied[neighbors]
+        if not forced:
+            prob = TRANSMISSION_P[self.grid[transmitters] - self.skepticism_level_decreased[transmitters]]
+            success[success] = self.draw(success) < prob[owners[success]]
+        transmitted = np.zeros(transmitters.size, dtype=bool)
+        transmitted[owners[success]] = True
+        return transmitted, neighbors[success]
+
+    def absorbed(self):
+        """
+    The absorbed function checks if the rumor reached a fixed point, with the rules of GridEngine.absorbed,
+    summing over the edges of the network instead of rolling the grid. The people that may decrease a person are
+    the ones the rumor comes to him from, which on a directed network are not his own neighbors.
+
+    :param self: Represent the instance of the class
+    :return: True if the rumor reached a fixed point
+    """
+        uninformed = self.occupied & ~self.received_rumor
+        exposed = self.received_rumor & (neighbor_sum(uninformed, self.indptr, self.indices) > 0)
+        may_transmit = self.received_rumor & CAN_TRANSMIT[self.grid]
+        if np.any(exposed & may_transmit):
+            return False
+        while True:
+            transmitting = in_neighbor_count(may_transmit, self.indptr, self.indices)
+            grown = may_transmit | (self.received_rumor & (transmitting >= 2))
+            if np.count_nonzero(grown) == np.count_nonzero(may_transmit):
+                break
+            may_transmit = grown
+        return not np.any(exposed & may_transmit)
+
+
+def pack_bits(cells):
+    """
+The pack_bits function packs a 2d boolean array into bitboards: bit i of word k of row x is the cell (x, 64 * k + i).
+The bits past the last column of a row are 0.
+
+:param cells: A 2d boolean array
+:return: A (rows, words) uint64 array, with words = ceil(columns / 64)
+"""
+    rows, columns = cells.shape
+    padded = np.zeros((rows, -(-columns // 64) * 64), dtype=bool)
+    padded[:, :columns] = cells
+    return np.packbits(padded, axis=1, bitorder='little').view('<u8').astype(np.uint64)
+
+
+def unpack_bits(words, columns):
+    """
+The unpack_bits function turns bitboards back into a 2d boolean array.
+
+:param words: A (rows, words) uint64 array of bitboards
+:param columns: The number of columns of the grid
+:return: A (rows, columns) boolean array
+"""
+    packed = words.astype('<u8').view(np.uint8)
+    return np.unpackbits(packed, axis=1, count=columns, bitorder='little').view(bool)
+
+
+def popcount(words):
+    """
+The popcount function counts the bits that are set in bitboards.
+
+:param words: A uint64 array
+:return: The number of bits set
+"""
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(BYTE_POPCOUNT[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def roll_bits(words, shift, columns):
+    """
+The roll_bits function rolls bitboards around the torus like np.roll rolls the grid, for shifts of at most one cell:
+the cell (x, y) of the result is the cell (x - dx, y - dy) of the bitboards. The rows move as whole rows of words,
+and the columns move with one shift of every word and a carry from its neighbor word.
+
+:param words: A (rows, words) uint64 array of bitboards
+:param shift: The (dx, dy) shift, dx and dy in -1, 0 and 1
+:param columns: The number of columns of the grid
+:return: The rolled bitboards
+"""
+    dx, dy = shift
+    if dx:
+        words = np.roll(words, dx, axis=0)
+    if dy == 0:
+        return words
+    # the position of the last column in the last word of a row
+    last = np.uint64((columns - 1) % 64)
+    if dy > 0:
+        rolled = words << ONE
+        rolled[:, 1:] |= words[:, :-1] >> np.uint64(63)
+        rolled[:, 0] |= (words[:, -1] >> last) & ONE
+        rolled[:, -1] &= (ONE << last << ONE) - ONE if last < 63 else ~np.uint64(0)
+    else:
+        rolled = words >> ONE
+        rolled[:, :-1] |= (words[:, 1:] & ONE) << np.uint64(63)
+        rolled[:, -1] |= (words[:, 0] & ONE) << last
+    return rolled
+
+
+def word_bits(words):
+    """
+The word_bits function unpacks bitboard words into their bits: bit i of word k is [k, i].
+
+:param words: A 1d uint64 array of bitboard words
+:return: A (len(words), 64) boolean array
+"""
+    return np.unpackbits(words.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little').view(bool)
+
+
+def pack_word_bits(bits):
+    """
+The pack_word_bits function packs the bits word_bits unpacked back into bitboard words.
+
+:param bits: A (words, 64) boolean array
+:return: A 1d uint64 array of bitboard words
+"""
+    return np.packbits(bits, axis=1, bitorder='little').view('<u8').astype(np.uint64).ravel()
+
+
+class BitEngine(GridEngine):
+    """
+    The BitEngine class runs the same generations as GridEngine, with the flags of the people packed into bitboards,
+    64 cells per uint64 word: who is there, who has the rumor and whose skepticism level is decreased, and the
+    cooldown as log2(L + 1) bit planes counted down with bitwise borrows. The 8 neighbors are reached by shifting
+    the bitboards around the torus, and the hits of a generation are added up with bitwise half adders, so a
+    generation costs a few operations per 64 cells. Random numbers are only drawn for the exposed pairs, in the order
+    of GridEngine, so both engines give the same runs: the words that have an exposed pair are unpacked to one byte
+    per cell to look up the level of the transmitters and to clear the failed transmissions. The generation every
+    person received the rumor in is not kept, and neither is the grid of levels: the first cell is drawn against the
+    board of the people, and the grid is only unpacked from the level boards when it is asked for.
+    """
+    STATE_ARRAYS = ('received_bits', 'decreased_bits', 'cooldown')
+
+    def __init__(self, grid, L, rng=None):
+        """
+    The __init__ function packs the grid into bitboards: one board of the people, and two boards with the bits
+    of their skepticism level codes. The grid itself is not kept.
+
+    :param self: Represent the instance of the class
+    :param grid: A 2d array with the skepticism level code of every cell, EMPTY where there is nobody
+    :param L: The number of generations a person waits before transmitting the rumor again
+    :param rng: The numpy random generator used for the transmissions
+    :return: The engine, with a reset state
+    """
+        grid = np.asarray(grid)
+        self.shape = grid.shape
+        self.columns = grid.shape[1]
+        self.occupied_bits = pack_bits(grid != EMPTY)
+        self.num_people = popcount(self.occupied_bits)
+        # the empty cells have every bit of EMPTY set, the people outside of the board of the people are masked out
+        self.level_bits = [pack_bits(grid & (1 << bit) != 0) & self.occupied_bits for bit in range(2)]
+        self.level_counts = np.array([self.count(cells) for cells in self.code_bits()])
+        self.l = L
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.reset()
+
+    def state_shape(self):
+        """
+    The state_shape function returns the shape of the grid the bitboards were packed from.
+
+    :param self: Represent the instance of the class
+    :return: The (rows, columns) shape of the grid
+    """
+        return self.shape
+
+    @property
+    def grid(self):
+        """
+    The grid property unpacks the skepticism level code of every cell from the level boards, for the code that reads
+    the grid of GridEngine (a checkpoint for instance). The grid is not kept, every read unpacks it again.
+
+    :param self: Represent the instance of the class
+    :return: A 2d int8 array of skepticism level codes, EMPTY where there is nobody
+    """
+        low, high = (unpack_bits(cells, self.columns).view(np.int8) for cells in self.level_bits)
+        grid = low + (high << 1)
+        grid[~self.occupied] = EMPTY
+        return grid
+
+    def code_bits(self):
+        """
+    The code_bits function splits the people by skepticism level code, from the two level boards.
+
+    :param self: Represent the instance of the class
+    :return: A list with the bitboard of the people of every level code, indexed by level code
+    """
+        low, high = self.level_bits
+        return [self.occupied_bits & (low if code & 1 else ~low) & (high if code & 2 else ~high)
+                for code in range(len(SKEPTICISM_LEVELS))]
+
+    def s4_bits(self):
+        """
+    The s4_bits function returns the bitboard of the s4 people, who never transmit unless they are decreased.
+
+    :param self: Represent the instance of the class
+    :return: A (rows, words) uint64 array
+    """
+        return self.level_bits[0] & self.level_bits[1]
+
+    def reset(self):
+        """
+    The reset function clears the rumor state of the bitboards.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        self.received_bits = np.zeros_like(self.occupied_bits)
+        self.decreased_bits = np.zeros_like(self.occupied_bits)
+        self.cooldown = np.zeros((max(1, int(self.l).bit_length()),) + self.occupied_bits.shape, dtype=np.uint64)
+        self.generation_progress = 0
+        self.count_has_r = 0
+        self.new_receivers = 0
+        self.num_transmitters = 0
+        self.next_check = 0
+        self.check_interval = self.l + 1
+
+    @property
+    def occupied(self):
+        """
+    The occupied property unpacks the people of the grid, for the code that reads the state arrays of GridEngine.
+
+    :param self: Represent the instance of the class
+    :return: A 2d boolean array
+    """
+        return unpack_bits(self.occupied_bits, self.columns)
+
+    @property
+    def received_rumor(self):
+        """
+    The received_rumor property unpacks the people that have the rumor.
+
+    :param self: Represent the instance of the class
+    :return: A 2d boolean array
+    """
+        return unpack_bits(self.received_bits, self.columns)
+
+    @property
+    def skepticism_level_decreased(self):
+        """
+    The skepticism_level_decreased property unpacks the people whose skepticism level is decreased.
+
+    :param self: Represent the instance of the class
+    :return: A 2d boolean array
+    """
+        return unpack_bits(self.decreased_bits, self.columns)
+
+    @property
+    def l_left(self):
+        """
+    The l_left property adds up the bit planes of the cooldown.
+
+    :param self: Represent the instance of the class
+    :return: A 2d array with the number of generations every person still waits
+    """
+        l_left = np.zeros(self.shape, dtype=np.min_scalar_type(max(self.l, 0)))
+        for bit, plane in enumerate(self.cooldown):
+            l_left += unpack_bits(plane, self.columns).astype(l_left.dtype) << bit
+        return l_left
+
+    def cooling_bits(self):
+        """
+    The cooling_bits function returns the bitboard of the people whose cooldown is not over.
+
+    :param self: Represent the instance of the class
+    :return: A (rows, words) uint64 array
+    """
+        return np.bitwise_or.reduce(self.cooldown, axis=0)
+
+    def start(self, x, y):
+        """
+    The start function gives the rumor to the cell (x, y) in generation 0.
+
+    :param self: Represent the instance of the class
+    :param x: The row of the first cell
+    :param y: The column of the first cell
+    :return: Nothing
+    """
+        self.received_bits[x, y // 64] |= ONE << np.uint64(y % 64)
+        self.count_has_r += 1
+        self.new_receivers = 1
+
+    def update_cells(self):
+        """
+    The update_cells function counts down the cooldowns that are not over, subtracting 1 from the bit planes
+    with a borrow that ripples from the lowest plane up.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        borrow = self.cooling_bits()
+        for plane in self.cooldown:
+            np.bitwise_xor(plane, borrow, out=plane)
+            # the borrow goes on where the plane was 0, that is where it is 1 now
+            borrow &= plane
+
+    def transmit(self, transmitters, forced=False):
+        """
+    The transmit function makes all the transmitters pass the rumor to their occupied neighbors at once, with the
+    rules of GridEngine.transmit. The successful transmissions of every direction are rolled onto their receivers and
+    added up with a half adder, which keeps the people hit at least once and at least twice.
+
+    :param self: Represent the instance of the class
+    :param transmitters: A (rows, words) uint64 bitboard of the cells that transmit in this generation
+    :param forced: Transmit to every occupied neighbor, whatever the skepticism level of the transmitter is
+    :return: Nothing
+    """
+        once = np.zeros_like(transmitters)
+        twice = np.zeros_like(transmitters)
+        transmitted = np.zeros_like(transmitters)
+        # the two bits of the level code every person transmits with: a decrease subtracts 1 from the code
+        low, high = self.level_bits
+        level_low = (low ^ self.decreased_bits).ravel()
+        level_high = (high ^ (self.decreased_bits & ~low)).ravel()
+        for dx, dy in NEIGHBOR_OFFSETS:
+            # bit (x, y) of success means (x, y) passed the rumor to (x + dx, y + dy)
+            success = transmitters & roll_bits(self.occupied_bits, (-dx, -dy), self.columns)
+            if not forced:
+                # draw only for the transmitters that have a neighbor in this direction, unpacking only the words
+                # that have one, into one byte per cell
+                flat = success.ravel()
+                set_words = np.flatnonzero(flat)
+                bits = word_bits(flat[set_words])
+                level = word_bits(level_low[set_words]).view(np.uint8)
+                level |= word_bits(level_high[set_words]).view(np.uint8) << np.uint8(1)
+                bits[bits] = self.draw(success) < TRANSMISSION_P[level[bits]]
+                flat[set_words] = pack_word_bits(bits)
+            transmitted |= success
+            hits = roll_bits(success, (dx, dy), self.columns)
+            twice |= once & hits
+            once |= hits
+        for bit, plane in enumerate(self.cooldown):
+            plane &= ~transmitted
+            if self.l >> bit & 1:
+                plane |= transmitted
+        self.num_transmitters = self.count(transmitters)
+        self.new_receivers = self.count(once & ~self.received_bits)
+        self.count_has_r += self.new_receivers
+        self.received_bits |= once
+        # the people above s1 may be decreased
+        self.decreased_bits = twice & (low | high)
+
+    def draw(self, cells):
+        """
+    The draw function draws one uniform random number in [0, 1) for every bit set in a bitboard.
+
+    :param self: Represent the instance of the class
+    :param cells: A (rows, words) uint64 bitboard of the cells that need a draw
+    :return: A 1d array of random numbers
+    """
+        return self.rng.random(self.count(cells))
+
+    def count(self, cells):
+        """
+    The count function counts the cells of a bitboard.
+
+    :param self: Represent the instance of the class
+    :param cells: A (rows, words) uint64 bitboard
+    :return: The number of cells set
+    """
+        return popcount(cells)
+
+    def step(self):
+        """
+    The step function runs one generation with the rules of GridEngine.step, on the bitboards.
+
+    :param self: Represent the instance of the class
+    :return: The number of people that have the rumor
+    """
+        if self.generation_progress == 0:
+            self.generation_progress += 1
+            self.transmit(self.received_bits.copy(), forced=True)
+            return self.count_has_r
+        self.update_cells()
+        self.generation_progress += 1
+        # an s4 person transmits only while his level is decreased
+        transmitters = self.received_bits & ~self.cooling_bits() & ~(self.s4_bits() & ~self.decreased_bits)
+        self.transmit(transmitters)
+        return self.count_has_r
+
+    def select_random_cell(self):
+        """
+    The select_random_cell function selects a random occupied cell of the grid with the draws of GridEngine,
+    rejecting the cells that are not set on the board of the people.
+
+    :param self: Represent the instance of the class
+    :return: The row and the column of the cell
+    """
+        if self.num_people == 0:
+            raise ValueError("there is nobody on the grid to start the rumor from")
+        while True:
+            x, y = divmod(int(self.draw_cell()), self.columns)
+            if self.occupied_bits[x, y // 64] >> np.uint64(y % 64) & ONE:
+                return x, y
+
+    def draw_cell(self):
+        """
+    The draw_cell function draws one random cell of the grid, occupied or not.
+
+    :param self: Represent the instance of the class
+    :return: The flat index of the cell
+    """
+        return self.rng.integers(self.shape[0] * self.shape[1])
+
+    def state_counts(self):
+        """
+    The state_counts function counts the people in every state of the rumor with bitwise operations.
+
+    :param self: Represent the instance of the class
+    :return: The number of people in cooldown, the number of people whose skepticism level is decreased,
+             and an array with the number of people at every skepticism level, indexed by level code
+    """
+        codes = self.code_bits()
+        # a decreased person counts at the level under his own
+        levels = [(codes[code] & ~self.decreased_bits) | (codes[code + 1] & self.decreased_bits if code + 1 < len(codes) else 0)
+                  for code in range(len(codes))]
+        skepticism = np.array([self.count(level) for level in levels])
+        return self.count(self.cooling_bits()), self.count(self.decreased_bits), skepticism
+
+    def absorbed(self):
+        """
+    The absorbed function checks if the rumor reached a fixed point, with the rules of GridEngine.absorbed,
+    on the bitboards.
+
+    :param self: Represent the instance of the class
+    :return: True if the rumor reached a fixed point
+    """
+        uninformed = self.occupied_bits & ~self.received_bits
+        exposed = np.zeros_like(uninformed)
+        for dx, dy in NEIGHBOR_OFFSETS:
+            exposed |= roll_bits(uninformed, (dx, dy), self.columns)
+        exposed &= self.received_bits
+        may_transmit = self.received_bits & ~self.s4_bits()
+        if self.count(exposed & may_transmit):
+            return False
+        while True:
+            once = np.zeros_like(may_transmit)
+            twice = np.zeros_like(may_transmit)
+            for dx, dy in NEIGHBOR_OFFSETS:
+                neighbors = roll_bits(may_transmit, (dx, dy), self.columns)
+                twice |= once & neighbors
+                once |= neighbors
+            grown = may_transmit | (self.received_bits & twice)
+            if self.count(grown) == self.count(may_transmit):
+                break
+            may_transmit = grown
+        return self.count(exposed & may_transmit) == 0
+
+
+# the engines a simulation can run on
+ENGINES = {
+    'dense': GridEngine,
+    'frontier': FrontierEngine,
+    'ensemble': EnsembleEngine,
+    'graph': GraphEngine,
+    'bits': BitEngine,
+}
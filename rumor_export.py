@@ -0,0 +1,287 @@
+"""
+Offline export of the rumor spreading simulation as frames, without a window. A frame is computed from the state
+arrays of the engine with numpy only, and the frames are handed in batches to a background writer thread, so the
+encoding does not stall the simulation. The frames are written as compressed .npz archives of batches of frames,
+as .ppm images (numpy only) or as .png images (with pygame, which needs no display to save an image).
+
+    python rumor_export.py --p 0.6 --l 7 --generations 50 --format png --scale 4 --output frames
+
+or from python:
+
+    simulation = Simulation(0.6, [0.25, 0.2, 0.3, 0.25], 50, 7, seed=1)
+    simulation.export_frames('frames', fmt='npz')
+"""
+import argparse
+import os
+import queue
+import threading
+
+import numpy as np
+
+from rumor_batch import add_simulation_args
+from rumor_engine import ENGINES, child_seeds, populate_grid, seed_sequence
+
+# the colors of the cells, the colors of Simulation.drawGrid, indexed by 0 for an empty cell,
+# 1 for a person and 2 for a person that has the rumor
+PALETTE = np.array([(0, 0, 0), (255, 255, 255), (0, 128, 0)], dtype=np.uint8)
+# the formats the frames can be written in
+FORMATS = ('npz', 'ppm', 'png')
+
+
+def frame_rgb(occupied, received_rumor, max_size=None, palette=PALETTE, scale=1):
+    """
+The frame_rgb function turns the state of the cells into colors of the palette, in one array operation.
+Grids larger than max_size are sampled every few cells first.
+
+:param occupied: A 2d boolean array of the cells that have a person
+:param received_rumor: A 2d boolean array of the people that have the rumor
+:param max_size: The largest number of rows and columns of the frame, None to keep every cell
+:param palette: A (3, 3) uint8 array with the color of an empty cell, of a person and of a person that has the rumor
+:param scale: The number of pixels of the side of a cell
+:return: A (rows, columns, 3) uint8 array of RGB colors, indexed like the grid
+"""
+    step = 1 if max_size is None else max(1, -(-max(occupied.shape) // max_size))
+    state = occupied[::step, ::step].astype(np.uint8)
+    state += received_rumor[::step, ::step]
+    if scale > 1:
+        state = state.repeat(scale, axis=0).repeat(scale, axis=1)
+    return palette[state]
+
+
+def ppm_bytes(frame):
+    """
+The ppm_bytes function encodes a frame as a binary PPM image, with numpy only.
+The rows of the grid go from left to right, like in the window of the simulation.
+
+:param frame: A (rows, columns, 3) uint8 array of RGB colors
+:return: The bytes of the image
+"""
+    image = np.ascontiguousarray(frame.transpose(1, 0, 2))
+    return b'P6 %d %d 255\n' % (image.shape[1], image.shape[0]) + image.tobytes()
+
+
+def write_ppm(filename, frame):
+    """
+The write_ppm function writes a frame as a binary PPM image, with numpy only.
+
+:param filename: The path of the image
+:param frame: A (rows, columns, 3) uint8 array of RGB colors
+:return: Nothing
+"""
+    with open(filename, 'wb') as file:
+        file.write(ppm_bytes(frame))
+
+
+def write_png(filename, frame):
+    """
+The write_png function writes a frame as a PNG image with pygame. Saving an image needs no display,
+so it works on headless servers.
+
+:param filename: The path of the image
+:param frame: A (rows, columns, 3) uint8 array of RGB colors
+:return: Nothing
+"""
+    import pygame
+    pygame.image.save(pygame.surfarray.make_surface(frame), filename)
+
+
+class FrameWriter:
+    def __init__(self, path, fmt='npz', batch_size=32, queue_size=4):
+        """
+    The __init__ function starts the writer thread of the frames. The frames are gathered in batches of batch_size,
+    and at most queue_size batches wait for the thread, so a slow disk slows the simulation down instead of
+    filling the memory.
+
+    :param self: Represent the instance of the class
+    :param path: The directory the frames are written to, created if needed
+    :param fmt: One of FORMATS
+    :param batch_size: The number of frames of a batch
+    :param queue_size: The number of batches that may wait for the writer thread
+    :return: The writer
+    """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown frame format {fmt!r}")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.frames = []
+        self.generations = []
+        self.files = []
+        self.error = None
+        self.queue = queue.Queue(queue_size)
+        self.thread = threading.Thread(target=self.work, name='frame-writer', daemon=True)
+        self.thread.start()
+
+    def add(self, generation, frame):
+        """
+    The add function adds the frame of a generation to the current batch, and hands the batch to the writer thread
+    when it is full.
+
+    :param self: Represent the instance of the class
+    :param generation: The generation of the frame
+    :param frame: A (rows, columns, 3) uint8 array of RGB colors
+    :return: Nothing
+    """
+        self.frames.append(frame)
+        self.generations.append(generation)
+        if len(self.frames) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+    The flush function hands the current batch to the writer thread.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        if self.error is not None:
+            raise self.error
+        if self.frames:
+            self.queue.put((np.stack(self.frames), self.generations))
+            self.frames = []
+            self.generations = []
+
+    def work(self):
+        """
+    The work function is the loop of the writer thread: it writes the batches until it gets None.
+    An error is kept and raised by the next flush or by close.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is None:
+                try:
+                    self.write(*batch)
+                except Exception as error:
+                    self.error = error
+
+    def write(self, frames, generations):
+        """
+    The write function writes a batch of frames: one .npz archive for the batch, or one image per frame.
+
+    :param self: Represent the instance of the class
+    :param frames: A (frames, rows, columns, 3) uint8 array
+    :param generations: The generation of every frame
+    :return: Nothing
+    """
+        if self.fmt == 'npz':
+            filename = os.path.join(self.path, f'frames_{generations[0]:06d}.npz')
+            np.savez_compressed(filename, frames=frames, generations=np.array(generations))
+            self.files.append(filename)
+            return
+        write_image = write_ppm if self.fmt == 'ppm' else write_png
+        for generation, frame in zip(generations, frames):
+            filename = os.path.join(self.path, f'frame_{generation:06d}.{self.fmt}')
+            write_image(filename, frame)
+            self.files.append(filename)
+
+    def close(self):
+        """
+    The close function writes the last batch, waits for the writer thread and raises its error if it had one.
+
+    :param self: Represent the instance of the class
+    :return: The list of the written files
+    """
+        try:
+            self.flush()
+        finally:
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.files
+
+    def __enter__(self):
+        """
+    The __enter__ function lets the writer be used in a with statement, which closes it.
+
+    :param self: Represent the instance of the class
+    :return: The writer
+    """
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+    The __exit__ function closes the writer at the end of the with statement.
+
+    :param self: Represent the instance of the class
+    :param exc_info: The exception raised in the with statement, if any
+    :return: Nothing
+    """
+        self.close()
+
+
+def export_run(engine, generations, path, select=None, fmt='npz', batch_size=32, max_size=None, scale=1):
+    """
+The export_run function runs one simulation on an engine from a random first cell, and writes the frames of the
+selected generations.
+
+:param engine: The engine from rumor_engine.ENGINES, with the random generator of the run
+:param generations: The number of generations to simulate
+:param path: The directory the frames are written to
+:param select: The generations to write, all of them if None
+:param fmt: One of FORMATS
+:param batch_size: The number of frames handed to the writer thread at once
+:param max_size: The largest number of rows and columns of a frame, None to keep every cell
+:param scale: The number of pixels of the side of a cell
+:return: The list of the written files
+"""
+    select = set(range(generations + 1) if select is None else select)
+    last = max(select, default=-1)
+    with FrameWriter(path, fmt, batch_size) as writer:
+        engine.reset()
+        engine.start(*engine.select_random_cell())
+        while True:
+            if engine.generation_progress in select:
+                writer.add(engine.generation_progress, frame_rgb(engine.occupied, engine.received_rumor, max_size,
+                                                                 scale=scale))
+            if engine.generation_progress >= min(generations, last):
+                break
+            engine.step()
+    return writer.files
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the simulation and export parameters from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Export the frames of a rumor spreading simulation without a display.")
+    add_simulation_args(parser, tolerance=False)
+    parser.add_argument("--every", type=int, default=1, help="write the frame of every this many generations")
+    parser.add_argument("--engine", choices=sorted(set(ENGINES) - {'ensemble', 'graph'}), default='dense', help="engine")
+    parser.add_argument("--format", choices=FORMATS, default='npz', help="npz archives of batches of frames, or images")
+    parser.add_argument("--batch-size", type=int, default=32, help="number of frames handed to the writer at once")
+    parser.add_argument("--max-size", type=int, default=None, help="sample larger grids down to this many rows")
+    parser.add_argument("--scale", type=int, default=1, help="number of pixels of the side of a cell")
+    parser.add_argument("--output", default='frames', help="directory the frames are written to")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+The main function exports the frames of the first run of the simulation given on the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    seed = seed_sequence(args.seed)
+    layout_seed, run_seed = child_seeds(seed, 0, 2)
+    grid = populate_grid(args.p, [args.s4, args.s3, args.s2, args.s1], args.grid_size,
+                         np.random.default_rng(layout_seed), args.layout)
+    engine = ENGINES[args.engine](grid, args.l, np.random.default_rng(run_seed))
+    files = export_run(engine, args.generations, args.output, range(0, args.generations + 1, args.every), args.format,
+                       args.batch_size, args.max_size, args.scale)
+    print(f'{len(files)} files written to {args.output} (seed {seed.entropy})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+"""
+Contact networks of the rumor spreading simulation. The people are the nodes of a network, stored as a compressed
+sparse row (CSR) adjacency, and rumor_engine.GraphEngine runs the rules of the grid on it: the skepticism levels,
+the temporary decrease and the L-generation cooldown. The toroidal grid is one of the generated topologies,
+next to random graphs and small worlds, and real social graphs are loaded from edge lists.
+A network is saved as two .npy files, which are memory-mapped when it is loaded again, so a network of 10^7 nodes
+is reloaded at once and shared by the processes that run on it.
+
+    python rumor_graph.py --edges edges.txt --save network --runs 10
+    python rumor_graph.py --graph network --runs 10
+    python rumor_graph.py --topology small_world --nodes 1000000 --degree 10 --runs 10
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+
+import numpy as np
+
+from rumor_batch import add_simulation_args
+from rumor_engine import GraphEngine, child_seeds, lattice_adjacency, populate_nodes, seed_sequence
+
+
+class Graph:
+    def __init__(self, indptr, indices):
+        """
+    The __init__ function wraps the arrays of a CSR adjacency: the neighbors of node i are
+    indices[indptr[i]:indptr[i + 1]].
+
+    :param self: Represent the instance of the class
+    :param indptr: A 1d array of num_nodes + 1 edge offsets
+    :param indices: A 1d array with the neighbor of every edge
+    :return: The graph
+    """
+        self.indptr = indptr
+        self.indices = indices
+        self.num_nodes = len(indptr) - 1
+
+    @property
+    def num_edges(self):
+        """
+    The num_edges property is the number of edges of the adjacency, an undirected edge counts twice.
+
+    :param self: Represent the instance of the class
+    :return: The number of edges
+    """
+        return len(self.indices)
+
+    def degrees(self):
+        """
+    The degrees function returns the number of neighbors of every node.
+
+    :param self: Represent the instance of the class
+    :return: A 1d array of degrees
+    """
+        return np.diff(self.indptr)
+
+    def save(self, path):
+        """
+    The save function writes the graph to the directory path, as indptr.npy and indices.npy.
+
+    :param self: Represent the instance of the class
+    :param path: The directory of the graph, created if needed
+    :return: Nothing
+    """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'indices.npy'), self.indices)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+    The load function reads a graph written by save.
+
+    :param cls: The class
+    :param path: The directory of the graph
+    :param mmap: Memory-map the arrays read-only instead of reading them, so only the edges that are used are read
+    :return: The graph
+    """
+        mmap_mode = 'r' if mmap else None
+        return cls(np.load(os.path.join(path, 'indptr.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'indices.npy'), mmap_mode=mmap_mode))
+
+    @classmethod
+    def from_edges(cls, sources, targets, num_nodes=None, directed=False):
+        """
+    The from_edges function builds the CSR adjacency of an edge list. The self loops and the repeated edges are
+    dropped, and the neighbors of every node are sorted.
+
+    :param cls: The class
+    :param sources: A 1d array with the first node of every edge
+    :param targets: A 1d array with the second node of every edge
+    :param num_nodes: The number of nodes, the largest node + 1 if None
+    :param directed: Keep the edges in one direction only, the rumor then goes from source to target
+    :return: The graph
+    """
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if num_nodes is None:
+            num_nodes = int(max(sources.max(initial=-1), targets.max(initial=-1))) + 1
+        if not directed:
+            sources, targets = np.concatenate([sources, targets]), np.concatenate([targets, sources])
+        keep = sources != targets
+        # sorting the edges by source and then by target, and removing the repeated ones, is one unique of a key
+        edges = np.unique(sources[keep] * num_nodes + targets[keep])
+        sources, targets = np.divmod(edges, num_nodes)
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=num_nodes), out=indptr[1:])
+        return cls(indptr, targets.astype(np.int32 if num_nodes < 2 ** 31 else np.int64))
+
+    @classmethod
+    def from_edge_list(cls, filename, num_nodes=None, directed=False):
+        """
+    The from_edge_list function reads a text file with one "source target" edge per line, like the SNAP datasets.
+    The comment lines at the start of the file (# or %) are skipped.
+
+    :param cls: The class
+    :param filename: The path of the edge list
+    :param num_nodes: The number of nodes, the largest node + 1 if None
+    :param directed: Keep the edges in one direction only
+    :return: The graph
+    """
+        with open(filename, 'rb') as file:
+            while True:
+                position = file.tell()
+                line = file.readline()
+                if not line.lstrip().startswith((b'#', b'%')):
+                    break
+            file.seek(position)
+            edges = np.fromfile(file, dtype=np.int64, sep=' ')
+        if edges.size % 2:
+            raise ValueError(f"{filename} does not have two nodes on every line")
+        edges = edges.reshape(-1, 2)
+        return cls.from_edges(edges[:, 0], edges[:, 1], num_nodes, directed)
+
+
+def lattice_graph(num_nodes, rng=None):
+    """
+The lattice_graph function returns the toroidal 8-neighbor grid of the simulation as a graph: the largest square grid
+of at most num_nodes cells, whose node x * grid_size + y is the cell (x, y).
+
+:param num_nodes: The number of nodes, the square of the grid size for a grid of exactly num_nodes cells
+:param rng: Unused, every topology takes a random generator
+:return: The graph
+"""
+    grid_size = math.isqrt(num_nodes)
+    return Graph(*lattice_adjacency((grid_size, grid_size)))
+
+
+def random_graph(num_nodes, degree, rng=None):
+    """
+The random_graph function draws an Erdos-Renyi graph with num_nodes * degree / 2 random edges.
+
+:param num_nodes: The number of nodes
+:param degree: The average number of neighbors of a node
+:param rng: The numpy random generator of the edges
+:return: The graph
+"""
+    rng = np.random.default_rng() if rng is None else rng
+    num_edges = int(num_nodes * degree / 2)
+    return Graph.from_edges(rng.integers(num_nodes, size=num_edges), rng.integers(num_nodes, size=num_edges), num_nodes)
+
+
+def small_world_graph(num_nodes, degree, rng=None, rewire=0.1):
+    """
+The small_world_graph function draws a Watts-Strogatz graph: a ring where every node is linked to its degree / 2
+next nodes, and every edge is rewired to a random node with probability rewire.
+
+:param num_nodes: The number of nodes
+:param degree: The number of neighbors of a node before the rewiring, an even number
+:param rng: The numpy random generator of the rewiring
+:param rewire: The probability that an edge is rewired
+:return: The graph
+"""
+    rng = np.random.default_rng() if rng is None else rng
+    half = degree // 2
+    sources = np.repeat(np.arange(num_nodes, dtype=np.int64), half)
+    targets = (sources + np.tile(np.arange(1, half + 1), num_nodes)) % num_nodes
+    rewired = rng.random(targets.size) < rewire
+    targets[rewired] = rng.integers(num_nodes, size=np.count_nonzero(rewired))
+    return Graph.from_edges(sources, targets, num_nodes)
+
+
+# the generated topologies, built from a number of nodes and a degree (the lattice always has 8 neighbors per node)
+TOPOLOGIES = {
+    'lattice': lambda num_nodes, degree, rng: lattice_graph(num_nodes, rng),
+    'random': random_graph,
+    'small_world': small_world_graph,
+}
+
+
+def run_graph(graph, p_people, p_skepticism, L, generations, numruns=1, seed=None, tolerance=None):
+    """
+The run_graph function places the people on the nodes of a graph and runs the simulation numruns times on it.
+Like rumor_batch.run_batch, the people are placed with the first stream spawned from the seed and run n draws from
+stream n + 1, so on lattice_graph(grid_size ** 2) it gives the same runs as the frontier engine on the grid.
+
+:param graph: The Graph
+:param p_people: The fraction of the nodes that have a person
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations to simulate
+:param numruns: The number of runs
+:param seed: An int or a numpy SeedSequence, a fresh one if None
+:param tolerance: The steady state tolerance of rumor_engine.GridEngine.settled, None to stop only at a fixed point
+:return: A (numruns, generations + 1) array with the percentage of people that have the rumor in every generation
+"""
+    seed = seed_sequence(seed)
+    levels = populate_nodes(graph.num_nodes, p_people, p_skepticism, np.random.default_rng(child_seeds(seed, 0, 1)[0]))
+    engine = GraphEngine(levels, L, adjacency=graph)
+    count_by_gen_per = np.zeros((numruns, generations + 1))
+    for n, run_seed in enumerate(child_seeds(seed, 1, 1 + numruns)):
+        engine.rng = np.random.default_rng(run_seed)
+        count_by_gen_per[n] = engine.run(generations, tolerance)
+    return count_by_gen_per
+
+
+def parse_args(argv=None):
+    """
+The parse_args function reads the network and the simulation parameters from the command line.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: The parsed arguments
+"""
+    parser = argparse.ArgumentParser(description="Run the rumor spreading simulation on a contact network.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--edges", default=None, help="text edge list to load, one 'source target' pair per line")
+    source.add_argument("--graph", default=None, help="directory of a graph written by --save, memory-mapped")
+    source.add_argument("--topology", choices=sorted(TOPOLOGIES), default='small_world', help="generated topology")
+    parser.add_argument("--directed", action="store_true", help="the edges of --edges go one way only")
+    parser.add_argument("--nodes", type=int, default=10000, help="number of nodes of the generated topology "
+                                                                 "(the lattice takes the largest square grid that fits)")
+    parser.add_argument("--degree", type=int, default=8, help="average degree of the generated topology")
+    parser.add_argument("--save", default=None, help="save the graph to this directory for fast reloads")
+    add_simulation_args(parser, grid=False, layout=False)
+    # every node of a network has a person by default
+    parser.set_defaults(p=1.0)
+    parser.add_argument("--runs", type=int, default=10, help="number of runs")
+    parser.add_argument("--per-run", action="store_true", help="write every run instead of the average")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+The main function loads or generates the network given on the command line, runs the simulation on it, and writes
+the percentage of people that have the rumor per generation to stdout as CSV.
+
+:param argv: The command line arguments, sys.argv[1:] if None
+:return: Nothing
+"""
+    args = parse_args(argv)
+    seed = seed_sequence(args.seed)
+    graph_seed, runs_seed = child_seeds(seed, 0, 2)
+    if args.edges:
+        graph = Graph.from_edge_list(args.edges, directed=args.directed)
+    elif args.graph:
+        graph = Graph.load(args.graph)
+    else:
+        graph = TOPOLOGIES[args.topology](args.nodes, args.degree, np.random.default_rng(graph_seed))
+    if args.save:
+        graph.save(args.save)
+    p_skepticism = [args.s4, args.s3, args.s2, args.s1]
+    count_by_gen_per = run_graph(graph, args.p, p_skepticism, args.l, args.generations, args.runs, runs_seed,
+                                 args.tolerance)
+    writer = csv.writer(sys.stdout)
+    writer.writerow(['Seed', 'Nodes', 'Edges', 'P', 'S4', 'S3', 'S2', 'S1', 'L', 'Run']
+                    + [f'Generation {i}' for i in range(args.generations + 1)])
+    params = [seed.entropy, graph.num_nodes, graph.num_edges, args.p] + p_skepticism + [args.l]
+    if args.per_run:
+        for n, count_by_gen in enumerate(count_by_gen_per):
+            writer.writerow(params + [n] + list(count_by_gen))
+    else:
+        writer.writerow(params + ['average'] + list(count_by_gen_per.mean(axis=0)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,351 @@
+"""
+The window of the rumor spreading simulation: the parameters of the simulation are entered in a tkinter form,
+and the simulations run one after the other in a background worker, with their progress, a preview of their grid
+and the plot of their results. It is kept apart from RumorSpreadingSimulation.py, so the simulation can be imported
+and run without loading tkinter and matplotlib.
+"""
+import queue
+import tkinter as tk
+import tkinter.messagebox as messagebox
+from tkinter import ttk
+
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from RumorSpreadingSimulation import (Simulation, SimulationJob, SimulationWorker, default_l, default_num_generations,
+                                      default_numofruns, default_p, default_s1, default_s2, default_s3, default_s4,
+                                      PREVIEW_SIZE)
+from rumor_export import ppm_bytes
+
+
+class GUI:
+    def __init__(self):
+        """
+    The __init__ function is called when the class is instantiated.
+    It sets up the window and all of its widgets, including labels, entry boxes, and buttons.
+    The default values for each parameter are set in this function as well.
+
+    The simulations run one after the other in a background worker, and the window shows the progress of the
+    running one, a preview of its grid and the list of the queued jobs.
+
+    :param self: Refer to the object itself
+    :param numofruns: Determine how many times the simulation will run
+    :return: The window object
+    """
+        self.window = tk.Tk()
+        self.window.title("Rumor Spreading Simulation")
+        self.window.geometry("1000x800")
+        self.rumor_spreader = tk.StringVar()
+        self.rumor_spreader.set("random")
+        label_font = ("Arial", 18)  # Set the font for the labels
+        entry_font = ("Arial", 16)  # Set the font for the entry boxes
+
+        # Create labels and entry boxes for each parameter
+        tk.Label(self.window, text="Population Density (P):",font=label_font,pady=10,anchor='w').grid(row=0, column=0)
+        self.p_entry = tk.Entry(self.window,font=entry_font)
+        self.p_entry.insert(0, str(default_p))  # Set default value
+        self.p_entry.grid(row=0, column=1)
+
+        tk.Label(self.window, text="Skepticism Level S4 (%):" ,font=label_font,pady=10,anchor='w').grid(row=1, column=0)
+        self.s4_entry = tk.Entry(self.window,font=entry_font)
+        self.s4_entry.insert(0, str(default_s4))  # Set default value
+        self.s4_entry.grid(row=1, column=1)
+
+        tk.Label(self.window, text="Skepticism Level S3 (%):",font=label_font,pady=10,anchor='w').grid(row=2, column=0)
+        self.s3_entry = tk.Entry(self.window,font=entry_font)
+        self.s3_entry.insert(0, str(default_s3))  # Set default value
+        self.s3_entry.grid(row=2, column=1)
+
+        tk.Label(self.window, text="Skepticism Level S2 (%):",font=label_font,pady=10,anchor='w').grid(row=3, column=0)
+        self.s2_entry = tk.Entry(self.window,font=entry_font)
+        self.s2_entry.insert(0, str(default_s2))  # Set default value
+        self.s2_entry.grid(row=3, column=1)
+
+        tk.Label(self.window, text="Skepticism Level S1 (%):",font=label_font,pady=10,anchor='w').grid(row=4, column=0)
+        self.s1_entry = tk.Entry(self.window,font=entry_font)
+        self.s1_entry.insert(0, str(default_s1))  # Set default value
+        self.s1_entry.grid(row=4, column=1)
+
+        tk.Label(self.window, text="Generations before re-transmission (L):",font=label_font,pady=10,anchor='w').grid(row=5, column=0)
+        self.l_entry = tk.Entry(self.window,font=entry_font)
+        self.l_entry.insert(0, str(default_l))  # Set default value
+        self.l_entry.grid(row=5, column=1)
+
+        tk.Label(self.window, text="Number of generations to simulate:",font=label_font,pady=10,anchor='w').grid(row=6, column=0)
+        self.num_generations_entry = tk.Entry(self.window,font=entry_font)
+        self.num_generations_entry.insert(0, str(default_num_generations))  # Set default value
+        self.num_generations_entry.grid(row=6, column=1)
+
+        # Add a label and a spinbox for the number of runs
+        tk.Label(self.window, text="Number of Runs:", font=("Arial", 18), pady=10, anchor='w').grid(row=7, column=0)
+        self.num_runs = tk.Entry(self.window, font=entry_font)
+        self.num_runs.insert(0,str(default_numofruns))  # Set default value
+        self.num_runs.grid(row=7, column=1)
+
+        # Create a button to start the simulation
+        self.start_button = tk.Button(self.window, text="Start Simulation",font=("Arial", 16),pady=10,anchor='w', width=13, height=2, command=self.start_simulation)
+        self.start_button.grid(row=8, column=0, columnspan=2, pady=10)
+        self.start_button.bind("<Enter>", self.on_enter)
+        self.start_button.bind("<Leave>", self.on_leave)
+
+        # the progress of the running job, and the button that cancels the selected or the running job
+        self.progress_bar = ttk.Progressbar(self.window, length=400, maximum=100)
+        self.progress_bar.grid(row=9, column=0, pady=5)
+        self.cancel_button = tk.Button(self.window, text="Cancel", font=("Arial", 14), command=self.cancel_job)
+        self.cancel_button.grid(row=9, column=1)
+        self.status = tk.StringVar(value="No simulation is running")
+        tk.Label(self.window, textvariable=self.status, font=("Arial", 12)).grid(row=10, column=0, columnspan=2)
+        self.jobs_list = tk.Listbox(self.window, width=90, height=6)
+        self.jobs_list.grid(row=11, column=0, columnspan=3, padx=10)
+        # a preview of the grid of the running job
+        self.preview = tk.Label(self.window)
+        self.preview.grid(row=0, column=2, rowspan=8, padx=10)
+        self.preview_image = None
+
+        self.jobs = []
+        self.worker = SimulationWorker()
+        self.window.after(100, self.poll)
+
+
+    def on_enter(self, event):
+        """
+    The on_enter function is called when the mouse pointer enters the start_button widget.
+    The function changes the background color of start_button to green and its foreground color to white.
+
+    :param self: Represent the instance of the class
+    :param event: Get the event that triggered this function
+    :return: The button's background color and text color to their original values
+    """
+        self.start_button.config(bg="#4caf50", fg="#ffffff")
+
+    def on_leave(self, event):
+        """
+    The on_leave function is a callback function that changes the color of the start button when
+    the mouse leaves it. It takes in an event parameter, which is used to change the background and
+    foreground colors of the start button.
+
+    :param self: Represent the instance of the class
+    :param event: Get the event that caused the function to be called
+    :return: The start button with a white background and black text
+    """
+        self.start_button.config(bg="#ffffff", fg="#000000")
+
+    def validate_input(self, parameter, value):
+            """
+    The validate_input function takes in a parameter and value, and checks to see if the value is valid for that parameter.
+    If it is not valid, then False will be returned. If it is valid, True will be returned.
+
+    :param self: Access the instance variables of the class
+    :param parameter: Check which parameter is being validated
+    :param value: Store the value of the parameter that is passed in
+    :return: True if the input is valid, and false otherwise
+    """
+            if parameter == "p":
+                try:
+                    value = float(value)
+                    if value < 0:
+                        return False
+                except ValueError:
+                    return False
+
+            elif parameter == "l":
+                try:
+                    value = int(value)
+                    if not (0 <= value):
+                        return False
+                except ValueError:
+                    return False
+            elif parameter == "g":
+                try:
+                    value = int(value)
+                    if not (0 <= value):
+                        return False
+                except ValueError:
+                    return False
+            elif parameter == "s":
+                sum=0
+                for s in value:
+                    try:
+                        sint = int(s)
+                    except ValueError:
+                        return False
+                    sum+=sint
+                if not (sum==100):
+                    return False
+            elif parameter == "n":
+                try:
+                    value = int(value)
+                    if not (0 < value):
+                        return False
+                except ValueError:
+                        return False
+            return True
+    def start_simulation(self):
+        """
+    The start_simulation function is called when the user clicks on the &quot;Start Simulation&quot; button.
+    It takes in all of the values from each entry box and validates them to make sure they are within
+    the acceptable range. If any value is not, it will use a default value instead and display a warning messagebox.
+    If all values are valid, it will create an instance of the Simulation class with those parameters and queue its runs
+    in the background worker, so several parameter sets can be queued while the window stays responsive.
+
+    :param self: Refer to the instance of the class
+    :return: The simulation
+    """
+        p = self.p_entry.get()
+        s4 = self.s4_entry.get()
+        s3 = self.s3_entry.get()
+        s2 = self.s2_entry.get()
+        s1 = self.s1_entry.get()
+        l = self.l_entry.get()
+        num_generations = self.num_generations_entry.get()
+        num_runs=self.num_runs.get()
+        if not self.validate_input("p",p):
+            p = default_p
+            messagebox.showwarning("Invalid Input", "Invalid value for Population Density. Using default value.")
+        if not self.validate_input("l", l):
+            l = default_l
+            messagebox.showwarning("Invalid Input",
+                                   "Invalid value for Generations before re-transmission. Using default value.")
+        if not self.validate_input("g", num_generations):
+            num_generations = default_num_generations
+            messagebox.showwarning("Invalid Input",
+                                   "Invalid value for Number of generations to simulate. Using default value.")
+        if not self.validate_input("s", [s1,s2,s3,s4]):
+            s1 = default_s1
+            s2=default_s2
+            s3=default_s3
+            s4=default_s4
+            messagebox.showwarning("Invalid Input",
+                                   "Invalid value for S1/S2/S3/S4 to simulate. Using default value.")
+        if not self.validate_input("n", num_runs):
+            num_runs = default_numofruns
+            messagebox.showwarning("Invalid Input",
+                                   "Invalid value for Number of runs to simulate. Using default value.")
+
+        p = float(p)
+        s4 = float(s4)/100
+        s3 = float(s3)/100
+        s2 = float(s2)/100
+        s1 = float(s1)/100
+        l = int(l)
+        num_generations =int(num_generations)
+        num_runs=int(num_runs)
+
+
+
+
+        self.simulation = Simulation(p,[s4, s3, s2, s1],num_generations,l)  # Create instance of Simulation class
+
+        # Queue the runs in the background worker, the window stays responsive while they run
+        job = SimulationJob(self.simulation, num_runs)
+        self.jobs.append(job)
+        self.worker.submit(job)
+        self.refresh_jobs()
+
+    def cancel_job(self):
+        """
+    The cancel_job function cancels the job selected in the list, or the running job if none is selected.
+    A queued job is skipped by the worker, and a running job stops at its next generation.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        selection = self.jobs_list.curselection()
+        job = self.jobs[selection[0]] if selection else self.worker.current
+        if job is not None and job.status in ('queued', 'running'):
+            job.cancel.set()
+
+    def poll(self):
+        """
+    The poll function runs in the tkinter main loop every 100 ms: it shows the results of the finished jobs,
+    and updates the progress bar, the preview and the list of the jobs.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        while True:
+            try:
+                job = self.worker.finished.get_nowait()
+            except queue.Empty:
+                break
+            if job.status == 'done':
+                self.show_results(job)
+            elif job.status == 'failed':
+                messagebox.showerror("Simulation failed", str(job.error))
+        job = self.worker.current
+        if job is None:
+            self.progress_bar['value'] = 0
+            self.status.set("No simulation is running")
+        else:
+            self.progress_bar['value'] = job.percent()
+            self.status.set(f"Run {job.run + 1} of {job.numruns}, generation {job.generation} of {job.simulation.generation}")
+            self.draw_preview(job)
+        self.refresh_jobs()
+        self.window.after(100, self.poll)
+
+    def draw_preview(self, job):
+        """
+    The draw_preview function shows the last frame the worker published of the grid of a running job, with the
+    colors of drawGrid. The frame is a copy, the state arrays of the engine are only read by the worker thread.
+
+    :param self: Represent the instance of the class
+    :param job: The running SimulationJob
+    :return: Nothing
+    """
+        try:
+            frame = job.frames.get_nowait()
+        except queue.Empty:
+            return
+        # small grids are enlarged to about the size of the preview
+        scale = max(1, PREVIEW_SIZE // max(frame.shape[:2]))
+        frame = frame.repeat(scale, axis=0).repeat(scale, axis=1)
+        self.preview_image = tk.PhotoImage(data=ppm_bytes(frame), format='PPM')
+        self.preview.config(image=self.preview_image)
+
+    def refresh_jobs(self):
+        """
+    The refresh_jobs function updates the list of the jobs and their status.
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        lines = [f'{i + 1}. {job.describe()}' for i, job in enumerate(self.jobs)]
+        if list(self.jobs_list.get(0, tk.END)) != lines:
+            selection = self.jobs_list.curselection()
+            self.jobs_list.delete(0, tk.END)
+            for line in lines:
+                self.jobs_list.insert(tk.END, line)
+            for i in selection:
+                self.jobs_list.selection_set(i)
+
+    def show_results(self, job):
+        """
+    The show_results function opens a window with the plot of a finished job.
+    The runs were already saved to the results store by the worker.
+
+    :param self: Represent the instance of the class
+    :param job: The finished SimulationJob
+    :return: Nothing
+    """
+        average_count_by_gen = np.mean(job.result, axis=0)
+        top = tk.Toplevel(self.window)
+        top.title("Rumor Spreading Simulation results")
+        fig = Figure(figsize=(8, 6))
+        job.simulation.draw_results(fig, average_count_by_gen, job.numruns)
+        canvas = FigureCanvasTkAgg(fig, master=top)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    def run(self):
+        """
+    The run function is the main loop of the program. It starts by creating a window object, which is an instance of
+    the Tkinter class. The window object has many methods and attributes that can be used to customize it, such as its
+    title or size. After this, we create a canvas widget on top of our window using the Canvas method from Tkinter. This
+    canvas widget will be used to draw all shapes in our game onto it (such as circles for balls). We then create an
+    instance of PongGame called pong_game and pass in self (which refers to this class)
+
+    :param self: Represent the instance of the class
+    :return: Nothing
+    """
+        self.window.mainloop()
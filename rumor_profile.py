@@ -0,0 +1,174 @@
+"""
+Opt-in profiler of the rumor spreading simulation. It records the wall time and the number of calls of every phase
+of a generation (the cooldown update, the transmission, the rendering and the I/O) and counters such as the number
+of random draws and the bytes of the neighbor indices the frontier and graph engines gather.
+It instruments an object by replacing some of its methods with timed wrappers on that object only, so a simulation
+without a profiler runs the plain methods and pays nothing.
+
+    profiler = Profiler(events=True)
+    simulation = Simulation(0.6, [0.25, 0.2, 0.3, 0.25], 50, 7, profiler=profiler)
+    simulation.run_simulation(10)
+    profiler.dump('profile.json')
+
+The file is a Chrome trace (chrome://tracing or https://ui.perfetto.dev open it), with the totals of every phase
+and every counter next to the trace events.
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+class Profiler:
+    def __init__(self, events=False):
+        """
+    The __init__ function creates an empty profiler.
+
+    :param self: Represent the instance of the class
+    :param events: Also keep every timed call as a trace event, not only the totals of the phases
+    :return: The profiler
+    """
+        self.phases = {}
+        self.counters = {}
+        self.events = [] if events else None
+        self.origin = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def add(self, phase, start, stop):
+        """
+    The add function records one call of a phase.
+
+    :param self: Represent the instance of the class
+    :param phase: The name of the phase
+    :param start: The time.perf_counter() the call started at
+    :param stop: The time.perf_counter() the call ended at
+    :return: Nothing
+    """
+        with self.lock:
+            calls, seconds = self.phases.get(phase, (0, 0.0))
+            self.phases[phase] = (calls + 1, seconds + stop - start)
+            if self.events is not None:
+                self.events.append({'name': phase, 'ph': 'X', 'ts': (start - self.origin) * 1e6,
+                                    'dur': (stop - start) * 1e6, 'pid': os.getpid(), 'tid': threading.get_ident()})
+
+    def count(self, counter, amount):
+        """
+    The count function adds amount to a counter.
+
+    :param self: Represent the instance of the class
+    :param counter: The name of the counter
+    :param amount: The amount to add
+    :return: Nothing
+    """
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + int(amount)
+
+    def timed(self, func, phase):
+        """
+    The timed function wraps func so that every call is recorded as a call of phase.
+
+    :param self: Represent the instance of the class
+    :param func: The function to time
+    :param phase: The name of the phase
+    :return: The wrapped function
+    """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(phase, start, time.perf_counter())
+        return wrapper
+
+    def counted(self, func, counter, measure):
+        """
+    The counted function wraps func so that every call adds measure(result) to a counter.
+
+    :param self: Represent the instance of the class
+    :param func: The function to count
+    :param counter: The name of the counter
+    :param measure: A function of the result of func that returns the amount to add
+    :return: The wrapped function
+    """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            self.count(counter, measure(result))
+            return result
+        return wrapper
+
+    def instrument(self, obj, method, phase):
+        """
+    The instrument function times a method of one object, the other objects of its class are not affected.
+
+    :param self: Represent the instance of the class
+    :param obj: The object
+    :param method: The name of the method
+    :param phase: The name of the phase the calls are recorded as
+    :return: Nothing
+    """
+        setattr(obj, method, self.timed(getattr(obj, method), phase))
+
+    def instrument_engine(self, engine):
+        """
+    The instrument_engine function times the phases of a generation of an engine from rumor_engine: the cooldown
+    update and the transmission, and counts the random draws of the transmissions and of the first cell.
+    The neighbor_bytes counter only counts the neighbor index arrays the frontier and graph engines gather for their
+    active cells (their neighbors method), the whole-grid engines do not gather any.
+
+    :param self: Represent the instance of the class
+    :param engine: The engine
+    :return: The engine
+    """
+        self.instrument(engine, 'update_cells', 'cooldown')
+        self.instrument(engine, 'transmit', 'transmit')
+        engine.draw = self.counted(engine.draw, 'rng_draws', len)
+        engine.draw_cell = self.counted(engine.draw_cell, 'rng_draws', lambda cell: 1)
+        if hasattr(engine, 'neighbors'):
+            engine.neighbors = self.counted(engine.neighbors, 'neighbor_bytes', lambda neighbors: neighbors.nbytes)
+        return engine
+
+    def instrument_simulation(self, simulation):
+        """
+    The instrument_simulation function times the rendering and the I/O of a Simulation. The engines, and their
+    counters, are instrumented when the simulation builds them.
+
+    :param self: Represent the instance of the class
+    :param simulation: The RumorSpreadingSimulation.Simulation
+    :return: The simulation
+    """
+        self.instrument(simulation, 'drawGrid', 'render')
+        self.instrument(simulation, 'show_params', 'render')
+        self.instrument(simulation, 'save_results', 'io')
+        self.instrument(simulation, 'plot_results', 'io')
+        return simulation
+
+    def to_dict(self):
+        """
+    The to_dict function returns the totals of the profiler.
+
+    :param self: Represent the instance of the class
+    :return: A dict with the calls, the seconds and the mean seconds of every phase, and the counters
+    """
+        with self.lock:
+            phases = {phase: {'calls': calls, 'seconds': seconds, 'mean_seconds': seconds / calls}
+                      for phase, (calls, seconds) in self.phases.items()}
+            return {'phases': phases, 'counters': dict(self.counters)}
+
+    def dump(self, filename):
+        """
+    The dump function writes the profiler to a JSON file in the Chrome trace format, with the totals next to
+    the trace events.
+
+    :param self: Represent the instance of the class
+    :param filename: The path of the file
+    :return: Nothing
+    """
+        report = self.to_dict()
+        with self.lock:
+            report['traceEvents'] = list(self.events or [])
+        with open(filename, 'w') as file:
+            json.dump(report, file, indent=1)
+
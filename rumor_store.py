@@ -0,0 +1,148 @@
+"""
+Results store of the rumor spreading simulation, which replaces average_count_by_gen.csv.
+Every batch of runs is saved as its own .npz file, with typed parameter columns, the seed, the per-run series
+and their average. A file is written under a temporary name and renamed when it is complete, so any number of
+processes can append to the same store at once. The file name starts with a hash of the parameters, so the
+results of a parameter tuple are found without opening the other files.
+
+    store = ResultsStore('results')
+    store.append(count_by_gen_per, seed, p_people=0.6, p_skepticism=[0.25, 0.2, 0.3, 0.25], L=7)
+    for entry in store.find(p_people=0.6, p_skepticism=[0.25, 0.2, 0.3, 0.25], L=7, generations=50):
+        print(entry['seed'], entry['average'])
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import uuid
+
+import numpy as np
+
+from rumor_engine import GRID_SIZE, seed_sequence
+
+# the default directory of the store
+RESULTS_DIR = 'results'
+# the typed parameter columns of the store
+PARAM_COLUMNS = ('p_people', 's4', 's3', 's2', 's1', 'L', 'generations', 'grid_size', 'layout', 'engine')
+
+
+def params_row(p_people, p_skepticism, L, generations, grid_size=GRID_SIZE, layout='random', engine='dense'):
+    """
+The params_row function puts the parameters of a batch of runs in the canonical form of the store columns.
+
+:param p_people: The population density
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param L: The number of generations a person waits before transmitting the rumor again
+:param generations: The number of generations simulated
+:param grid_size: The number of rows and columns of the grid
+:param layout: The initial layout of the levels of skepticism
+:param engine: The name of the engine the runs ran on
+:return: A dict with a typed value for every column of PARAM_COLUMNS
+"""
+    s4, s3, s2, s1 = (float(percent) for percent in p_skepticism)
+    return {'p_people': float(p_people), 's4': s4, 's3': s3, 's2': s2, 's1': s1, 'L': int(L),
+            'generations': int(generations), 'grid_size': int(grid_size), 'layout': str(layout), 'engine': str(engine)}
+
+
+def params_canonical(row):
+    """
+The params_canonical function writes a parameters row as a string, the same for the same parameters.
+
+:param row: A dict returned by params_row
+:return: A string
+"""
+    return ','.join(f'{column}={row[column]!r}' for column in PARAM_COLUMNS)
+
+
+def params_key(row):
+    """
+The params_key function hashes a parameters row, it is the prefix of the files of these parameters.
+
+:param row: A dict returned by params_row
+:return: A hex string
+"""
+    return hashlib.sha1(params_canonical(row).encode()).hexdigest()[:16]
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DIR):
+        """
+    The __init__ function opens the store in the directory path, and creates the directory if needed.
+
+    :param self: Represent the instance of the class
+    :param path: The directory of the store
+    :return: The store
+    """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def append(self, count_by_gen_per, seed, **params):
+        """
+    The append function saves a batch of runs as a new file of the store. The file is written under a temporary
+    name and renamed when it is complete, so readers and other writers never see a partial file.
+
+    :param self: Represent the instance of the class
+    :param count_by_gen_per: A (runs, generations + 1) array with the percentage of people that have the rumor
+    :param seed: The numpy SeedSequence the runs were made with, or the int seed
+    :param params: The parameters of the runs, the arguments of params_row
+    :return: The path of the new file
+    """
+        count_by_gen_per = np.asarray(count_by_gen_per, dtype=float)
+        params.setdefault('generations', count_by_gen_per.shape[1] - 1)
+        row = params_row(**params)
+        seed = seed_sequence(seed)
+        filename = os.path.join(self.path, f'{params_key(row)}-{uuid.uuid4().hex}.npz')
+        with tempfile.NamedTemporaryFile(dir=self.path, suffix='.tmp', delete=False) as tmp:
+            np.savez(tmp, count_by_gen_per=count_by_gen_per, average=count_by_gen_per.mean(axis=0),
+                     seed=str(seed.entropy), spawn_key=np.array(seed.spawn_key, dtype=np.int64), **row)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp.name, filename)
+        return filename
+
+    def load(self, filename):
+        """
+    The load function reads one file of the store.
+
+    :param self: Represent the instance of the class
+    :param filename: The path of the file
+    :return: A dict with the parameters, the seed and spawn key, the per-run series and the average of the batch
+    """
+        with np.load(filename) as data:
+            entry = {name: data[name] for name in data.files}
+        for column in PARAM_COLUMNS + ('seed',):
+            entry[column] = entry[column].item()
+        entry['file'] = filename
+        return entry
+
+    def files(self, key='*'):
+        """
+    The files function lists the complete files of the store.
+
+    :param self: Represent the instance of the class
+    :param key: A params_key to list only the files of these parameters, all the files by default
+    :return: A sorted list of paths
+    """
+        return sorted(glob.glob(os.path.join(self.path, f'{key}-*.npz')))
+
+    def find(self, **params):
+        """
+    The find function returns the batches of runs made with the given parameters.
+
+    :param self: Represent the instance of the class
+    :param params: The parameters of the runs, the arguments of params_row
+    :return: A list of the entries, as returned by load
+    """
+        return [self.load(filename) for filename in self.files(params_key(params_row(**params)))]
+
+    def table(self):
+        """
+    The table function reads the parameter columns of the whole store, one row per batch of runs.
+
+    :param self: Represent the instance of the class
+    :return: A dict with an array for every column of PARAM_COLUMNS, the seed, the number of runs and the file
+    """
+        entries = [self.load(filename) for filename in self.files()]
+        columns = {column: np.array([entry[column] for entry in entries]) for column in PARAM_COLUMNS + ('seed', 'file')}
+        columns['runs'] = np.array([len(entry['count_by_gen_per']) for entry in entries], dtype=np.int64)
+        return columns
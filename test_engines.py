@@ -0,0 +1,453 @@
+"""
+Checks that the engines of the rumor spreading simulation give the same runs: every engine against the whole-grid
+GridEngine with the same random generator, the graph engine against the frontier engine on the lattice, a resumed
+checkpointed batch against an uninterrupted one, and a run stopped early against the same run made to the end.
+It also checks that the layouts, the result cache, the streamed metrics, the background worker and the results
+store give back the runs of run_batch, and that a CSV row of the batch command line is made again from its seed.
+
+    python -m pytest -q
+"""
+import csv
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import rumor_batch
+import rumor_cache
+import rumor_checkpoint
+import rumor_engine
+import rumor_graph
+from RumorSpreadingSimulation import PREVIEW_SIZE, Simulation, SimulationJob, SimulationWorker
+from rumor_batch import run_batch, run_sweep, stream_runs
+from rumor_cache import ResultCache
+from rumor_checkpoint import Checkpoint, run_batch_checkpointed
+from rumor_domain import DomainEngine
+from rumor_engine import (EMPTY, SKEPTICISM_LEVELS, BitEngine, EnsembleEngine, FrontierEngine, GraphEngine, GridEngine,
+                          arrange_grid, populate_grid, populate_nodes, skepticism_codes, skepticism_counts)
+from rumor_graph import Graph, lattice_graph
+from rumor_store import ResultsStore
+
+P_SKEPTICISM = [0.25, 0.2, 0.3, 0.25]
+# (population density, L) pairs
+PARAMS = [(0.6, 7), (0.9, 0), (0.4, 2), (1.0, 1)]
+# the widths around the 64 cells of a bitboard word
+WIDTHS = [63, 64, 65, 130]
+ROWS = 24
+GENERATIONS = 40
+
+
+def make_grid(p_people, width, seed):
+    """
+The make_grid function places the people on a ROWS x width grid.
+
+:param p_people: The population density
+:param width: The number of columns of the grid
+:param seed: The seed of the layout
+:return: A 2d int8 array of skepticism level codes
+"""
+    return populate_nodes(ROWS * width, p_people, P_SKEPTICISM, np.random.default_rng(seed)).reshape(ROWS, width)
+
+
+def assert_same_steps(expected, engine, generations=GENERATIONS):
+    """
+The assert_same_steps function starts two engines from the same cell and checks that their state arrays and their
+counts are the same after every generation.
+
+:param expected: The GridEngine
+:param engine: The engine to check
+:param generations: The number of generations to compare
+:return: Nothing
+"""
+    cell = expected.select_random_cell()
+    assert tuple(engine.select_random_cell()) == tuple(cell)
+    expected.reset()
+    engine.reset()
+    expected.start(*cell)
+    engine.start(*cell)
+    for _ in range(generations):
+        assert engine.step() == expected.step()
+        assert engine.new_receivers == expected.new_receivers
+        assert engine.num_transmitters == expected.num_transmitters
+        np.testing.assert_array_equal(engine.received_rumor, expected.received_rumor)
+        np.testing.assert_array_equal(engine.l_left, expected.l_left)
+        np.testing.assert_array_equal(engine.skepticism_level_decreased, expected.skepticism_level_decreased)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_bits_equals_dense(p_people, L, width):
+    grid = make_grid(p_people, width, width)
+    for seed in range(3):
+        assert_same_steps(GridEngine(grid, L, np.random.default_rng(seed)),
+                          BitEngine(grid, L, np.random.default_rng(seed)))
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_domain_equals_dense(p_people, L, width):
+    grid = make_grid(p_people, width, width)
+    for workers in (1, 3):
+        with DomainEngine(grid, L, np.random.default_rng(workers), workers) as engine:
+            assert_same_steps(GridEngine(grid, L, np.random.default_rng(workers)), engine)
+
+
+@pytest.mark.parametrize('width', WIDTHS)
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_ensemble_equals_dense(p_people, L, width):
+    grid = make_grid(p_people, width, width)
+    seeds = range(4)
+    count_by_gen_per = EnsembleEngine(grid, L, [np.random.default_rng(seed) for seed in seeds]).run(GENERATIONS)
+    for seed, count_by_gen in zip(seeds, count_by_gen_per):
+        np.testing.assert_array_equal(count_by_gen, GridEngine(grid, L, np.random.default_rng(seed)).run(GENERATIONS))
+
+
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_graph_equals_frontier_on_lattice(p_people, L):
+    grid = populate_grid(p_people, P_SKEPTICISM, 50, np.random.default_rng(0))
+    for seed in range(3):
+        expected = FrontierEngine(grid, L, np.random.default_rng(seed)).run(GENERATIONS)
+        np.testing.assert_array_equal(GraphEngine(grid, L, np.random.default_rng(seed)).run(GENERATIONS), expected)
+
+
+@pytest.mark.parametrize('engine', ['dense', 'frontier', 'ensemble', 'bits'])
+def test_resumed_checkpoint_equals_uninterrupted_run(engine, tmp_path, monkeypatch):
+    args = (0.7, P_SKEPTICISM, 3, 60, 4, 40, 1, engine)
+    expected = run_batch(*args[:5], grid_size=40, seed=1, engine=engine)
+    save_checkpoint = rumor_checkpoint.save_checkpoint
+    saves = []
+
+    def interrupted_save(*save_args):
+        # the job is killed after its third checkpoint
+        if len(saves) == 3:
+            raise KeyboardInterrupt
+        saves.append(save_args)
+        save_checkpoint(*save_args)
+
+    path = str(tmp_path / 'state')
+    monkeypatch.setattr(rumor_checkpoint, 'save_checkpoint', interrupted_save)
+    with pytest.raises(KeyboardInterrupt):
+        run_batch_checkpointed(path, 10, *args)
+    monkeypatch.setattr(rumor_checkpoint, 'save_checkpoint', save_checkpoint)
+    np.testing.assert_array_equal(run_batch_checkpointed(path, 10, *args), expected)
+
+
+@pytest.mark.parametrize('engine_class', [GridEngine, FrontierEngine, GraphEngine, BitEngine])
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_early_stop_equals_full_run(engine_class, p_people, L, monkeypatch):
+    grid = populate_grid(p_people, P_SKEPTICISM, 30, np.random.default_rng(0))
+    for seed in range(5):
+        count_by_gen = engine_class(grid, L, np.random.default_rng(seed)).run(150)
+        engine = engine_class(grid, L, np.random.default_rng(seed))
+        monkeypatch.setattr(engine, 'settled', lambda *settled_args: False)
+        np.testing.assert_array_equal(count_by_gen, engine.run(150))
+
+
+def test_simulation_leaves_the_seed_sequence_as_it_is():
+    seed = np.random.SeedSequence(5)
+    first = Simulation(0.6, P_SKEPTICISM, 20, 3, seed=seed)
+    second = Simulation(0.6, P_SKEPTICISM, 20, 3, seed=seed)
+    assert seed.n_children_spawned == 0
+    np.testing.assert_array_equal(first.grid, second.grid)
+    np.testing.assert_array_equal(first.grid, populate_grid(0.6, P_SKEPTICISM, rng=np.random.default_rng(
+        np.random.SeedSequence(5).spawn(1)[0])))
+
+
+def test_early_stop_on_directed_graph():
+    # the s4 node 2 is decreased by its two in-neighbors 0 and 1, and only then passes the rumor on to node 3
+    graph = Graph.from_edges([0, 0, 1, 2], [1, 2, 2, 3], directed=True)
+    levels = np.array([SKEPTICISM_LEVELS[level] for level in ('s1', 's1', 's4', 's1')], dtype=np.int8)
+    for seed in range(50):
+        count_by_gen_per = []
+        for stop_early in (True, False):
+            engine = GraphEngine(levels, 0, np.random.default_rng(seed), graph)
+            if not stop_early:
+                engine.settled = lambda *settled_args: False
+            engine.start(0)
+            count_by_gen_per.append(engine.resume([engine.percent()], 60))
+        np.testing.assert_array_equal(count_by_gen_per[0], count_by_gen_per[1])
+
+
+def test_checkpoint_killed_between_its_renames_resumes(tmp_path, monkeypatch):
+    args = (0.7, P_SKEPTICISM, 3, 60, 2, 40, 1, 'dense')
+    expected = run_batch(*args[:5], grid_size=40, seed=1)
+    replace = os.replace
+
+    def interrupted_replace(source, target):
+        # the job is killed after save_checkpoint moved the former checkpoint away, before the new one is renamed
+        replace(source, target)
+        if target.endswith('.old'):
+            raise KeyboardInterrupt
+
+    path = str(tmp_path / 'state')
+    monkeypatch.setattr(os, 'replace', interrupted_replace)
+    with pytest.raises(KeyboardInterrupt):
+        run_batch_checkpointed(path, 10, *args)
+    monkeypatch.setattr(os, 'replace', replace)
+    assert not os.path.exists(path)
+    assert Checkpoint(path).generation_progress == 10
+    np.testing.assert_array_equal(run_batch_checkpointed(path, 10, *args), expected)
+
+
+def test_batch_csv_rows_replay_from_their_seed(capsys):
+    rumor_batch.main(['--p', '0.5', '0.7', '--generations', '20', '--runs', '2', '--grid-size', '30', '--seed', '1',
+                      '--workers', '1', '--per-run'])
+    rows = list(csv.reader(capsys.readouterr().out.splitlines()))[1:]
+    rumor_batch.main(['--generations', '20', '--runs', '2', '--grid-size', '30', '--seed', '1', '--workers', '1',
+                      '--per-run'])
+    rows += list(csv.reader(capsys.readouterr().out.splitlines()))[1:]
+    assert [row[1] for row in rows] == ['0', '0', '1', '1', '', '']
+    for row in rows:
+        seed = np.random.SeedSequence(int(row[0]), spawn_key=tuple(map(int, row[1].split())))
+        count_by_gen_per = run_batch(float(row[2]), P_SKEPTICISM, 7, 20, 2, grid_size=30, seed=seed)
+        np.testing.assert_allclose(count_by_gen_per[int(row[8])], np.array(row[9:], dtype=float))
+    np.testing.assert_array_equal(np.array([row[9:] for row in rows[-2:]], dtype=float),
+                                  run_batch(0.6, P_SKEPTICISM, 7, 20, 2, grid_size=30, seed=1))
+
+
+def arrange_grid_by_cell(grid, p_skepticism, layout):
+    """
+The arrange_grid_by_cell function is the cell-by-cell sort arrange_grid replaced: it counts the empty neighbors of every
+person one cell at a time, sorts the people by that count with sorted, and gives the levels out in that order.
+
+:param grid: A 2d array of skepticism level codes
+:param p_skepticism: The fractions of people with skepticism s4, s3, s2 and s1
+:param layout: 'slow' or 'fast'
+:return: The arranged copy of the grid
+"""
+    rows, cols = grid.shape
+    people, num_empty = [], []
+    for x in range(rows):
+        for y in range(cols):
+            if grid[x, y] != EMPTY:
+                people.append((x, y))
+                num_empty.append(sum(grid[(x + dx) % rows, (y + dy) % cols] == EMPTY
+                                     for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)))
+    order = [people[i] for i in sorted(range(len(people)), key=lambda i: num_empty[i])]
+    codes = list(zip(skepticism_codes(p_skepticism), skepticism_counts(p_skepticism, len(people))))
+    if layout == 'fast':
+        codes.reverse()
+    arranged = grid.copy()
+    levels = [code for code, count in codes for _ in range(count)]
+    for cell, code in zip(order, levels):
+        arranged[cell] = code
+    return arranged
+
+
+@pytest.mark.parametrize('layout', ['slow', 'fast'])
+@pytest.mark.parametrize('p_people', [0.3, 0.5, 0.8, 1.0])
+def test_arrange_grid_equals_sort_by_cell(p_people, layout):
+    # at these densities many people have the same number of empty neighbors, so the ties decide the layout
+    for seed in range(3):
+        grid = make_grid(p_people, 20 + seed, seed)
+        expected = arrange_grid_by_cell(grid, P_SKEPTICISM, layout)
+        np.testing.assert_array_equal(arrange_grid(grid, P_SKEPTICISM, layout), expected)
+
+
+def test_store_append_load_round_trip(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    count_by_gen_per = run_batch(0.6, P_SKEPTICISM, 2, 20, 3, grid_size=20, seed=4)
+    seed = np.random.SeedSequence(4, spawn_key=(1,))
+    entry = store.load(store.append(count_by_gen_per, seed, p_people=0.6, p_skepticism=P_SKEPTICISM, L=2, grid_size=20))
+    np.testing.assert_array_equal(entry['count_by_gen_per'], count_by_gen_per)
+    np.testing.assert_array_equal(entry['average'], count_by_gen_per.mean(axis=0))
+    assert entry['seed'] == '4'
+    assert tuple(entry['spawn_key']) == (1,)
+    assert (entry['p_people'], entry['s4'], entry['s3'], entry['s2'], entry['s1']) == (0.6, *P_SKEPTICISM)
+    assert (entry['L'], entry['generations'], entry['grid_size'], entry['layout'], entry['engine']) == \
+        (2, 20, 20, 'random', 'dense')
+
+
+def test_store_find_returns_the_batches_of_their_parameters(tmp_path):
+    store = ResultsStore(str(tmp_path))
+    first = store.append(np.zeros((2, 11)), 1, p_people=0.6, p_skepticism=P_SKEPTICISM, L=2)
+    second = store.append(np.ones((3, 11)), 2, p_people=0.6, p_skepticism=P_SKEPTICISM, L=2)
+    store.append(np.ones((1, 11)), 1, p_people=0.6, p_skepticism=P_SKEPTICISM, L=3)
+    found = store.find(p_people=0.6, p_skepticism=P_SKEPTICISM, L=2, generations=10)
+    assert sorted(entry['file'] for entry in found) == sorted([first, second])
+    assert store.find(p_people=0.6, p_skepticism=P_SKEPTICISM, L=4, generations=10) == []
+    assert store.find(p_people=0.6, p_skepticism=P_SKEPTICISM, L=2, generations=11) == []
+    assert store.find(p_people=0.6, p_skepticism=P_SKEPTICISM, L=2, generations=10, engine='bits') == []
+    table = store.table()
+    assert sorted(zip(table['L'], table['runs'])) == [(2, 2), (2, 3), (3, 1)]
+
+
+@pytest.mark.parametrize('engine', ['dense', 'ensemble'])
+def test_cache_top_up_equals_uncached_run(engine, tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    args = (0.6, P_SKEPTICISM, 2, 30)
+    run_chunk = rumor_batch.run_chunk
+    runs_made = []
+
+    def counted_chunk(*chunk_args):
+        runs_made.append(len(chunk_args[6]))
+        return run_chunk(*chunk_args)
+
+    monkeypatch.setattr(rumor_batch, 'run_chunk', counted_chunk)
+    run_batch(*args, 3, grid_size=20, seed=7, engine=engine, cache=cache)
+    topped_up = run_batch(*args, 5, grid_size=20, seed=7, engine=engine, cache=cache)
+    # the second batch only made the 2 runs the cache did not have
+    assert sum(runs_made) == 5
+    np.testing.assert_array_equal(topped_up, run_batch(*args, 5, grid_size=20, seed=7, engine=engine))
+    np.testing.assert_array_equal(run_batch(*args, 4, grid_size=20, seed=7, engine=engine, cache=cache), topped_up[:4])
+    assert sum(runs_made) == 5 + 5
+
+
+def test_cache_misses_other_parameters_and_engine_versions(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    config = (0.6, P_SKEPTICISM, 2)
+    seed = np.random.SeedSequence(7)
+    key = cache.key(config, seed, 30, 20, 'dense', 'random')
+    cache.put(key, np.ones((2, 31)))
+    assert cache.get(cache.key(config, seed, 30, 20, 'dense', 'random')) is not None
+    for other in [cache.key((0.7, P_SKEPTICISM, 2), seed, 30, 20, 'dense', 'random'),
+                  cache.key((0.6, [0.2, 0.25, 0.3, 0.25], 2), seed, 30, 20, 'dense', 'random'),
+                  cache.key((0.6, P_SKEPTICISM, 3), seed, 30, 20, 'dense', 'random'),
+                  cache.key(config, np.random.SeedSequence(8), 30, 20, 'dense', 'random'),
+                  cache.key(config, np.random.SeedSequence(7, spawn_key=(0,)), 30, 20, 'dense', 'random'),
+                  cache.key(config, seed, 31, 20, 'dense', 'random'),
+                  cache.key(config, seed, 30, 21, 'dense', 'random'),
+                  cache.key(config, seed, 30, 20, 'bits', 'random'),
+                  cache.key(config, seed, 30, 20, 'dense', 'slow'),
+                  cache.key(config, seed, 30, 20, 'dense', 'random', 0.5)]:
+        assert cache.get(other) is None
+    monkeypatch.setattr(rumor_cache, 'ENGINE_VERSION', rumor_cache.ENGINE_VERSION + 1)
+    assert cache.get(cache.key(config, seed, 30, 20, 'dense', 'random')) is None
+
+
+def test_cache_evicts_the_least_recently_used_entries_first(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    for n, key in enumerate('abc'):
+        cache.put(key, np.full((2, 31), n))
+        os.utime(cache.filename(key), (100 * (n + 1), 100 * (n + 1)))
+    # a is used again, so b and then c are now the least recently used entries
+    cache.get('a')
+    entry_size = os.path.getsize(cache.filename('a'))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+    assert [key for key in 'abc' if cache.get(key) is not None] == ['a', 'c']
+    cache.max_bytes = entry_size
+    cache.put('d', np.zeros((2, 31)))
+    assert [key for key in 'abcd' if cache.get(key) is not None] == ['d']
+
+
+@pytest.mark.parametrize('engine', ['dense', 'frontier', 'ensemble', 'bits'])
+def test_streamed_records_equal_batch_runs(engine):
+    args = (0.6, P_SKEPTICISM, 2, 30, 3)
+    expected = run_batch(*args, grid_size=20, seed=3, engine=engine)
+    count_by_gen_per = np.full(expected.shape, np.nan)
+    for record in stream_runs(*args, grid_size=20, seed=3, engine=engine):
+        count_by_gen_per[record['run'], record['generation']] = record['percent']
+    np.testing.assert_array_equal(count_by_gen_per, expected)
+
+
+def test_simulation_stream_metrics_equals_batch_runs():
+    simulation = Simulation(0.6, P_SKEPTICISM, 30, 2, seed=3, grid_size=20)
+    records = list(simulation.stream_metrics(3))
+    count_by_gen_per = np.zeros((3, 31))
+    for record in records:
+        count_by_gen_per[record['run'], record['generation']] = record['percent']
+    assert len(records) == count_by_gen_per.size
+    expected = run_batch(0.6, P_SKEPTICISM, 2, 30, 3, grid_size=20, seed=3)
+    np.testing.assert_array_equal(count_by_gen_per, expected)
+    np.testing.assert_array_equal(count_by_gen_per.mean(axis=0), expected.mean(axis=0))
+
+
+def test_batch_metrics_file_equals_batch_averages(tmp_path, capsys):
+    metrics = str(tmp_path / 'metrics.jsonl')
+    rumor_batch.main(['--p', '0.5', '0.7', '--l', '2', '--generations', '30', '--runs', '3', '--grid-size', '20',
+                      '--seed', '3', '--metrics', metrics])
+    averages = np.array([row[9:] for row in list(csv.reader(capsys.readouterr().out.splitlines()))[1:]], dtype=float)
+    configs = [(0.5, P_SKEPTICISM, 2), (0.7, P_SKEPTICISM, 2)]
+    expected = run_sweep(configs, 30, 3, grid_size=20, seed=3, workers=1)
+    np.testing.assert_allclose(averages, [count_by_gen_per.mean(axis=0) for count_by_gen_per in expected])
+    count_by_gen_per = np.zeros((2, 3, 31))
+    with open(metrics) as file:
+        for line in file:
+            record = json.loads(line)
+            count_by_gen_per[[0.5, 0.7].index(record['P']), record['run'], record['generation']] = record['percent']
+    np.testing.assert_array_equal(count_by_gen_per, expected)
+
+
+def test_run_headless_reports_every_run_once_it_is_over(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation = Simulation(0.6, P_SKEPTICISM, 30, 2, seed=3, grid_size=20)
+    calls = []
+    count_by_gen_per = simulation.run_headless(3, lambda run, generation: calls.append((run, generation)))
+    np.testing.assert_array_equal(count_by_gen_per, run_batch(0.6, P_SKEPTICISM, 2, 30, 3, grid_size=20, seed=3))
+    assert [call for call in calls if call[1] == 30] == [(0, 30), (1, 30), (2, 30)]
+    assert calls == sorted(set(calls))
+    assert len(os.listdir(tmp_path / 'results')) == 1
+
+
+def test_run_headless_stops_when_cancelled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    simulation = Simulation(1.0, [0, 0, 0, 1], 50, 0, seed=3, grid_size=40)
+    cancel = threading.Event()
+    calls = []
+
+    def progress(run, generation):
+        calls.append((run, generation))
+        if (run, generation) == (1, 2):
+            cancel.set()
+
+    assert simulation.run_headless(3, progress, cancel) is None
+    assert calls[-1] == (1, 2)
+    # a cancelled job saves nothing to the results store
+    assert not (tmp_path / 'results').exists()
+
+
+def test_worker_runs_cancels_and_previews_the_jobs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    worker = SimulationWorker()
+    skipped = SimulationJob(Simulation(0.6, P_SKEPTICISM, 30, 2, seed=3, grid_size=20), 2)
+    skipped.cancel.set()
+    stopped = SimulationJob(Simulation(1.0, [0, 0, 0, 1], 50, 0, seed=3, grid_size=40), 3)
+    progress = stopped.progress
+
+    def cancelling_progress(run, generation):
+        progress(run, generation)
+        if generation == 2:
+            stopped.cancel.set()
+
+    stopped.progress = cancelling_progress
+    done = SimulationJob(Simulation(0.6, P_SKEPTICISM, 30, 2, seed=3, grid_size=20), 2)
+    for job in (skipped, stopped, done):
+        worker.submit(job)
+    assert [worker.finished.get(timeout=60) for _ in range(3)] == [skipped, stopped, done]
+    assert (skipped.status, skipped.result) == ('cancelled', None)
+    assert (stopped.status, stopped.result, stopped.run, stopped.generation) == ('cancelled', None, 0, 2)
+    assert done.status == 'done' and done.percent() == 100
+    np.testing.assert_array_equal(done.result, run_batch(0.6, P_SKEPTICISM, 2, 30, 2, grid_size=20, seed=3))
+    # the preview is a copy the worker made of the grid
+    frame = done.frames.get_nowait()
+    assert frame.shape == (20, 20, 3) and frame.shape[0] <= PREVIEW_SIZE
+    assert not np.shares_memory(frame, done.simulation.engine.received_rumor)
+
+
+def test_lattice_adjacency_without_a_neighbor_table(monkeypatch):
+    expected = rumor_engine.lattice_adjacency((30, 40))
+    # a grid over the size bound of the neighbor table gets its neighbors computed a few cells at a time
+    monkeypatch.setattr(rumor_engine, 'NEIGHBOR_TABLE_MAX_CELLS', 100)
+    for expected_array, array in zip(expected, rumor_engine.lattice_adjacency((30, 40))):
+        np.testing.assert_array_equal(array, expected_array)
+
+
+def test_lattice_topology_takes_a_number_of_nodes(capsys):
+    assert lattice_graph(1000).num_nodes == 31 ** 2
+    rumor_graph.main(['--topology', 'lattice', '--generations', '5', '--runs', '1', '--seed', '1'])
+    row = list(csv.reader(capsys.readouterr().out.splitlines()))[1]
+    assert (row[1], row[2]) == ('10000', '80000')
+
+
+@pytest.mark.parametrize('p_people, L', PARAMS)
+def test_bits_keeps_no_grid(p_people, L):
+    grid = make_grid(p_people, 65, 0)
+    engine = BitEngine(grid, L, np.random.default_rng(0))
+    expected = GridEngine(grid, L, np.random.default_rng(0))
+    assert 'grid' not in vars(engine)
+    np.testing.assert_array_equal(engine.grid, grid)
+    np.testing.assert_array_equal(engine.level_counts, expected.level_counts)
+    assert engine.num_people == expected.num_people